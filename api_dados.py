@@ -0,0 +1,485 @@
+"""API HTTP/JSON local com as séries históricas, as previsões e os KPIs do painel.
+
+Serve os mesmos dados dos painéis, lidos pelos mesmos carregadores do app
+(`app.carregar_bases`, índices de `app.derivados_bases`), sem passar pela
+interface do Streamlit:
+
+    GET /series                                        séries disponíveis
+    GET /historico?cidade=Recife&tipo_mercado=Venda    preço R$/m² por data
+    GET /previsoes?cidade=Recife&tipo_mercado=Venda    projeção SARIMA
+    GET /kpis?cidade=Recife&tipo_mercado=Venda         indicadores numéricos
+    GET /exportacao?formato=parquet                    manifesto da exportação em lote
+    GET /exportacao/<arquivo do manifesto>             uma partição (Parquet ou Arrow IPC)
+
+`inicio` e `fim` (AAAA-MM-DD) recortam o intervalo de datas. Cada resposta
+leva um ETag derivado da versão dos dados (`app.versao_dados`) e da consulta:
+um GET com `If-None-Match` igual recebe 304 sem que nada seja recalculado.
+Corpos acima de 1 KB saem com gzip quando o cliente aceita (respeitando os
+pesos `q` do Accept-Encoding), e ficam em cache já comprimidos; a versão com
+gzip tem ETag própria (sufixo `-gz`). As partições da exportação são geradas direto no socket
+(Transfer-Encoding: chunked), um row group por vez.
+
+Uso:
+    python api_dados.py servir --porta 8502
+    python api_dados.py benchmark --requisicoes 5000 --concorrencia 8
+"""
+import argparse
+import gzip
+import hashlib
+import http.client
+import io
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlencode, urlsplit
+
+import numpy as np
+import pandas as pd
+
+import app
+import exportacao
+from cache_lru import CacheLRU
+
+GZIP_MINIMO_BYTES = 1024
+CACHE_RESPOSTAS_MB = 64
+VERSOES_PARTICOES = 2  # índices de partições guardados (por versão dos dados e formato)
+PREFIXO_EXPORTACAO = "/exportacao/"
+TIPOS_EXPORTACAO = {"parquet": "application/vnd.apache.parquet", "arrow": "application/vnd.apache.arrow.file"}
+
+log = logging.getLogger(__name__)
+
+
+class ErroConsulta(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def _datas(valores):
+    return pd.DatetimeIndex(valores).strftime("%Y-%m-%d").tolist()
+
+
+def _data_parametro(parametros, nome):
+    valor = parametros.get(nome)
+    if valor is None:
+        return None
+    try:
+        return np.datetime64(pd.Timestamp(valor))
+    except ValueError:
+        raise ErroConsulta(400, f"Data inválida em '{nome}': {valor!r} (use AAAA-MM-DD).")
+
+
+def aceita_gzip(accept_encoding):
+    """Se o cabeçalho Accept-Encoding aceita gzip: `gzip;q=0` recusa, `*` vale para o que não foi listado."""
+    pesos = {}
+    for item in accept_encoding.split(","):
+        nome, _, parametros = item.partition(";")
+        peso = 1.0
+        for parametro in parametros.split(";"):
+            chave, _, valor = parametro.partition("=")
+            if chave.strip().lower() == "q":
+                try:
+                    peso = float(valor)
+                except ValueError:
+                    peso = 0.0
+        if nome.strip():
+            pesos[nome.strip().lower()] = peso
+    return pesos.get("gzip", pesos.get("x-gzip", pesos.get("*", 0.0))) > 0
+
+
+def etag_gzip(etag):
+    """ETag da representação com gzip: outra sequência de bytes, outra ETag."""
+    return f'{etag[:-1]}-gz"'
+
+
+def recortar_datas(tabela, inicio=None, fim=None):
+    """Linhas de uma série (ordenada por data) entre `inicio` e `fim`, inclusive, por busca binária."""
+    datas = tabela["data"].to_numpy()
+    ini = 0 if inicio is None else int(np.searchsorted(datas, inicio, side="left"))
+    fim_pos = len(datas) if fim is None else int(np.searchsorted(datas, fim, side="right"))
+    return tabela.iloc[ini:fim_pos]
+
+
+class ServicoDados:
+    """Respostas da API (status, corpo JSON, ETag), com os corpos prontos em cache LRU."""
+
+    def __init__(self, limite_cache_bytes=CACHE_RESPOSTAS_MB * 1024 * 1024):
+        self.cache = CacheLRU(limite_cache_bytes, tamanho=lambda corpos: sum(len(c) for c in corpos))
+        # (versão dos dados, formato) -> {arquivo: (df, início, fim)}; só as mais recentes.
+        self._particoes = CacheLRU(VERSOES_PARTICOES, tamanho=lambda indice: 1)
+        self.rotas = {
+            "/series": self.series,
+            "/historico": self.historico,
+            "/previsoes": self.previsoes,
+            "/kpis": self.kpis,
+            "/exportacao": self.manifesto_exportacao,
+        }
+
+    # ---------- consultas ----------
+    def _serie(self, parametros):
+        cidade, mercado = parametros.get("cidade"), parametros.get("tipo_mercado")
+        if not cidade or not mercado:
+            raise ErroConsulta(400, "Informe 'cidade' e 'tipo_mercado'.")
+        df_hist, _ = app.carregar_bases()
+        indice = app.derivados_bases()["historico"]
+        if (cidade, mercado) not in indice:
+            raise ErroConsulta(404, f"Série não encontrada: {cidade} / {mercado}.")
+        base = app.fatia_serie(df_hist, indice, cidade, mercado)
+        return cidade, mercado, recortar_datas(base, _data_parametro(parametros, "inicio"), _data_parametro(parametros, "fim"))
+
+    def series(self, parametros):
+        df_hist, _ = app.carregar_bases()
+        indice = app.derivados_bases()["historico"]
+        datas = df_hist["data"].to_numpy()
+        return {
+            "series": [
+                {
+                    "cidade": cidade,
+                    "tipo_mercado": mercado,
+                    "inicio": _datas(datas[ini:ini + 1])[0],
+                    "fim": _datas(datas[fim - 1:fim])[0],
+                    "pontos": fim - ini,
+                }
+                for (cidade, mercado), (ini, fim) in sorted(indice.items())
+                if fim > ini
+            ]
+        }
+
+    def historico(self, parametros):
+        cidade, mercado, base = self._serie(parametros)
+        return {
+            "cidade": cidade,
+            "tipo_mercado": mercado,
+            "datas": _datas(base["data"]),
+            "preco_m2": base["preco_m2"].astype(float).round(4).tolist(),
+        }
+
+    def previsoes(self, parametros):
+        cidade, mercado = parametros.get("cidade"), parametros.get("tipo_mercado")
+        if not cidade or not mercado:
+            raise ErroConsulta(400, "Informe 'cidade' e 'tipo_mercado'.")
+        _, pacote = app.carregar_bases()
+        if pacote is None or "previsoes_futuras" not in pacote:
+            raise ErroConsulta(404, "Nenhum snapshot de previsões carregado.")
+        if (cidade, mercado) not in app.derivados_bases().get("previsoes_futuras", {}):
+            raise ErroConsulta(404, f"Sem previsões para {cidade} / {mercado}.")
+        art = app.artefatos_previsoes(cidade, mercado)
+        fut = recortar_datas(art["fut"], _data_parametro(parametros, "inicio"), _data_parametro(parametros, "fim"))
+        ultima = art["ultima_data_hist"]
+        return {
+            "cidade": cidade,
+            "tipo_mercado": mercado,
+            "ultima_data_historica": None if pd.isnull(ultima) else f"{ultima:%Y-%m-%d}",
+            "datas": _datas(fut["data"]),
+            "preco_previsto": fut["preco_previsto"].astype(float).round(4).tolist(),
+        }
+
+    def kpis(self, parametros):
+        cidade, mercado, base = self._serie(parametros)
+        if base.empty:
+            raise ErroConsulta(404, "Nenhuma observação no intervalo pedido.")
+        precos = base["preco_m2"].to_numpy(dtype=float)
+        inicial, atual = precos[0], precos[-1]
+        return {
+            "cidade": cidade,
+            "tipo_mercado": mercado,
+            "inicio": _datas(base["data"].iloc[:1])[0],
+            "fim": _datas(base["data"].iloc[-1:])[0],
+            "observacoes": len(precos),
+            "preco_atual": round(float(atual), 4),
+            "preco_medio": round(float(precos.mean()), 4),
+            "preco_minimo": round(float(precos.min()), 4),
+            "preco_maximo": round(float(precos.max()), 4),
+            "desvio_padrao": round(float(precos.std(ddof=1)), 4) if len(precos) > 1 else 0.0,
+            "variacao_abs": round(float(atual - inicial), 4),
+            "variacao_pct": round(float((atual - inicial) / inicial * 100), 4) if inicial else 0.0,
+        }
+
+    def manifesto_exportacao(self, parametros):
+        formato = parametros.get("formato", "parquet")
+        if formato not in exportacao.FORMATOS:
+            raise ErroConsulta(400, f"Formato desconhecido: {formato!r} (use {', '.join(exportacao.FORMATOS)}).")
+        tabelas, versoes = exportacao.tabelas_do_app()
+        return exportacao.montar_manifesto(tabelas, formato, versoes)
+
+    def particao(self, arquivo):
+        """(formato, DataFrame, início, fim) da partição `arquivo`, como listada no manifesto."""
+        formato = arquivo.rsplit(".", 1)[-1]
+        if formato not in exportacao.FORMATOS:
+            raise ErroConsulta(404, f"Partição desconhecida: {arquivo}.")
+
+        def indexar():
+            tabelas, _ = exportacao.tabelas_do_app()
+            return {
+                nome_arquivo: (tabelas[nome][0], ini, fim)
+                for nome_arquivo, nome, _, _, ini, fim in exportacao.particoes(tabelas, formato)
+            }
+
+        indice = self._particoes.obter_ou_gerar((app.versao_dados(), formato), indexar)
+        if arquivo not in indice:
+            raise ErroConsulta(404, f"Partição desconhecida: {arquivo}.")
+        return (formato, *indice[arquivo])
+
+    # ---------- HTTP ----------
+    def etag(self, caminho, parametros):
+        """ETag da consulta: versão dos dados + rota + parâmetros normalizados; não depende do corpo."""
+        consulta = urlencode(sorted(parametros.items()))
+        resumo = hashlib.sha1(f"{caminho}?{consulta}".encode()).hexdigest()[:16]
+        return f'"{app.versao_dados()}-{resumo}"'
+
+    def corpos(self, caminho, parametros, etag):
+        """(corpo JSON, corpo com gzip ou b"" se for pequeno demais), gerados uma vez por ETag."""
+        def gerar():
+            corpo = json.dumps(self.rotas[caminho](parametros), ensure_ascii=False, separators=(",", ":")).encode()
+            comprimido = gzip.compress(corpo, compresslevel=6) if len(corpo) >= GZIP_MINIMO_BYTES else b""
+            return corpo, comprimido
+
+        return self.cache.obter_ou_gerar(etag, gerar)
+
+
+class SaidaChunked(io.RawIOBase):
+    """Arquivo só de escrita que envia cada escrita como um pedaço de `Transfer-Encoding: chunked`."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        if dados:
+            self.wfile.write(b"%X\r\n" % len(dados))
+            self.wfile.write(dados)
+            self.wfile.write(b"\r\n")
+        return len(dados)
+
+    def finalizar(self):
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class ManipuladorAPI(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # conexões keep-alive
+    # Cabeçalhos e corpo saem em escritas separadas: com o Nagle ligado, cada
+    # resposta esperaria o ACK atrasado do cliente (~40 ms).
+    disable_nagle_algorithm = True
+    server_version = "PredImoveisAPI/1.0"
+
+    def log_message(self, formato, *args):
+        if self.server.verboso:
+            super().log_message(formato, *args)
+
+    def send_response(self, *args, **kwargs):
+        self._respondido = True
+        super().send_response(*args, **kwargs)
+
+    def _enviar(self, status, corpo=b"", cabecalhos=None):
+        self.send_response(status)
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        if corpo and self.command != "HEAD":
+            self.wfile.write(corpo)
+
+    def _erro(self, status, mensagem):
+        corpo = json.dumps({"erro": mensagem}, ensure_ascii=False).encode()
+        self._enviar(status, corpo, {"Content-Type": "application/json; charset=utf-8"})
+
+    def _if_none_match(self):
+        return {t.strip() for t in self.headers.get("If-None-Match", "").split(",")}
+
+    def do_GET(self):
+        self._respondido = False
+        try:
+            self._responder()
+        except ErroConsulta as e:
+            self._erro(e.status, str(e))
+        except Exception:
+            # Com a resposta já começada não há como trocar o status; sem ela, 500 em JSON.
+            if self._respondido:
+                raise
+            log.exception("Erro em GET %s", self.path)
+            self._erro(500, "Erro interno ao montar a resposta.")
+
+    do_HEAD = do_GET
+
+    def _responder(self):
+        servico = self.server.servico
+        url = urlsplit(self.path)
+        caminho = url.path.rstrip("/") or "/"
+        if caminho.startswith(PREFIXO_EXPORTACAO):
+            self._enviar_particao(unquote(caminho))
+            return
+        if caminho not in servico.rotas:
+            self._erro(404, f"Rota desconhecida: {caminho}. Use {', '.join(servico.rotas)}.")
+            return
+        parametros = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        etag = servico.etag(caminho, parametros)
+        gzip_aceito = aceita_gzip(self.headers.get("Accept-Encoding", ""))
+        pedidas = self._if_none_match()
+        cabecalhos = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        # Caminho rápido: a ETag da representação que este cliente receberia, sem gerar nada.
+        provavel = etag_gzip(etag) if gzip_aceito else etag
+        if provavel in pedidas:
+            cabecalhos["ETag"] = provavel
+            self._enviar(304, cabecalhos=cabecalhos)
+            return
+
+        corpo, comprimido = servico.corpos(caminho, parametros, etag)
+        if gzip_aceito and comprimido:
+            corpo, etag = comprimido, etag_gzip(etag)
+            cabecalhos["Content-Encoding"] = "gzip"
+        cabecalhos["ETag"] = etag
+        # Corpo pequeno demais para gzip: o cliente que aceita gzip recebe (e guarda) a ETag sem sufixo.
+        if etag in pedidas:
+            self._enviar(304, cabecalhos=cabecalhos)
+            return
+        cabecalhos["Content-Type"] = "application/json; charset=utf-8"
+        self._enviar(200, corpo, cabecalhos)
+
+    def _enviar_particao(self, caminho):
+        servico = self.server.servico
+        etag = servico.etag(caminho, {})
+        cabecalhos = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag in self._if_none_match():
+            self._enviar(304, cabecalhos=cabecalhos)
+            return
+        formato, df, ini, fim = servico.particao(caminho[len(PREFIXO_EXPORTACAO):])
+
+        # O tamanho só é conhecido no fim: o arquivo vai em pedaços, à medida que é gravado.
+        self.send_response(200)
+        for nome, valor in cabecalhos.items():
+            self.send_header(nome, valor)
+        self.send_header("Content-Type", TIPOS_EXPORTACAO[formato])
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+        saida = SaidaChunked(self.wfile)
+        try:
+            with io.BufferedWriter(saida, buffer_size=64 * 1024) as destino:
+                exportacao.escrever_particao(df, ini, fim, destino, formato)
+                destino.flush()
+                saida.finalizar()
+        except Exception:
+            # O 200 já foi enviado: sem o pedaço final, o cliente percebe a resposta truncada.
+            self.close_connection = True
+            raise
+
+
+def criar_servidor(host="127.0.0.1", porta=8502, servico=None, verboso=False):
+    servidor = ThreadingHTTPServer((host, porta), ManipuladorAPI)
+    servidor.daemon_threads = True
+    servidor.servico = servico or ServicoDados()
+    servidor.verboso = verboso
+    return servidor
+
+
+# -------------------- Benchmark --------------------
+def _rajada(host, porta, caminhos, cabecalhos, n):
+    """Faz `n` GETs numa conexão keep-alive; devolve as latências (s) e os status."""
+    conexao = http.client.HTTPConnection(host, porta)
+    latencias, status = [], []
+    try:
+        for i in range(n):
+            inicio = time.perf_counter()
+            conexao.request("GET", caminhos[i % len(caminhos)], headers=cabecalhos(i))
+            resposta = conexao.getresponse()
+            resposta.read()
+            latencias.append(time.perf_counter() - inicio)
+            status.append(resposta.status)
+    finally:
+        conexao.close()
+    return latencias, status
+
+
+def benchmark(requisicoes=5000, concorrencia=8, max_series=20):
+    """Requisições por segundo com cache quente: 200 com gzip e 304 por If-None-Match."""
+    servidor = criar_servidor(porta=0)
+    host, porta = servidor.server_address[:2]
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        indice = app.derivados_bases()["historico"]
+        caminhos = []
+        for cidade, mercado in sorted(indice)[:max_series]:
+            consulta = urlencode({"cidade": cidade, "tipo_mercado": mercado})
+            caminhos += [f"/historico?{consulta}", f"/previsoes?{consulta}", f"/kpis?{consulta}"]
+
+        # Aquecimento: gera (e põe em cache) todas as respostas e guarda os ETags.
+        etags = {}
+        conexao = http.client.HTTPConnection(host, porta)
+        for caminho in caminhos:
+            conexao.request("GET", caminho, headers={"Accept-Encoding": "gzip"})
+            resposta = conexao.getresponse()
+            resposta.read()
+            etags[caminho] = resposta.getheader("ETag")
+        conexao.close()
+        caminhos = [c for c in caminhos if etags[c]]
+
+        cenarios = {
+            "200_gzip": lambda i: {"Accept-Encoding": "gzip"},
+            "304_if_none_match": lambda i: {"Accept-Encoding": "gzip", "If-None-Match": etags[caminhos[i % len(caminhos)]]},
+        }
+        resultado = {"requisicoes": requisicoes, "concorrencia": concorrencia, "rotas": len(caminhos)}
+        por_conexao = max(1, requisicoes // concorrencia)
+        for nome, cabecalhos in cenarios.items():
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+                rajadas = list(executor.map(
+                    lambda _: _rajada(host, porta, caminhos, cabecalhos, por_conexao), range(concorrencia)
+                ))
+            duracao = time.perf_counter() - inicio
+            latencias = np.concatenate([r[0] for r in rajadas]) * 1000
+            status = sorted({s for r in rajadas for s in r[1]})
+            resultado[nome] = {
+                "rps": round(len(latencias) / duracao, 1),
+                "p50_ms": round(float(np.percentile(latencias, 50)), 3),
+                "p95_ms": round(float(np.percentile(latencias, 95)), 3),
+                "status": status,
+            }
+        return resultado
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API HTTP/JSON local do PredImóveis")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_servir = sub.add_parser("servir", help="sobe a API")
+    p_servir.add_argument("--host", default="127.0.0.1")
+    p_servir.add_argument("--porta", type=int, default=8502)
+    p_servir.add_argument("--verboso", action="store_true", help="registra cada requisição")
+    p_bench = sub.add_parser("benchmark", help="mede requisições/s com o cache quente")
+    p_bench.add_argument("--requisicoes", type=int, default=5000)
+    p_bench.add_argument("--concorrencia", type=int, default=8)
+    p_bench.add_argument("--json", help="arquivo onde gravar o resultado")
+    args = parser.parse_args(argv)
+
+    if args.comando == "servir":
+        servidor = criar_servidor(args.host, args.porta, verboso=args.verboso)
+        print(f"API em http://{args.host}:{servidor.server_address[1]} (versão dos dados {app.versao_dados()})")
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            servidor.server_close()
+        return
+
+    resultado = benchmark(args.requisicoes, args.concorrencia)
+    print(f"{resultado['rotas']} rotas, {resultado['requisicoes']} requisições, {resultado['concorrencia']} conexões")
+    for nome in ("200_gzip", "304_if_none_match"):
+        m = resultado[nome]
+        print(f"{nome:<20} {m['rps']:>9} req/s | p50 {m['p50_ms']} ms | p95 {m['p95_ms']} ms | status {m['status']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
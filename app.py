@@ -1,18 +1,38 @@
 import os
 import time
 import json
+import hashlib
+import logging
+import contextlib
+import threading
+import functools
+import collections
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import joblib
+import numpy as np
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 import streamlit as st
 from fpdf import FPDF
-from gtts import gTTS
-import tempfile
 import pyotp
-import qrcode
-from PIL import Image
 from io import BytesIO
 
+import exportacao
+import graficos_estaticos
+import metricas
+import perfil
+import pdf_continuo
+import tts
+import memoria_compartilhada
+from cache_audio import CacheAudioDisco
+from cache_lru import CacheLRU
+from cofre_mfa import CofreMFA
+import limite_login
+from limite_login import LimitadorTentativas
+
+log = logging.getLogger(__name__)
+
 # -------------------- Config da página --------------------
 st.set_page_config(
     page_title="PredImóveis",
@@ -24,24 +44,139 @@ st.set_page_config(
 HERE = os.path.dirname(os.path.abspath(__file__))
 CSV_PATH = os.path.join(HERE, "csv_unico.csv")
 JOBLIB_PATH = os.path.join(HERE, "modelos_sarima.joblib")
+CACHE_DIR = os.environ.get("PREDIMOVEIS_CACHE_DIR", os.path.join(HERE, ".cache"))
 
 
 # -------------------- Acessibilidade: TTS --------------------
+# O motor de voz é plugável (`tts.py`): espeak-ng local/offline ou gTTS.
+# As narrações se repetem muito entre usuários: o áudio fica em um cache em
+# disco endereçado pelo texto, compartilhado por todas as sessões.
+MOTOR_TTS = os.environ.get("PREDIMOVEIS_TTS", "auto")
+CACHE_AUDIO_MB = float(os.environ.get("PREDIMOVEIS_CACHE_AUDIO_MB", "256"))
+TTS_THREADS = int(os.environ.get("PREDIMOVEIS_TTS_THREADS", "4"))
+IDIOMA_TTS = "pt-br"
+
+
+@st.cache_resource(show_spinner=False)
+def motor_tts():
+    return tts.escolher_motor(MOTOR_TTS)
+
+
+@st.cache_resource(show_spinner=False)
+def cache_audio():
+    # Um diretório por motor: a mesma frase em outro motor é outro áudio (e outro formato).
+    motor = motor_tts()
+    return CacheAudioDisco(
+        os.path.join(CACHE_DIR, "audio", motor.nome), int(CACHE_AUDIO_MB * 1024 * 1024), motor.extensao
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def pool_tts():
+    return ThreadPoolExecutor(max_workers=TTS_THREADS, thread_name_prefix="tts")
+
+
+@metricas.cronometrado
 def ler_texto_em_voz_alta(texto: str):
-    """Gera áudio (pt-BR) do texto e exibe um player no Streamlit."""
+    """Gera áudio (pt-BR) do texto e exibe um player no Streamlit.
+
+    Textos longos são sintetizados em trechos (frases) em paralelo: o player da
+    primeira frase aparece assim que ela fica pronta e o restante vem em seguida.
+    """
     if not texto or not str(texto).strip():
         st.warning("Nenhum texto disponível para leitura.")
         return
     try:
-        tts = gTTS(text=str(texto), lang="pt-br")
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp:
-            tts.save(tmp.name)
-            st.audio(tmp.name, format="audio/mp3")
+        motor, cache = motor_tts(), cache_audio()
+
+        def sintetizar(trecho):
+            return cache.obter_ou_gerar(trecho, IDIOMA_TTS, lambda: motor.sintetizar(trecho, IDIOMA_TTS))
+
+        inicio = time.perf_counter()
+        futuros = tts.sintetizar_em_trechos(str(texto), sintetizar, pool_tts())
+        st.audio(futuros[0].result(), format=motor.formato, autoplay=True)
+        registrar_latencia("áudio: primeiro trecho", time.perf_counter() - inicio)
+
+        if len(futuros) > 1:
+            with st.spinner("Preparando o restante da narração..."):
+                restante = tts.juntar_audios([f.result() for f in futuros[1:]], motor.formato)
+            st.caption("Continuação:")
+            st.audio(restante, format=motor.formato)
+            registrar_latencia("áudio: narração completa", time.perf_counter() - inicio)
     except Exception as e:
         st.error(f"Erro ao gerar áudio: {e}")
 
 
 # -------------------- Login (versão Juliana) --------------------
+# Falhas de login e de MFA são limitadas por (usuário, cliente) e, com uma
+# capacidade maior, por usuário vindo de qualquer cliente, em baldes de fichas
+# compartilhados pelo processo; o bloqueio é respondido na hora, sem sleep.
+# X-Forwarded-For só é lido quando a conexão vem de um proxy listado em
+# PREDIMOVEIS_PROXIES_CONFIAVEIS (IPs ou redes, separados por vírgula).
+LOGIN_TENTATIVAS = int(os.environ.get("PREDIMOVEIS_LOGIN_TENTATIVAS", "5"))
+LOGIN_TENTATIVAS_USUARIO = int(os.environ.get("PREDIMOVEIS_LOGIN_TENTATIVAS_USUARIO", "20"))
+LOGIN_INTERVALO_S = float(os.environ.get("PREDIMOVEIS_LOGIN_INTERVALO_S", "60"))
+PROXIES_CONFIAVEIS = limite_login.redes_confiaveis(os.environ.get("PREDIMOVEIS_PROXIES_CONFIAVEIS", ""))
+
+
+MFA_DB = os.environ.get("PREDIMOVEIS_MFA_DB", os.path.join(HERE, ".dados", "mfa.sqlite3"))
+
+
+@st.cache_resource(show_spinner=False)
+def limitador_login():
+    return LimitadorTentativas(LOGIN_TENTATIVAS, LOGIN_INTERVALO_S)
+
+
+@st.cache_resource(show_spinner=False)
+def limitador_login_usuario():
+    return LimitadorTentativas(LOGIN_TENTATIVAS_USUARIO, LOGIN_INTERVALO_S)
+
+
+@st.cache_resource(show_spinner=False)
+def cofre_mfa():
+    return CofreMFA(MFA_DB)
+
+
+def cliente_atual():
+    """Identifica o cliente (IP; atrás de proxies confiáveis, pelo X-Forwarded-For)."""
+    try:
+        ip = st.context.ip_address
+        encaminhado = st.context.headers.get("X-Forwarded-For")
+        ip = limite_login.cliente_real(
+            ip if isinstance(ip, str) else None, encaminhado if isinstance(encaminhado, str) else None, PROXIES_CONFIAVEIS
+        )
+        return ip or "desconhecido"
+    except Exception:
+        return "desconhecido"
+
+
+def bloqueio_login(usuario):
+    """Estado do bloqueio de `usuario` neste cliente: o mais longo entre o do par e o do usuário."""
+    estados = [
+        limitador_login().verificar((usuario, cliente_atual())),
+        limitador_login_usuario().verificar(usuario),
+    ]
+    return max(estados, key=lambda e: (e["bloqueado"], e["espera_s"]))
+
+
+def registrar_login(usuario, sucesso):
+    if sucesso:
+        # Só o par é zerado: o balde do usuário esvazia pelo tempo, senão um login
+        # legítimo devolveria as tentativas de quem ataca de outros clientes.
+        limitador_login().registrar_sucesso((usuario, cliente_atual()))
+    else:
+        limitador_login().registrar_falha((usuario, cliente_atual()))
+        limitador_login_usuario().registrar_falha(usuario)
+
+
+def mostrar_bloqueio(bloqueio):
+    st.markdown(
+        '<div class="custom-message error-message">⏳ Muitas tentativas sem sucesso. '
+        f'Tente novamente em {int(bloqueio["espera_s"]) + 1} s.</div>',
+        unsafe_allow_html=True
+    )
+
+
 def mostrar_login():
     if "auth" not in st.session_state:
         st.session_state["auth"] = False
@@ -118,15 +253,18 @@ def mostrar_login():
             entrar = st.form_submit_button("Entrar")
 
         if entrar:
-            if usuario == "admin" and senha == "admin":
+            bloqueio = bloqueio_login(usuario)
+            if bloqueio["bloqueado"]:
+                mostrar_bloqueio(bloqueio)
+            elif usuario == "admin" and senha == "admin":
+                registrar_login(usuario, sucesso=True)
                 st.session_state["basic_auth"] = True
-                st.markdown(
-                    '<div class="custom-message success-message">✅ Login básico realizado! Agora configure o MFA.</div>',
-                    unsafe_allow_html=True
-                )
-                time.sleep(2)
+                st.session_state["usuario"] = usuario
+                # A mensagem aparece na tela do MFA, sem segurar a thread antes do rerun.
+                st.session_state["mensagem_login"] = "✅ Login básico realizado! Agora configure o MFA."
                 st.rerun()
             else:
+                registrar_login(usuario, sucesso=False)
                 st.markdown(
                     '<div class="custom-message error-message">❌ Usuário ou senha incorretos.</div>',
                     unsafe_allow_html=True
@@ -134,6 +272,10 @@ def mostrar_login():
 
     # MFA (só se basic_auth e não auth)
     if st.session_state["basic_auth"] and not st.session_state["auth"]:
+        mensagem = st.session_state.pop("mensagem_login", None)
+        if mensagem:
+            st.markdown(f'<div class="custom-message success-message">{mensagem}</div>', unsafe_allow_html=True)
+
         st.markdown(
             """
             <div style="display:flex; justify-content:center; align-items:center;">
@@ -143,30 +285,24 @@ def mostrar_login():
             unsafe_allow_html=True
         )
 
-        # Garante que o segredo exista
-        if "user_secret" not in st.session_state:
-            st.session_state.user_secret = pyotp.random_base32()
-
-        totp = pyotp.TOTP(st.session_state.user_secret)
-        uri = totp.provisioning_uri(
-            name="admin@example.com",
-            issuer_name="PredImóveis"
-        )
-
-        qr = qrcode.make(uri)
-        buf = BytesIO()
-        qr.save(buf, format="PNG")
-        buf.seek(0)
-
-        # Centraliza QR
-        col_esq, col_centro, col_dir = st.columns([1, 2, 1])
-        with col_centro:
-            st.image(
-                Image.open(buf),
-                caption="📱 Escaneie no app (ex: 2FAS, Google Authenticator)",
-                width=180,
-            )
-            st.markdown("<br>", unsafe_allow_html=True)
+        # Segredo e QR persistidos por usuário: quem já cadastrou não vê o QR de novo,
+        # e o PNG é renderizado uma única vez por segredo.
+        usuario = st.session_state.get("usuario", "admin")
+        cadastro = cofre_mfa().obter_ou_cadastrar(usuario)
+        totp = pyotp.TOTP(cadastro["segredo"])
+
+        if not cadastro["confirmado"]:
+            # Centraliza QR
+            col_esq, col_centro, col_dir = st.columns([1, 2, 1])
+            with col_centro:
+                st.image(
+                    cadastro["qr_png"],
+                    caption="📱 Escaneie no app (ex: 2FAS, Google Authenticator)",
+                    width=180,
+                )
+                st.markdown("<br>", unsafe_allow_html=True)
+        else:
+            st.caption("Digite o código do seu app autenticador (cadastro MFA já realizado).")
 
         # Form para MFA
         with st.form("mfa_form"):
@@ -174,13 +310,17 @@ def mostrar_login():
             verificar = st.form_submit_button("Verificar MFA")
 
             if verificar:
-                if totp.verify(otp):
+                bloqueio = bloqueio_login("mfa:" + usuario)
+                if bloqueio["bloqueado"]:
+                    mostrar_bloqueio(bloqueio)
+                elif totp.verify(otp):
+                    registrar_login("mfa:" + usuario, sucesso=True)
+                    cofre_mfa().confirmar(usuario)
                     st.session_state["auth"] = True
-                    st.success("✅ Login MFA verificado com sucesso!")
-                    time.sleep(2)
+                    st.session_state["mensagem_login"] = "✅ Login MFA verificado com sucesso!"
                     st.rerun()
                 else:
-                    time.sleep(2)
+                    registrar_login("mfa:" + usuario, sucesso=False)
                     st.error("❌ Código inválido. Tente novamente.")
 
 
@@ -241,16 +381,64 @@ def detectar_coluna_preco(cols):
     return None
 
 
-# -------------------- Dados históricos --------------------
-@st.cache_data(show_spinner=False)
-def carregar_dados_historicos():
-    if not os.path.exists(CSV_PATH):
-        st.error("❌ O arquivo 'csv_unico.csv' não foi encontrado na pasta do projeto.")
-        return pd.DataFrame()
+# -------------------- Bases compartilhadas (somente leitura) --------------------
+def congelar(df):
+    """Versão de `df` com os arrays somente leitura.
+
+    As bases ficam em `st.cache_resource` e são o mesmo objeto para todas as
+    sessões: qualquer escrita acidental nelas passa a falhar em vez de vazar
+    para os outros usuários.
+
+    O frame é remontado coluna a coluna sobre os mesmos arrays (sem cópia);
+    colunas de tipos do pandas (categorias etc.) ficam como estão.
+    """
+    colunas = {}
+    for coluna in df.columns:
+        serie = df[coluna]
+        if isinstance(serie.dtype, np.dtype):
+            valores = serie.to_numpy()
+            valores.flags.writeable = False
+            colunas[coluna] = valores
+        else:
+            colunas[coluna] = serie.array
+    return pd.DataFrame(colunas, index=df.index, copy=False)
+
+
+def montar_indice_series(df):
+    """Posições [início, fim) de cada (cidade, tipo_mercado) em um frame ordenado por série e data.
+
+    Levanta ValueError se as linhas de uma série não forem contíguas ou se as
+    datas voltarem dentro de uma série: as fatias sairiam erradas.
+    """
+    if df.empty:
+        return {}
+    grupos = df.groupby(["cidade", "tipo_mercado"], sort=False, observed=True).indices
+    indice = {}
+    for (cidade, mercado), pos in grupos.items():
+        ini, fim = int(pos[0]), int(pos[-1]) + 1
+        if fim - ini != len(pos):
+            raise ValueError("frame não está ordenado por cidade, tipo_mercado e data")
+        indice[(str(cidade), str(mercado))] = (ini, fim)
+    if "data" in df.columns:
+        datas = df["data"].to_numpy()
+        inicios = {ini for ini, _ in indice.values()}
+        if any(int(p) not in inicios for p in np.flatnonzero(datas[1:] < datas[:-1]) + 1):
+            raise ValueError("frame não está ordenado por cidade, tipo_mercado e data")
+    return indice
+
+
+def fatia_serie(df, indice, cidade, mercado):
+    """View (sem cópia) das linhas de uma série, a partir do índice de posições."""
+    ini, fim = indice.get((str(cidade), str(mercado)), (0, 0))
+    return df.iloc[ini:fim]
 
+
+# -------------------- Dados históricos --------------------
+def ler_dados_historicos(caminho=CSV_PATH):
+    """Lê e normaliza o CSV histórico (sem depender de uma sessão Streamlit)."""
     try:
         df = pd.read_csv(
-            CSV_PATH,
+            caminho,
             sep=None,
             engine="python",
             encoding="utf-8",
@@ -258,7 +446,7 @@ def carregar_dados_historicos():
         )
     except UnicodeDecodeError:
         df = pd.read_csv(
-            CSV_PATH,
+            caminho,
             sep=None,
             engine="python",
             encoding="latin-1",
@@ -302,8 +490,36 @@ def carregar_dados_historicos():
     return df[["data", "cidade", "tipo_mercado", "preco_m2"]]
 
 
+@metricas.cronometrado
+@metricas.cache_medido(st.cache_resource(show_spinner=False))
+def carregar_dados_historicos():
+    if not os.path.exists(CSV_PATH):
+        st.error("❌ O arquivo 'csv_unico.csv' não foi encontrado na pasta do projeto.")
+        return pd.DataFrame()
+
+    return congelar(ler_dados_historicos(CSV_PATH))
+
+
 # -------------------- Previsões SARIMA --------------------
-@st.cache_resource(show_spinner=False)
+def preparar_snapshot(pacote):
+    """Nova versão do snapshot SARIMA com datas convertidas e tabelas ordenadas por série.
+
+    O dicionário recebido não é alterado; as tabelas do resultado são congeladas.
+    """
+    pacote = dict(pacote)
+    for chave in ("previsoes_futuras", "historico_real"):
+        tabela = pacote.get(chave)
+        if not isinstance(tabela, pd.DataFrame):
+            continue
+        tabela = tabela.assign(data=pd.to_datetime(tabela["data"], errors="coerce"))
+        if {"cidade", "tipo_mercado"} <= set(tabela.columns):
+            tabela = tabela.sort_values(["cidade", "tipo_mercado", "data"], kind="stable").reset_index(drop=True)
+        pacote[chave] = congelar(tabela)
+    return pacote
+
+
+@metricas.cronometrado
+@metricas.cache_medido(st.cache_resource(show_spinner=False))
 def carregar_snapshot_previsoes():
     if not os.path.exists(JOBLIB_PATH):
         return None
@@ -314,17 +530,67 @@ def carregar_snapshot_previsoes():
         st.error(f"❌ Erro lendo o arquivo modelos_sarima.joblib: {e}")
         return None
 
-    if "previsoes_futuras" in pacote and isinstance(pacote["previsoes_futuras"], pd.DataFrame):
-        pacote["previsoes_futuras"]["data"] = pd.to_datetime(
-            pacote["previsoes_futuras"]["data"], errors="coerce"
-        )
+    return preparar_snapshot(pacote)
 
-    if "historico_real" in pacote and isinstance(pacote.get("historico_real"), pd.DataFrame):
-        pacote["historico_real"]["data"] = pd.to_datetime(
-            pacote["historico_real"]["data"], errors="coerce"
-        )
 
-    return pacote
+# -------------------- Memória compartilhada entre processos --------------------
+# Com PREDIMOVEIS_SHM_DIR definido, cada processo do Streamlit mapeia as tabelas
+# publicadas por `python memoria_compartilhada.py publicar` em vez de manter
+# uma cópia própria da base histórica e do snapshot.
+SHM_DIR = os.environ.get("PREDIMOVEIS_SHM_DIR")
+
+
+@metricas.cache_medido(st.cache_resource(show_spinner=False))
+def carregar_bases_compartilhadas():
+    return memoria_compartilhada.mapear(SHM_DIR)
+
+
+def carregar_bases():
+    """Retorna (df_hist, pacote_prev), mapeados da memória compartilhada quando publicados."""
+    if SHM_DIR and memoria_compartilhada.publicado(SHM_DIR):
+        try:
+            return carregar_bases_compartilhadas()
+        except Exception as e:
+            st.warning(f"⚠ Falha ao mapear a memória compartilhada ({e}). Usando cópia local.")
+    return carregar_dados_historicos(), carregar_snapshot_previsoes()
+
+
+@metricas.cache_medido(st.cache_resource(show_spinner=False))
+def versao_dados():
+    """Identificador da versão da base histórica e do snapshot carregados neste processo.
+
+    As bases ficam em cache pela vida do processo, então a versão é calculada
+    uma vez, a partir do manifesto publicado ou do tamanho/mtime dos arquivos.
+    """
+    if SHM_DIR and memoria_compartilhada.publicado(SHM_DIR):
+        partes = [os.path.getmtime(os.path.join(SHM_DIR, memoria_compartilhada.MANIFESTO))]
+        return hashlib.sha1(repr(partes).encode()).hexdigest()[:12]
+    return versao_arquivos(CSV_PATH, JOBLIB_PATH)
+
+
+def versao_arquivos(*caminhos):
+    """Resumo do tamanho/mtime dos arquivos existentes entre `caminhos`."""
+    partes = []
+    for caminho in caminhos:
+        if os.path.exists(caminho):
+            info = os.stat(caminho)
+            partes += [info.st_size, info.st_mtime_ns]
+    return hashlib.sha1(repr(partes).encode()).hexdigest()[:12]
+
+
+@metricas.cache_medido(st.cache_resource(show_spinner=False))
+def derivados_bases():
+    """Estruturas derivadas calculadas uma vez por processo: índices de séries e coluna de ano."""
+    df_hist, pacote = carregar_bases()
+    derivados = {
+        "historico": montar_indice_series(df_hist),
+        "ano": df_hist["data"].dt.year if not df_hist.empty else pd.Series(dtype="int32"),
+    }
+    for chave in ("previsoes_futuras", "historico_real"):
+        tabela = pacote.get(chave) if pacote is not None else None
+        if isinstance(tabela, pd.DataFrame) and {"cidade", "tipo_mercado"} <= set(tabela.columns):
+            derivados[chave] = montar_indice_series(tabela)
+    return derivados
 
 
 # -------------------- Acessibilidade: textos das seções --------------------
@@ -372,230 +638,60 @@ def texto_relatorio_acessivel(texto_resumo, resumo_kpis):
     return " ".join(partes)
 
 
-# -------------------- Aba 1: histórico --------------------
-def painel_dashboard(df_hist):
-    st.header("📊 Visão Histórica do Mercado Imobiliário")
-    st.caption("Evolução do preço médio (R$/m²) ao longo do tempo, por cidade e tipo de mercado.")
-
-    if df_hist.empty:
-        st.warning("⚠ Ainda não consegui montar a base histórica. Veja avisos acima 👆.")
-        return
-
-    cidades = sorted(df_hist["cidade"].unique())
-    mercados = sorted(df_hist["tipo_mercado"].unique())
-
-    col1, col2 = st.columns(2)
-    with col1:
-        cidade_sel = st.selectbox("Cidade:", cidades)
-    with col2:
-        mercado_sel = st.selectbox("Tipo de Mercado:", mercados)
-
-    base = df_hist[
-        (df_hist["cidade"] == cidade_sel) &
-        (df_hist["tipo_mercado"] == mercado_sel)
-    ].copy()
-
-    if base.empty:
-        st.warning("Sem dados para esse filtro.")
-        return
-
-    if st.button("🎧 Ouvir explicação desta seção"):
-        ler_texto_em_voz_alta(texto_dashboard_acessivel(base, cidade_sel, mercado_sel))
-
-    fig = px.line(
-        base,
-        x="data",
-        y="preco_m2",
-        title=f"{cidade_sel} — {mercado_sel} (Histórico R$/m²)",
-        markers=True,
-        line_shape="spline",
-        labels={"data": "Data", "preco_m2": "Preço (R$/m²)"}
-    )
-    st.plotly_chart(fig, use_container_width=True)
-
-    with st.expander("📋 Ver dados brutos"):
-        st.dataframe(base.sort_values("data").reset_index(drop=True))
-
-
-# -------------------- Aba 2: previsões --------------------
-def painel_previsoes(pacote):
-    st.header("🤖 Previsões de Preço Futuro")
-    st.caption("Projeções SARIMA até 2028, baseadas em dados históricos consolidados.")
-
-    if pacote is None or "previsoes_futuras" not in pacote:
-        st.error("⚠ Nenhuma previsão disponível. Verifique se o arquivo modelos_sarima.joblib está correto.")
-        return
-
-    previsoes = pacote["previsoes_futuras"].copy()
-    historico = pacote.get("historico_real", None)
-    info = pacote.get("info", {})
-    ultima_data_hist = pd.to_datetime(info.get("ultima_data_historica", None), errors="coerce")
-
-    cidades = sorted(previsoes["cidade"].unique())
-    mercados = sorted(previsoes["tipo_mercado"].unique())
-
-    col1, col2 = st.columns(2)
-    with col1:
-        cidade_sel = st.selectbox("Cidade (previsão):", cidades)
-    with col2:
-        mercado_sel = st.selectbox("Tipo de Mercado (previsão):", mercados)
-
-    fut = previsoes[
-        (previsoes["cidade"] == cidade_sel) &
-        (previsoes["tipo_mercado"] == mercado_sel)
-    ].copy()
-    fut = fut.sort_values("data")
-
-    linhas = []
-
-    if isinstance(historico, pd.DataFrame):
-        hist = historico[
-            (historico["cidade"] == cidade_sel) &
-            (historico["tipo_mercado"] == mercado_sel)
-        ].copy()
-
-        if not hist.empty:
-            hist = hist.rename(columns={"preco_real": "valor"})
-            hist["Serie"] = "Histórico Real"
-            linhas.append(hist[["data", "valor", "Serie"]])
-
-    fut_plot = fut.rename(columns={"preco_previsto": "valor"})
-    fut_plot["Serie"] = "Previsão SARIMA"
-    linhas.append(fut_plot[["data", "valor", "Serie"]])
-
-    df_plot = pd.concat(linhas, ignore_index=True)
-
-    if st.button("🎧 Ouvir explicação das previsões"):
-        ler_texto_em_voz_alta(texto_previsoes_acessivel(fut, cidade_sel, mercado_sel, ultima_data_hist))
-
-    fig = px.line(
-        df_plot,
-        x="data",
-        y="valor",
-        color="Serie",
-        markers=True,
-        labels={"data": "Data", "valor": "Preço (R$/m²)"},
-        title=f"{cidade_sel} — {mercado_sel} (Histórico + Projeção)"
+def texto_comparacao_acessivel(series, normalizado):
+    if not series:
+        return "Nenhuma série escolhida para comparar."
+    variacoes = sorted(
+        ((s["valor"][-1] / s["valor"][0] - 1) * 100, s["rotulo"]) for s in series if s["valor"][0] != 0
     )
-
-    if pd.notnull(ultima_data_hist):
-        fig.add_shape(
-            type="line",
-            x0=ultima_data_hist,
-            x1=ultima_data_hist,
-            y0=0,
-            y1=1,
-            yref="paper",
-            line=dict(color="gray", dash="dot", width=2)
-        )
-        fig.add_annotation(
-            x=ultima_data_hist,
-            y=1,
-            yref="paper",
-            text="Início da projeção",
-            showarrow=False,
-            xanchor="left",
-            yanchor="top"
+    unidade = "índice com base 100 na data-base" if normalizado else "preço em reais por metro quadrado"
+    texto = f"Comparação de {len(series)} séries, em {unidade}. "
+    if variacoes:
+        menor, maior = variacoes[0], variacoes[-1]
+        texto += (
+            f"A maior variação no período foi de {maior[1]}: {maior[0]:.1f} por cento. "
+            f"A menor foi de {menor[1]}: {menor[0]:.1f} por cento."
         )
+    return texto
 
-    st.plotly_chart(fig, use_container_width=True)
-
-    st.markdown("#### Próximos 6 meses estimados")
-    preview = fut[["data", "preco_previsto"]].tail(6).rename(columns={
-        "data": "Data",
-        "preco_previsto": "Preço Previsto (R$/m²)"
-    })
-    st.dataframe(preview.reset_index(drop=True))
-
-
-# -------------------- PDF --------------------
-def gerar_pdf_relatorio(cidade, mercado, df_base, resumo_kpis, texto_resumo):
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-
-    pdf.set_font("Arial", "B", 16)
-    pdf.cell(0, 10, "Relatorio de Acompanhamento - Mercado Imobiliario", ln=True)
 
-    pdf.ln(5)
-    pdf.set_font("Arial", "", 12)
-    pdf.cell(0, 8, f"Cidade: {cidade}", ln=True)
-    pdf.cell(0, 8, f"Tipo de mercado: {mercado}", ln=True)
+# -------------------- Relatório: indicadores e textos --------------------
+PERIODOS_RELATORIO = ["Completo", "Últimos 12 meses", "Últimos 24 meses"]
 
-    pdf.ln(6)
-    pdf.set_font("Arial", "B", 13)
-    pdf.cell(0, 8, "Resumo executivo:", ln=True)
 
-    pdf.ln(2)
-    pdf.set_font("Arial", "", 11)
-    pdf.multi_cell(0, 6, texto_resumo)
+def formata_valor(v):
+    return f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
-    pdf.ln(4)
-    pdf.set_font("Arial", "B", 13)
-    pdf.cell(0, 8, "Indicadores principais:", ln=True)
 
-    pdf.set_font("Arial", "", 11)
-    for nome, valor in resumo_kpis.items():
-        pdf.cell(0, 7, f"- {nome}: {valor}", ln=True)
+def recortar_periodo(base, periodo):
+    if not base["data"].is_monotonic_increasing:
+        base = base.sort_values("data")
 
-    pdf.ln(5)
-    pdf.set_font("Arial", "B", 13)
-    pdf.cell(0, 8, "Ultimas observacoes:", ln=True)
+    if periodo != "Completo":
+        max_data = base["data"].iloc[-1]
+        meses = 12 if periodo == "Últimos 12 meses" else 24
+        corte = max_data - pd.DateOffset(months=meses)
+        # Série ordenada: o recorte é um iloc contíguo (view), não uma máscara booleana.
+        base = base.iloc[base["data"].searchsorted(corte):]
 
-    pdf.set_font("Arial", "", 10)
-    df_tab = df_base.sort_values("data").tail(12).copy()
-    df_tab["data_str"] = df_tab["data"].dt.strftime("%d/%m/%Y")
+    return base
 
-    for _, row in df_tab.iterrows():
-        linha = f"{row['data_str']} - R$/m2: {row['preco_m2']:.2f}"
-        pdf.cell(0, 6, linha, ln=True)
 
-    result = pdf.output(dest="S")
-    if isinstance(result, str):
-        return result.encode("latin-1")
+def faixas_de_preco(precos):
+    if precos.nunique() >= 4:
+        cat = pd.qcut(precos, q=4, duplicates="drop")
+    elif precos.nunique() >= 2:
+        cat = pd.cut(precos, bins=3, include_lowest=True)
     else:
-        return bytes(result)
-
-
-# -------------------- Aba 3: dashboards + relatório --------------------
-def painel_relatorios(df_hist):
-    st.header("📑 Análise Exploratória por Cidade + Relatório em PDF")
-    st.caption("Dashboards exploratórios e relatório automático em PDF.")
-
-    if df_hist.empty:
-        st.warning("⚠ Ainda não há dados históricos suficientes para montar o relatório.")
-        return
-
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        cidade_sel = st.selectbox("Cidade:", sorted(df_hist["cidade"].unique()), key="rel_cidade")
-    with col2:
-        mercado_sel = st.selectbox("Tipo de mercado:", sorted(df_hist["tipo_mercado"].unique()), key="rel_mercado")
-    with col3:
-        periodo = st.selectbox(
-            "Período:",
-            ["Completo", "Últimos 12 meses", "Últimos 24 meses"],
-            index=1,
-            key="rel_periodo"
-        )
+        cat = pd.Series(["Valor único"] * len(precos), index=precos.index)
+    return cat.astype(str)
 
-    base = df_hist[
-        (df_hist["cidade"] == cidade_sel) &
-        (df_hist["tipo_mercado"] == mercado_sel)
-    ].copy()
 
-    if base.empty:
-        st.warning("Sem dados para esse filtro.")
-        return
-
-    base = base.sort_values("data")
-
-    if periodo != "Completo":
-        max_data = base["data"].max()
-        meses = 12 if periodo == "Últimos 12 meses" else 24
-        corte = max_data - pd.DateOffset(months=meses)
-        base = base[base["data"] >= corte]
+def calcular_indicadores_relatorio(base, cidade_sel, mercado_sel, ano=None):
+    """KPIs, faixas de preço e textos explicativos do relatório para a série já recortada.
 
+    `ano` pode vir pré-calculado (alinhado ao índice de `base`) das estruturas derivadas.
+    """
     atual = base["preco_m2"].iloc[-1]
     inicial = base["preco_m2"].iloc[0]
     media = base["preco_m2"].mean()
@@ -606,9 +702,6 @@ def painel_relatorios(df_hist):
     variacao_abs = atual - inicial
     variacao_pct = (variacao_abs / inicial * 100) if inicial != 0 else 0
 
-    def formata_valor(v):
-        return f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
     preco_medio_str = formata_valor(media)
     preco_atual_str = formata_valor(atual)
     variacao_pct_str = f"{variacao_pct:,.1f}".replace(",", "X").replace(".", ",").replace("X", ".")
@@ -616,27 +709,10 @@ def painel_relatorios(df_hist):
     valor_inicial_limpo = formata_valor(inicial)
     valor_atual_limpo = preco_medio_str if variacao_pct == 0 else preco_atual_str
 
-    col_kpi1, col_kpi2, col_kpi3 = st.columns(3)
-    col_kpi1.metric("Preço atual (R$/m²)", preco_atual_str)
-    col_kpi2.metric("Média no período (R$/m²)", preco_medio_str)
-    col_kpi3.metric(
-        "Variação acumulada",
-        f"{variacao_pct_str}%",
-        formata_valor(variacao_abs)
-    )
-
     # faixas de preço
-    if base["preco_m2"].nunique() >= 4:
-        cat = pd.qcut(base["preco_m2"], q=4, duplicates="drop")
-    elif base["preco_m2"].nunique() >= 2:
-        cat = pd.cut(base["preco_m2"], bins=3, include_lowest=True)
-    else:
-        cat = pd.Series(["Valor único"] * len(base), index=base.index)
-
-    base["faixa_preco"] = cat
-    base["faixa_preco_str"] = base["faixa_preco"].astype(str)
+    faixa_preco_str = faixas_de_preco(base["preco_m2"])
 
-    vc_faixa = base["faixa_preco_str"].value_counts()
+    vc_faixa = faixa_preco_str.value_counts()
     faixa_dominante_existe = not vc_faixa.empty
     perc_dom = float(vc_faixa.iloc[0] / vc_faixa.sum() * 100) if faixa_dominante_existe else 0.0
     perc_dom_str = f"{perc_dom:,.1f}".replace(",", "X").replace(".", ",").replace("X", ".")
@@ -686,66 +762,19 @@ def painel_relatorios(df_hist):
         "apoiar decisões de reajuste de contratos, negociação de valores e planejamento de investimentos futuros."
     )
 
-    if st.button("🎧 Ouvir resumo desta seção"):
-        resumo_kpis_tmp = {
-            "Preço atual (R$/m²)": f"R$ {preco_atual_str}",
-            "Média no período": f"R$ {preco_medio_str}",
-            "Variação acumulada": f"{variacao_pct_str}%",
-        }
-        ler_texto_em_voz_alta(texto_relatorio_acessivel(texto_resumo, resumo_kpis_tmp))
-
-    st.markdown("### 📝 Resumo em texto corrido")
-    st.text(texto_resumo)
-
-    # gráficos
-    st.markdown("### 📈 Tendência no período selecionado")
-    fig_linha = px.line(
-        base,
-        x="data",
-        y="preco_m2",
-        markers=True,
-        line_shape="spline",
-        labels={"data": "Data", "preco_m2": "Preço (R$/m²)"},
-        title=f"Evolução do preço — {cidade_sel} / {mercado_sel}"
-    )
-    st.plotly_chart(fig_linha, use_container_width=True)
-
     texto_linha = (
         f"No gráfico de linha acima, cada ponto representa o preço médio do metro quadrado em um mês. "
         f"Quando a linha sobe, significa que os preços ficaram mais altos; quando desce, que eles recuaram. "
         f"Nesta cidade, no período analisado, saímos de um valor próximo de R$ {valor_inicial_limpo} e chegamos a cerca de R$ {valor_atual_limpo}, "
         f"o que reforça {sentido}."
     )
-    st.caption(f'<p style="font-size: 0.875rem">{texto_linha}</p>', unsafe_allow_html=True)
 
-    base["ano"] = base["data"].dt.year
-    por_ano = base.groupby("ano")["preco_m2"].mean().reset_index()
-    mediana_ano = base.groupby("ano")["preco_m2"].median().reset_index(name="mediana")
+    if ano is None:
+        ano = base["data"].dt.year
+    por_ano = base["preco_m2"].groupby(ano).mean().rename_axis("ano").reset_index()
+    mediana_ano = base["preco_m2"].groupby(ano).median().rename_axis("ano").reset_index(name="mediana")
     ano_mais_caro = int(por_ano.loc[por_ano["preco_m2"].idxmax(), "ano"])
     ano_mais_barato = int(por_ano.loc[por_ano["preco_m2"].idxmin(), "ano"])
-
-    col_g1, col_g2 = st.columns(2)
-    with col_g1:
-        fig_bar_ano = px.bar(
-            por_ano,
-            x="ano",
-            y="preco_m2",
-            labels={"ano": "Ano", "preco_m2": "Preço médio (R$/m²)"},
-            title="Preço médio por ano"
-        )
-        st.plotly_chart(fig_bar_ano, use_container_width=True)
-
-    with col_g2:
-        fig_box = px.box(
-            base,
-            x="ano",
-            y="preco_m2",
-            points="all",
-            labels={"ano": "Ano", "preco_m2": "Preço (R$/m²)"},
-            title="Distribuição dos preços por ano"
-        )
-        st.plotly_chart(fig_box, use_container_width=True)
-
     med_mais_caro = mediana_ano.loc[mediana_ano["ano"] == ano_mais_caro, "mediana"].iloc[0]
     med_mais_barato = mediana_ano.loc[mediana_ano["ano"] == ano_mais_barato, "mediana"].iloc[0]
 
@@ -761,42 +790,1336 @@ def painel_relatorios(df_hist):
         "Caixas mais altas indicam anos mais caros; caixas mais baixas indicam anos mais baratos. "
         "Os pontos que aparecem fora da caixa são meses que fugiram do padrão, funcionando como valores mais extremos."
     )
-    st.markdown(f"**Como interpretar esses dois gráficos:** {texto_ano} {texto_box}")
-
-    # pizza + barras por faixa
-    st.markdown("### 🔍 Análise exploratória da distribuição de preços")
-    col_p1, col_p2 = st.columns(2)
-    with col_p1:
-        fig_pizza = px.pie(
-            base,
-            names="faixa_preco_str",
-            title="Distribuição de observações por faixa de preço (R$/m²)",
-            hole=0.35,
-        )
-        st.plotly_chart(fig_pizza, use_container_width=True)
-
-    with col_p2:
-        contagem_faixas = base["faixa_preco_str"].value_counts().reset_index()
-        contagem_faixas.columns = ["faixa_preco_str", "qtd"]
-        fig_barras_faixa = px.bar(
-            contagem_faixas,
-            x="faixa_preco_str",
-            y="qtd",
-            labels={
-                "faixa_preco_str": "Faixa de preço (R$/m²)",
-                "qtd": "Número de observações"
-            },
-            title="Número de observações por faixa de preço",
-        )
-        st.plotly_chart(fig_barras_faixa, use_container_width=True)
-
     texto_faixas = (
         "Na pizza e no gráfico de barras, cada fatia representa um intervalo de preços. "
         "As faixas com barras maiores são aquelas onde aparecem mais contratos. "
         f"No período analisado em {cidade_sel}, observamos que uma dessas faixas concentra cerca de {perc_dom_str}% "
         "de todas as observações, o que indica em qual nível de preço o mercado costuma se organizar."
     )
-    st.caption(texto_faixas)
+
+    resumo_kpis = {
+        "Preço atual (R$/m²)": f"R$ {preco_atual_str}",
+        "Média no período": f"R$ {preco_medio_str}",
+        "Mínimo no período": f"R$ {formata_valor(minimo)}",
+        "Máximo no período": f"R$ {formata_valor(maximo)}",
+        "Variação acumulada": f"{variacao_pct_str}%",
+    }
+    resumo_kpis_audio = {
+        "Preço atual (R$/m²)": f"R$ {preco_atual_str}",
+        "Média no período": f"R$ {preco_medio_str}",
+        "Variação acumulada": f"{variacao_pct_str}%",
+    }
+
+    return {
+        "preco_atual_str": preco_atual_str,
+        "preco_medio_str": preco_medio_str,
+        "variacao_pct_str": variacao_pct_str,
+        "variacao_abs_str": formata_valor(variacao_abs),
+        "faixa_preco_str": faixa_preco_str,
+        "ano": ano,
+        "por_ano": por_ano,
+        "texto_resumo": texto_resumo,
+        "texto_linha": texto_linha,
+        "texto_ano": texto_ano,
+        "texto_box": texto_box,
+        "texto_faixas": texto_faixas,
+        "resumo_kpis": resumo_kpis,
+        "resumo_kpis_audio": resumo_kpis_audio,
+    }
+
+
+# -------------------- Figuras --------------------
+# Séries longas (diárias, semanais) são reduzidas antes de ir para o Plotly:
+# cada traço leva no máximo PONTOS_GRAFICO pontos, mais ou menos a largura do
+# gráfico em pixels. Os valores brutos continuam nas tabelas dos expanders.
+PONTOS_GRAFICO = int(os.environ.get("PREDIMOVEIS_PONTOS_GRAFICO", "600"))
+
+
+def indices_lttb(x, y, n_pontos):
+    """Índices dos pontos escolhidos pelo Largest-Triangle-Three-Buckets.
+
+    Mantém o primeiro e o último ponto; o miolo é dividido em `n_pontos - 2`
+    baldes e de cada um fica o ponto que forma o maior triângulo com o ponto
+    escolhido no balde anterior e a média do balde seguinte. Picos e vales
+    sobrevivem, então o desenho da linha é preservado.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_pontos >= n or n_pontos < 3:
+        return np.arange(n)
+
+    # Bordas como no LTTB de referência (Steinarsson): floor(i * passo) + 1.
+    # O balde i vai de bordas[i] a bordas[i + 1]; o último segmento termina no ponto final.
+    passo = (n - 2) / (n_pontos - 2)
+    bordas = np.minimum(np.floor(np.arange(n_pontos) * passo).astype(np.int64) + 1, n)
+    # Média de cada segmento, de uma vez; a do balde seguinte ao balde i é a do segmento i + 1.
+    medias_x = np.add.reduceat(x, bordas[:-1]) / np.diff(bordas)
+    medias_y = np.add.reduceat(y, bordas[:-1]) / np.diff(bordas)
+    mx, my = medias_x[1:], medias_y[1:]
+    # Baldes lado a lado numa matriz (os menores repetem o próprio último ponto),
+    # para o laço só calcular a área da linha e escolher o máximo.
+    inicios, fins = bordas[:-2], bordas[1:-1]
+    pos = np.minimum(inicios[:, None] + np.arange((fins - inicios).max()), (fins - 1)[:, None])
+    xs, ys = x[pos], y[pos]
+
+    escolhidos = np.empty(n_pontos, dtype=np.int64)
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+    xa, ya = x[0], y[0]
+    for i in range(n_pontos - 2):
+        area = np.abs((xa - mx[i]) * (ys[i] - ya) - (xa - xs[i]) * (my[i] - ya))
+        a = pos[i, area.argmax()]
+        escolhidos[i + 1] = a
+        xa, ya = x[a], y[a]
+    return escolhidos
+
+
+def reduzir_serie(df, coluna_x="data", coluna_y="preco_m2", n_pontos=None):
+    """`df` com no máximo `n_pontos` linhas (padrão: PONTOS_GRAFICO), escolhidas por LTTB."""
+    n_pontos = PONTOS_GRAFICO if n_pontos is None else n_pontos
+    if len(df) <= n_pontos:
+        return df
+    x = df[coluna_x]
+    if pd.api.types.is_datetime64_any_dtype(x):
+        x = x.to_numpy().astype("datetime64[ns]").astype(np.int64)
+    return df.iloc[indices_lttb(x, df[coluna_y].to_numpy(), n_pontos)]
+
+
+def figura_historico(base, cidade_sel, mercado_sel):
+    return px.line(
+        reduzir_serie(base),
+        x="data",
+        y="preco_m2",
+        title=f"{cidade_sel} — {mercado_sel} (Histórico R$/m²)",
+        markers=True,
+        line_shape="spline",
+        labels={"data": "Data", "preco_m2": "Preço (R$/m²)"}
+    )
+
+
+def series_previsoes(pacote, cidade_sel, mercado_sel, indices=None):
+    """Série prevista, série histórica do snapshot e data de corte de um filtro.
+
+    Com `indices` (ver `derivados_bases`) as séries saem por fatia, sem máscara booleana.
+    """
+    previsoes = pacote["previsoes_futuras"]
+    historico = pacote.get("historico_real", None)
+    info = pacote.get("info", {})
+    ultima_data_hist = pd.to_datetime(info.get("ultima_data_historica", None), errors="coerce")
+
+    def filtrar(tabela, chave):
+        if indices is not None and chave in indices:
+            return fatia_serie(tabela, indices[chave], cidade_sel, mercado_sel)
+        return tabela[
+            (tabela["cidade"] == cidade_sel) &
+            (tabela["tipo_mercado"] == mercado_sel)
+        ].sort_values("data")
+
+    hist = filtrar(historico, "historico_real") if isinstance(historico, pd.DataFrame) else None
+    return {"fut": filtrar(previsoes, "previsoes_futuras"), "hist": hist, "ultima_data_hist": ultima_data_hist}
+
+
+def figura_previsoes(series, cidade_sel, mercado_sel):
+    fut, hist, ultima_data_hist = series["fut"], series["hist"], series["ultima_data_hist"]
+
+    linhas = []
+
+    if hist is not None and not hist.empty:
+        hist_plot = reduzir_serie(hist, coluna_y="preco_real")
+        linhas.append(pd.DataFrame({
+            "data": hist_plot["data"],
+            "valor": hist_plot["preco_real"],
+            "Serie": "Histórico Real",
+        }))
+
+    fut_plot = reduzir_serie(fut, coluna_y="preco_previsto")
+    linhas.append(pd.DataFrame({
+        "data": fut_plot["data"],
+        "valor": fut_plot["preco_previsto"],
+        "Serie": "Previsão SARIMA",
+    }))
+
+    df_plot = pd.concat(linhas, ignore_index=True)
+
+    fig = px.line(
+        df_plot,
+        x="data",
+        y="valor",
+        color="Serie",
+        markers=True,
+        labels={"data": "Data", "valor": "Preço (R$/m²)"},
+        title=f"{cidade_sel} — {mercado_sel} (Histórico + Projeção)"
+    )
+
+    if pd.notnull(ultima_data_hist):
+        fig.add_shape(
+            type="line",
+            x0=ultima_data_hist,
+            x1=ultima_data_hist,
+            y0=0,
+            y1=1,
+            yref="paper",
+            line=dict(color="gray", dash="dot", width=2)
+        )
+        fig.add_annotation(
+            x=ultima_data_hist,
+            y=1,
+            yref="paper",
+            text="Início da projeção",
+            showarrow=False,
+            xanchor="left",
+            yanchor="top"
+        )
+
+    return fig
+
+
+def figura_linha_relatorio(base, ind, cidade_sel, mercado_sel):
+    return px.line(
+        reduzir_serie(base),
+        x="data",
+        y="preco_m2",
+        markers=True,
+        line_shape="spline",
+        labels={"data": "Data", "preco_m2": "Preço (R$/m²)"},
+        title=f"Evolução do preço — {cidade_sel} / {mercado_sel}"
+    )
+
+
+def figura_barras_ano(base, ind, cidade_sel, mercado_sel):
+    return px.bar(
+        ind["por_ano"],
+        x="ano",
+        y="preco_m2",
+        labels={"ano": "Ano", "preco_m2": "Preço médio (R$/m²)"},
+        title="Preço médio por ano"
+    )
+
+
+# Outliers desenhados por ano no boxplot: os mais distantes da mediana.
+MAX_OUTLIERS_BOX = 50
+
+
+def figura_box_ano(base, ind, cidade_sel, mercado_sel):
+    """Boxplot por ano com quartis, bigodes e outliers já calculados no servidor.
+
+    O navegador recebe alguns números por ano, e não todas as observações: o
+    tamanho do gráfico não cresce com a quantidade de dados de cada ano.
+    """
+    # Ano vem das estruturas derivadas, sem acrescentar colunas à base.
+    box = estatisticas_boxplot(ind["ano"], base["preco_m2"])
+    anos = [e["grupo"] for e in box]
+    fig = go.Figure(go.Box(
+        x=anos,
+        q1=[e["q1"] for e in box],
+        median=[e["mediana"] for e in box],
+        q3=[e["q3"] for e in box],
+        lowerfence=[e["limite_inf"] for e in box],
+        upperfence=[e["limite_sup"] for e in box],
+        name="Preço (R$/m²)",
+        boxpoints=False,
+    ))
+    outliers = []
+    for e in box:
+        valores = np.asarray(e["outliers"], dtype=float)
+        extremos = valores[np.argsort(-np.abs(valores - e["mediana"]))[:MAX_OUTLIERS_BOX]]
+        outliers += [(e["grupo"], v) for v in extremos]
+    if outliers:
+        fig.add_trace(go.Scatter(
+            x=[a for a, _ in outliers],
+            y=[v for _, v in outliers],
+            mode="markers",
+            name="Outliers",
+        ))
+    fig.update_layout(
+        title="Distribuição dos preços por ano",
+        xaxis_title="Ano",
+        yaxis_title="Preço (R$/m²)",
+        showlegend=False,
+    )
+    return fig
+
+
+def figura_pizza_faixas(base, ind, cidade_sel, mercado_sel):
+    return px.pie(
+        names=ind["faixa_preco_str"].to_numpy(),
+        title="Distribuição de observações por faixa de preço (R$/m²)",
+        hole=0.35,
+    )
+
+
+def figura_barras_faixa(base, ind, cidade_sel, mercado_sel):
+    contagem_faixas = ind["faixa_preco_str"].value_counts().reset_index()
+    contagem_faixas.columns = ["faixa_preco_str", "qtd"]
+    return px.bar(
+        contagem_faixas,
+        x="faixa_preco_str",
+        y="qtd",
+        labels={
+            "faixa_preco_str": "Faixa de preço (R$/m²)",
+            "qtd": "Número de observações"
+        },
+        title="Número de observações por faixa de preço",
+    )
+
+
+# Gráficos do painel de relatórios, na ordem da tela.
+FIGURAS_RELATORIO = {
+    "linha": figura_linha_relatorio,
+    "barras_ano": figura_barras_ano,
+    "box": figura_box_ano,
+    "pizza": figura_pizza_faixas,
+    "barras_faixa": figura_barras_faixa,
+}
+
+
+def figuras_relatorio(base, ind, cidade_sel, mercado_sel):
+    return {tipo: construir(base, ind, cidade_sel, mercado_sel) for tipo, construir in FIGURAS_RELATORIO.items()}
+
+
+# -------------------- Comparação de séries --------------------
+# Dezenas de séries no mesmo gráfico: traços WebGL (scattergl), que o navegador
+# desenha na GPU, e no máximo PONTOS_COMPARACAO pontos por traço (LTTB).
+PONTOS_COMPARACAO = int(os.environ.get("PREDIMOVEIS_PONTOS_COMPARACAO", "2000"))
+
+
+def comparar_series(df, indice, pares, data_base=None):
+    """Séries dos pares (cidade, tipo_mercado) pedidos, cada uma por fatia do índice de posições.
+
+    Com `data_base`, os valores viram índice 100 no último ponto até essa data
+    (ou no primeiro ponto, se a série começar depois), como o Numero_Indice_Total.
+    Séries com valor zero ou ausente nesse ponto não têm índice e ficam de fora.
+    """
+    series = []
+    for cidade, mercado in pares:
+        base = fatia_serie(df, indice, cidade, mercado)
+        if base.empty:
+            continue
+        datas = base["data"].to_numpy()
+        valores = base["preco_m2"].to_numpy(dtype=float)
+        if data_base is not None:
+            pos = int(np.searchsorted(datas, np.datetime64(pd.Timestamp(data_base)), side="right")) - 1
+            referencia = valores[max(pos, 0)]
+            if not np.isfinite(referencia) or referencia == 0:
+                continue
+            valores = valores / referencia * 100
+        series.append({"rotulo": f"{cidade} — {mercado}", "data": datas, "valor": valores})
+    return series
+
+
+def figura_comparacao(series, normalizado):
+    tracos = []
+    for s in series:
+        idx = indices_lttb(s["data"].astype("datetime64[ns]").astype(np.int64), s["valor"], PONTOS_COMPARACAO)
+        tracos.append(go.Scattergl(x=s["data"][idx], y=s["valor"][idx], mode="lines", name=s["rotulo"]))
+    fig = go.Figure(data=tracos)
+    fig.update_layout(
+        title="Comparação entre séries" + (" (índice, data-base = 100)" if normalizado else " (R$/m²)"),
+        xaxis_title="Data",
+        yaxis_title="Índice (base = 100)" if normalizado else "Preço (R$/m²)",
+        legend_title="Série",
+        hovermode="x unified",
+    )
+    return fig
+
+
+# -------------------- Gráficos estáticos do PDF --------------------
+def estatisticas_boxplot(grupos, valores):
+    """Quartis, bigodes (1,5 × IQR) e outliers por grupo, calculados de uma vez com groupby."""
+    valores = pd.Series(np.asarray(valores, dtype=float))
+    grupos = pd.Series(np.asarray(grupos))
+    quartis = valores.groupby(grupos).quantile([0.25, 0.5, 0.75]).unstack()
+    quartis.columns = ["q1", "mediana", "q3"]
+    iqr = quartis["q3"] - quartis["q1"]
+    corte_inf = (quartis["q1"] - 1.5 * iqr).reindex(grupos).to_numpy()
+    corte_sup = (quartis["q3"] + 1.5 * iqr).reindex(grupos).to_numpy()
+
+    dentro = (valores.to_numpy() >= corte_inf) & (valores.to_numpy() <= corte_sup)
+    limites = valores[dentro].groupby(grupos[dentro]).agg(["min", "max"])
+    outliers = valores[~dentro].groupby(grupos[~dentro]).agg(list)
+
+    estatisticas = []
+    for grupo, linha in quartis.iterrows():
+        estatisticas.append({
+            "grupo": grupo,
+            "q1": linha["q1"],
+            "mediana": linha["mediana"],
+            "q3": linha["q3"],
+            "limite_inf": limites["min"].get(grupo, linha["q1"]),
+            "limite_sup": limites["max"].get(grupo, linha["q3"]),
+            "outliers": outliers.get(grupo, []),
+        })
+    return estatisticas
+
+
+def graficos_relatorio_png(base, ind, cidade_sel, mercado_sel, cache=None, chave=()):
+    """PNGs dos gráficos do painel de relatórios, na ordem da tela.
+
+    Com `cache` (um CacheLRU), cada imagem é guardada sob (tipo do gráfico,) + `chave`
+    e renderizada uma única vez por série e período.
+    """
+    contagem_faixas = ind["faixa_preco_str"].value_counts()
+
+    def boxplot():
+        # Estatísticas só quando a imagem é de fato renderizada (não em acertos do cache).
+        box = estatisticas_boxplot(ind["ano"], base["preco_m2"])
+        return graficos_estaticos.renderizar_boxplot([e["grupo"] for e in box], box, "Distribuição dos preços por ano")
+
+    renderizadores = [
+        ("linha", lambda: graficos_estaticos.renderizar_linha(
+            base["data"], base["preco_m2"], f"Evolução do preço — {cidade_sel} / {mercado_sel}")),
+        ("barras_ano", lambda: graficos_estaticos.renderizar_barras(
+            ind["por_ano"]["ano"], ind["por_ano"]["preco_m2"], "Preço médio por ano")),
+        ("box", boxplot),
+        ("pizza", lambda: graficos_estaticos.renderizar_pizza(
+            contagem_faixas.index, contagem_faixas.to_numpy(),
+            "Distribuição de observações por faixa de preço (R$/m²)")),
+        ("barras_faixa", lambda: graficos_estaticos.renderizar_barras(
+            contagem_faixas.index, contagem_faixas.to_numpy(), "Número de observações por faixa de preço")),
+    ]
+    if cache is None:
+        return [renderizar() for _, renderizar in renderizadores]
+    return [cache.obter_ou_gerar((tipo,) + tuple(chave), renderizar) for tipo, renderizar in renderizadores]
+
+
+# -------------------- PDF --------------------
+# O layout de um relatório é descrito uma vez, como lista de blocos, e desenhado
+# tanto pelo FPDF (relatório de uma série) quanto pelo `pdf_continuo` (consolidado).
+def linhas_observacoes(df_base, n=12):
+    """Últimas `n` observações como texto, montadas de forma vetorizada."""
+    df_tab = df_base.sort_values("data").tail(n)
+    linhas = (
+        df_tab["data"].dt.strftime("%d/%m/%Y")
+        + " - R$/m2: "
+        + df_tab["preco_m2"].map("{:.2f}".format)
+    )
+    return "\n".join(linhas)
+
+
+def blocos_relatorio_serie(cidade, mercado, df_base, resumo_kpis, texto_resumo, graficos=None):
+    """Layout do relatório de uma série, começando em página nova.
+
+    Blocos: ("pagina",), ("fonte", estilo, tamanho), ("celula", altura, texto),
+    ("multi", altura, texto), ("espaco", altura) e ("imagem", png, largura_mm).
+    """
+    blocos = [
+        ("pagina",),
+        ("fonte", "B", 16),
+        ("celula", 10, "Relatorio de Acompanhamento - Mercado Imobiliario"),
+        ("espaco", 5),
+        ("fonte", "", 12),
+        ("celula", 8, f"Cidade: {cidade}"),
+        ("celula", 8, f"Tipo de mercado: {mercado}"),
+        ("espaco", 6),
+        ("fonte", "B", 13),
+        ("celula", 8, "Resumo executivo:"),
+        ("espaco", 2),
+        ("fonte", "", 11),
+        ("multi", 6, texto_resumo),
+        ("espaco", 4),
+        ("fonte", "B", 13),
+        ("celula", 8, "Indicadores principais:"),
+        ("fonte", "", 11),
+    ]
+    blocos += [("celula", 7, f"- {nome}: {valor}") for nome, valor in resumo_kpis.items()]
+    blocos += [
+        ("espaco", 5),
+        ("fonte", "B", 13),
+        ("celula", 8, "Ultimas observacoes:"),
+        ("fonte", "", 10),
+    ]
+    tabela = linhas_observacoes(df_base)
+    if tabela:
+        blocos.append(("multi", 6, tabela))
+
+    if graficos:
+        blocos += [("pagina",), ("fonte", "B", 13), ("celula", 8, "Graficos:")]
+        for png in graficos:
+            # 190 mm de largura mantendo a proporção do PNG (1000 x 480 px)
+            blocos += [("imagem", png, 190), ("espaco", 4)]
+    return blocos
+
+
+def escrever_blocos_fpdf(pdf, blocos):
+    for bloco in blocos:
+        tipo = bloco[0]
+        if tipo == "pagina":
+            pdf.add_page()
+        elif tipo == "fonte":
+            pdf.set_font("Arial", bloco[1], bloco[2])
+        elif tipo == "celula":
+            pdf.cell(0, bloco[1], bloco[2], ln=True)
+        elif tipo == "multi":
+            pdf.multi_cell(0, bloco[1], bloco[2])
+        elif tipo == "espaco":
+            pdf.ln(bloco[1])
+        elif tipo == "imagem":
+            largura = bloco[2]
+            pdf.image(BytesIO(bloco[1]), w=largura, h=largura * graficos_estaticos.ALTURA / graficos_estaticos.LARGURA)
+
+
+@metricas.cronometrado
+def gerar_pdf_relatorio(cidade, mercado, df_base, resumo_kpis, texto_resumo, graficos=None):
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    escrever_blocos_fpdf(pdf, blocos_relatorio_serie(cidade, mercado, df_base, resumo_kpis, texto_resumo, graficos))
+
+    result = pdf.output(dest="S")
+    if isinstance(result, str):
+        return result.encode("latin-1")
+    else:
+        return bytes(result)
+
+
+# -------------------- PDF consolidado (todas as séries) --------------------
+def series_para_relatorio(df_hist, periodo, com_graficos=False):
+    """Gerador sobre as séries da base: uma série recortada e calculada por vez.
+
+    Nada de uma série sobrevive à próxima iteração, então a memória do lado dos
+    dados não cresce com o número de séries.
+    """
+    indice = montar_indice_series(df_hist)
+    for cidade, mercado in indice:
+        base = recortar_periodo(fatia_serie(df_hist, indice, cidade, mercado), periodo)
+        if base.empty:
+            continue
+        ind = calcular_indicadores_relatorio(base, cidade, mercado)
+        graficos = graficos_relatorio_png(base, ind, cidade, mercado) if com_graficos else None
+        yield cidade, mercado, base, ind["resumo_kpis"], ind["texto_resumo"], graficos
+
+
+def gerar_pdf_consolidado(series, destino, titulo="Relatorio Consolidado - Mercado Imobiliario"):
+    """Escreve em `destino` um único PDF com o relatório de cada série de `series`.
+
+    `series` é um iterável de (cidade, mercado, base, resumo_kpis, texto_resumo, graficos),
+    como o de `series_para_relatorio`. As páginas vão para o disco à medida que
+    cada série termina, então a memória não cresce com o número de séries.
+    Retorna (séries escritas, páginas).
+    """
+    total = 0
+    with pdf_continuo.EscritorPDFContinuo(destino) as pdf:
+        pdf.escrever_blocos([("pagina",), ("fonte", "B", 18), ("celula", 12, titulo)])
+        for serie in series:
+            pdf.escrever_blocos(blocos_relatorio_serie(*serie))
+            total += 1
+        paginas = pdf.paginas
+    return total, paginas
+
+
+# -------------------- Artefatos por série (cache) --------------------
+# Fatias, KPIs, figuras e PDFs de cada (cidade, tipo_mercado, período) ficam em
+# cache compartilhado entre as sessões; o aquecimento abaixo os pré-constrói.
+# `cache_resource` devolve o mesmo objeto a todos (sem a cópia por chamada do
+# `cache_data`), por isso tudo aqui é tratado como somente leitura.
+def serie_historica(cidade, mercado):
+    df_hist, _ = carregar_bases()
+    return fatia_serie(df_hist, derivados_bases()["historico"], cidade, mercado)
+
+
+@metricas.cache_medido(st.cache_resource(show_spinner=False, max_entries=512))
+def artefatos_previsoes(cidade, mercado):
+    _, pacote = carregar_bases()
+    return series_previsoes(pacote, cidade, mercado, derivados_bases())
+
+
+@metricas.cache_medido(st.cache_resource(show_spinner=False, max_entries=512))
+def artefatos_relatorio(cidade, mercado, periodo):
+    base = serie_historica(cidade, mercado)
+    if base.empty:
+        return None
+    base = recortar_periodo(base, periodo)
+    ano = derivados_bases()["ano"].loc[base.index]
+    return {
+        "base": base,
+        "indicadores": calcular_indicadores_relatorio(base, cidade, mercado, ano),
+    }
+
+
+# Figuras Plotly prontas, uma por (tipo de gráfico, cidade, mercado, período,
+# versão dos dados), num LRU compartilhado limitado pelo tamanho do spec JSON
+# de cada figura. Numa visita repetida não há fatia, indicador nem `px.*`: só a
+# serialização que o `st.plotly_chart` faz de qualquer jeito.
+CACHE_FIGURAS_MB = float(os.environ.get("PREDIMOVEIS_CACHE_FIGURAS_MB", "32"))
+
+
+def tamanho_figura(fig):
+    return len(fig.to_json())
+
+
+@st.cache_resource(show_spinner=False)
+def cache_figuras():
+    return CacheLRU(int(CACHE_FIGURAS_MB * 1024 * 1024), tamanho=tamanho_figura)
+
+
+def figura_em_cache(tipo, cidade, mercado, periodo, construir):
+    """Figura do cache compartilhado; `construir()` só roda na primeira visita."""
+    return cache_figuras().obter_ou_gerar((tipo, cidade, mercado, periodo, versao_dados()), construir)
+
+
+def figura_historico_cache(cidade, mercado):
+    return figura_em_cache(
+        "historico", cidade, mercado, None,
+        lambda: figura_historico(serie_historica(cidade, mercado), cidade, mercado),
+    )
+
+
+def figura_previsoes_cache(cidade, mercado):
+    return figura_em_cache(
+        "previsoes", cidade, mercado, None,
+        lambda: figura_previsoes(artefatos_previsoes(cidade, mercado), cidade, mercado),
+    )
+
+
+def figuras_relatorio_cache(cidade, mercado, periodo):
+    """As figuras de `FIGURAS_RELATORIO` do filtro; cada uma é construída só se faltar no cache."""
+    def construtor(tipo):
+        def construir():
+            art = artefatos_relatorio(cidade, mercado, periodo)
+            return FIGURAS_RELATORIO[tipo](art["base"], art["indicadores"], cidade, mercado)
+        return construir
+
+    return {tipo: figura_em_cache(tipo, cidade, mercado, periodo, construtor(tipo)) for tipo in FIGURAS_RELATORIO}
+
+
+# PDFs só são gerados quando alguém pede; os bytes ficam num LRU limitado por
+# tamanho, chaveado por (cidade, mercado, período, versão dos dados).
+CACHE_PDF_MB = float(os.environ.get("PREDIMOVEIS_CACHE_PDF_MB", "64"))
+
+
+@st.cache_resource(show_spinner=False)
+def cache_pdfs():
+    return CacheLRU(int(CACHE_PDF_MB * 1024 * 1024))
+
+
+@st.cache_resource(show_spinner=False)
+def cache_imagens():
+    """PNGs dos gráficos do PDF, compartilhados por todos os relatórios do processo."""
+    return CacheLRU(int(CACHE_PDF_MB * 1024 * 1024))
+
+
+def chave_pdf(cidade, mercado, periodo):
+    return (cidade, mercado, periodo, versao_dados())
+
+
+def obter_pdf_relatorio(cidade, mercado, periodo):
+    def gerar():
+        art = artefatos_relatorio(cidade, mercado, periodo)
+        graficos = graficos_relatorio_png(
+            art["base"], art["indicadores"], cidade, mercado,
+            cache=cache_imagens(), chave=chave_pdf(cidade, mercado, periodo)
+        )
+        return gerar_pdf_relatorio(
+            cidade,
+            mercado,
+            art["base"],
+            art["indicadores"]["resumo_kpis"],
+            art["indicadores"]["texto_resumo"],
+            graficos
+        )
+    return cache_pdfs().obter_ou_gerar(chave_pdf(cidade, mercado, periodo), gerar)
+
+
+# -------------------- Séries mais acessadas --------------------
+VISUALIZACOES_PATH = os.path.join(CACHE_DIR, "visualizacoes.json")
+
+
+@st.cache_resource(show_spinner=False)
+def contador_visualizacoes():
+    """Contagem de acessos por série, compartilhada entre sessões e persistida em disco."""
+    contagem = {}
+    try:
+        with open(VISUALIZACOES_PATH, encoding="utf-8") as f:
+            contagem = json.load(f)
+    except (OSError, ValueError):
+        pass
+    return {"contagem": contagem, "lock": threading.Lock(), "gravado_em": 0.0}
+
+
+def registrar_visualizacao(cidade, mercado):
+    contador = contador_visualizacoes()
+    chave = f"{cidade}|{mercado}"
+    with contador["lock"]:
+        contador["contagem"][chave] = contador["contagem"].get(chave, 0) + 1
+        # Grava no máximo a cada 30 s para não pesar nas sessões concorrentes.
+        if time.time() - contador["gravado_em"] < 30:
+            return
+        contador["gravado_em"] = time.time()
+        dados = dict(contador["contagem"])
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(VISUALIZACOES_PATH, "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False)
+    except OSError:
+        pass
+
+
+def series_mais_vistas(df_hist, n):
+    """As `n` séries (cidade, tipo_mercado) mais acessadas; completa com as demais em ordem."""
+    contagem = contador_visualizacoes()["contagem"]
+    todas = (
+        df_hist[["cidade", "tipo_mercado"]]
+        .drop_duplicates()
+        .itertuples(index=False, name=None)
+    )
+    todas = [(str(c), str(m)) for c, m in todas]
+    todas.sort(key=lambda s: -contagem.get(f"{s[0]}|{s[1]}", 0))
+    return todas[:n]
+
+
+# -------------------- Aquecimento do cache na subida do servidor --------------------
+AQUECIMENTO_ATIVO = os.environ.get("PREDIMOVEIS_AQUECIMENTO", "1") != "0"
+AQUECIMENTO_TOP = int(os.environ.get("PREDIMOVEIS_AQUECIMENTO_TOP", "6"))
+
+
+def _aquecer(estado):
+    try:
+        estado["etapa"] = "Carregando base histórica e snapshot"
+        df_hist, pacote = carregar_bases()
+        if df_hist.empty:
+            return
+
+        series = series_mais_vistas(df_hist, AQUECIMENTO_TOP)
+        estado["total"] = len(series) * (2 + len(PERIODOS_RELATORIO))
+
+        for cidade, mercado in series:
+            estado["etapa"] = f"{cidade} / {mercado}"
+            figura_historico_cache(cidade, mercado)
+            estado["concluidos"] += 1
+            if pacote is not None and "previsoes_futuras" in pacote:
+                figura_previsoes_cache(cidade, mercado)
+            estado["concluidos"] += 1
+            for periodo in PERIODOS_RELATORIO:
+                if artefatos_relatorio(cidade, mercado, periodo) is not None:
+                    figuras_relatorio_cache(cidade, mercado, periodo)
+                    obter_pdf_relatorio(cidade, mercado, periodo)
+                estado["concluidos"] += 1
+    except Exception as e:
+        # O aquecimento é só uma otimização: falhas aqui não podem derrubar o app.
+        estado["erro"] = str(e)
+    finally:
+        estado["terminado"] = True
+
+
+@st.cache_resource(show_spinner=False)
+def iniciar_aquecimento():
+    """Dispara, uma vez por processo, o aquecimento em uma thread de segundo plano."""
+    estado = {"etapa": "", "total": 0, "concluidos": 0, "terminado": False, "erro": None}
+    thread = threading.Thread(target=_aquecer, args=(estado,), name="predimoveis-aquecimento", daemon=True)
+    thread.start()
+    return estado
+
+
+def mostrar_progresso_aquecimento(estado):
+    if estado["terminado"]:
+        if estado["erro"]:
+            st.sidebar.caption(f"⚠ Aquecimento do cache interrompido: {estado['erro']}")
+        return
+    fracao = estado["concluidos"] / estado["total"] if estado["total"] else 0.0
+    st.sidebar.progress(min(fracao, 1.0), text=f"♨️ Preparando cache: {estado['etapa']}")
+
+
+# -------------------- Pré-geração das narrações --------------------
+# Os textos acessíveis de cada série são determinados pelos dados. Depois da
+# carga das bases, um job em segundo plano sintetiza todos eles no cache de
+# áudio, e os botões "🎧 Ouvir" passam a tocar áudio já pronto. Como as bases,
+# o job é um por processo: dados novos entram com o reinício do servidor.
+# "auto" só pré-gera com motor local: com o gTTS seriam milhares de chamadas à rede.
+PREGERAR_AUDIO = os.environ.get("PREDIMOVEIS_PREGERAR_AUDIO", "auto")
+PREGERACAO_THREADS = int(os.environ.get("PREDIMOVEIS_PREGERACAO_THREADS", "2"))
+
+
+def narracoes_da_serie(cidade, mercado, com_historico=True, com_previsoes=True):
+    """Textos dos botões "🎧 Ouvir" de uma série, montados exatamente como nos painéis."""
+    textos = []
+    if com_historico:
+        textos.append(texto_dashboard_acessivel(serie_historica(cidade, mercado), cidade, mercado))
+        for periodo in PERIODOS_RELATORIO:
+            art = artefatos_relatorio(cidade, mercado, periodo)
+            if art is not None:
+                ind = art["indicadores"]
+                textos.append(texto_relatorio_acessivel(ind["texto_resumo"], ind["resumo_kpis_audio"]))
+                textos.append(texto_relatorio_acessivel(ind["texto_resumo"], ind["resumo_kpis"]))
+    if com_previsoes:
+        art = artefatos_previsoes(cidade, mercado)
+        textos.append(texto_previsoes_acessivel(art["fut"], cidade, mercado, art["ultima_data_hist"]))
+    return textos
+
+
+def _pregerar_narracoes(estado, motor, cache):
+    pendentes = set()
+    falhas_seguidas = 0
+    ultima_falha = None
+    try:
+        with ThreadPoolExecutor(max_workers=PREGERACAO_THREADS, thread_name_prefix="pregeracao-tts") as executor:
+            estado["etapa"] = "Carregando bases"
+            df_hist, _ = carregar_bases()
+            derivados = derivados_bases()
+            com_hist = set(derivados["historico"])
+            com_prev = set(derivados.get("previsoes_futuras", {}))
+            # Séries mais acessadas primeiro; depois as que só existem nas previsões.
+            series = series_mais_vistas(df_hist, len(com_hist)) if not df_hist.empty else []
+            series += sorted(com_prev - set(series))
+            estado["total"] = len(series)
+
+            def sintetizar(trecho):
+                return cache.obter_ou_gerar(trecho, IDIOMA_TTS, lambda: motor.sintetizar(trecho, IDIOMA_TTS))
+
+            for cidade, mercado in series:
+                if estado["cancelar"].is_set():
+                    break
+                estado["etapa"] = f"{cidade} / {mercado}"
+                textos = narracoes_da_serie(cidade, mercado, (cidade, mercado) in com_hist, (cidade, mercado) in com_prev)
+                for texto in textos:
+                    for trecho in tts.dividir_em_trechos(texto):
+                        if (trecho, IDIOMA_TTS) in cache:
+                            continue
+                        # Janela limitada de tarefas: o cancelamento tem efeito logo.
+                        while len(pendentes) >= 2 * PREGERACAO_THREADS:
+                            feitos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                            for futuro in feitos:
+                                if futuro.exception() is None:
+                                    falhas_seguidas = 0
+                                else:
+                                    falhas_seguidas += 1
+                                    estado["falhas"] += 1
+                                    ultima_falha = futuro.exception()
+                            if falhas_seguidas >= 5:
+                                raise RuntimeError(f"motor de voz falhando: {ultima_falha}")
+                        pendentes.add(executor.submit(sintetizar, trecho))
+                        estado["trechos"] += 1
+                estado["concluidos"] += 1
+            if estado["cancelar"].is_set():
+                for futuro in pendentes:
+                    futuro.cancel()
+    except Exception as e:
+        # Como o aquecimento, a pré-geração é só uma otimização.
+        estado["erro"] = str(e)
+        for futuro in pendentes:
+            futuro.cancel()
+    finally:
+        estado["terminado"] = True
+
+
+@st.cache_resource(show_spinner=False)
+def iniciar_pregeracao_narracoes():
+    """Dispara, uma vez por processo, a pré-geração em uma thread de segundo plano."""
+    estado = {
+        "etapa": "", "total": 0, "concluidos": 0, "trechos": 0, "falhas": 0,
+        "terminado": False, "erro": None, "cancelar": threading.Event(),
+    }
+    threading.Thread(
+        target=_pregerar_narracoes, args=(estado, motor_tts(), cache_audio()),
+        name="predimoveis-pregeracao-tts", daemon=True,
+    ).start()
+    return estado
+
+
+def pregeracao_ativa():
+    if PREGERAR_AUDIO == "auto":
+        return motor_tts().nome != "gtts"
+    return PREGERAR_AUDIO != "0"
+
+
+def mostrar_progresso_pregeracao(estado):
+    if estado["terminado"]:
+        if estado["erro"]:
+            st.sidebar.caption(f"⚠ Pré-geração das narrações interrompida: {estado['erro']}")
+        return
+    if estado["cancelar"].is_set():
+        st.sidebar.caption("🎧 Cancelando a pré-geração das narrações...")
+        return
+    fracao = estado["concluidos"] / estado["total"] if estado["total"] else 0.0
+    st.sidebar.progress(
+        min(fracao, 1.0),
+        text=f"🎧 Pré-gerando narrações: {estado['concluidos']}/{estado['total']} séries ({estado['etapa']})",
+    )
+    # O job é do processo inteiro: só administradores podem pará-lo.
+    if st.session_state.get("usuario") in ADMINS and st.sidebar.button("Cancelar pré-geração", key="cancelar_pregeracao"):
+        estado["cancelar"].set()
+
+
+# -------------------- Fragmentos e latência por interação --------------------
+# Cada painel é um `st.fragment`: mudar um filtro reexecuta só o painel, sem
+# passar de novo por `main`, checagens de login e carregadores. As latências
+# dos reruns isolados e das execuções completas do script ficam registradas
+# por processo para comparação.
+@st.cache_resource(show_spinner=False)
+def registro_latencias():
+    return {"amostras": {}, "lock": threading.Lock()}
+
+
+def registrar_latencia(tipo, segundos):
+    metricas.REGISTRO.observar(metricas.EXECUCAO, segundos, tipo=tipo)
+    registro = registro_latencias()
+    with registro["lock"]:
+        registro["amostras"].setdefault(tipo, collections.deque(maxlen=500)).append(segundos)
+
+
+def resumo_latencias():
+    registro = registro_latencias()
+    with registro["lock"]:
+        amostras = {tipo: list(valores) for tipo, valores in registro["amostras"].items()}
+    linhas = []
+    for tipo, valores in sorted(amostras.items()):
+        ms = np.array(valores) * 1000
+        linhas.append({
+            "Execução": tipo,
+            "Qtd": len(ms),
+            "p50 (ms)": round(float(np.percentile(ms, 50)), 1),
+            "p95 (ms)": round(float(np.percentile(ms, 95)), 1),
+        })
+    return pd.DataFrame(linhas)
+
+
+def fragmento_medido(func):
+    """`st.fragment` que registra a latência (e, com o perfil ligado, o perfil) de cada rerun isolado."""
+    @functools.wraps(func)
+    def medido(*args, **kwargs):
+        # Dentro de uma execução completa o tempo já entra na medição (e no perfil) do script.
+        isolado = not st.session_state.get("_execucao_completa", False)
+        inicio = time.perf_counter()
+        try:
+            with perfilar(func.__name__) if isolado and perfil_ativo() else contextlib.nullcontext():
+                return func(*args, **kwargs)
+        finally:
+            if isolado:
+                registrar_latencia(f"fragmento: {func.__name__}", time.perf_counter() - inicio)
+    return st.fragment(medido)
+
+
+def executar_medindo(func):
+    """Executa o script completo (`main`) registrando sua latência."""
+    st.session_state["_execucao_completa"] = True
+    inicio = time.perf_counter()
+    try:
+        func()
+    finally:
+        st.session_state["_execucao_completa"] = False
+        registrar_latencia("script completo", time.perf_counter() - inicio)
+
+
+def mostrar_latencias():
+    with st.sidebar.expander("⏱️ Latência das interações"):
+        resumo = resumo_latencias()
+        if resumo.empty:
+            st.caption("Sem medições ainda.")
+        else:
+            st.dataframe(resumo, hide_index=True)
+        figuras = cache_figuras().estatisticas()
+        st.caption(
+            f"📈 Cache de figuras: {figuras['itens']} gráficos, {figuras['bytes'] / 1024 / 1024:.1f} MB "
+            f"de {figuras['limite_bytes'] / 1024 / 1024:.0f} MB, acerto {figuras['taxa_acerto']:.0%}"
+        )
+        audio = cache_audio().estatisticas()
+        st.caption(
+            f"🎧 Cache de áudio ({motor_tts().nome}): {audio['itens']} narrações, {audio['bytes'] / 1024 / 1024:.1f} MB "
+            f"de {audio['limite_bytes'] / 1024 / 1024:.0f} MB, acerto {audio['taxa_acerto']:.0%}"
+        )
+
+
+# -------------------- Perfil por execução --------------------
+# PREDIMOVEIS_PERFIL=1 amostra todas as execuções do script; "consulta" só as
+# abertas com `?perfil=1` na URL. Desligado (padrão), não há nenhuma checagem
+# por execução além desta constante. Reruns isolados de fragmentos (ver
+# `fragmento_medido`) geram relatórios próprios, etiquetados com o fragmento.
+# Só as últimas PREDIMOVEIS_PERFIL_MAX execuções ficam no diretório.
+# Ver `perfil` para o formato dos relatórios.
+MODO_PERFIL = os.environ.get("PREDIMOVEIS_PERFIL", "0")
+PERFIL_DIR = os.environ.get("PREDIMOVEIS_PERFIL_DIR", os.path.join(CACHE_DIR, "perfis"))
+PERFIL_MAX = int(os.environ.get("PREDIMOVEIS_PERFIL_MAX", "500"))
+# Chaves dos widgets que identificam a tela: aba e filtros de cada painel.
+PREFIXOS_SELECAO = ("dash_", "prev_", "rel_", "cmp_", "tabela_")
+SUFIXOS_IGNORADOS = ("_csv", "_parquet")  # botões de download das tabelas
+
+
+def perfil_ativo():
+    if MODO_PERFIL == "1":
+        return True
+    return MODO_PERFIL == "consulta" and st.query_params.get("perfil") == "1"
+
+
+def perfilar(fragmento=None):
+    """Perfil da execução atual (ou do rerun isolado de `fragmento`), gravado em PERFIL_DIR."""
+    def etiquetas():
+        return etiquetas_execucao() if fragmento is None else {**etiquetas_execucao(), "fragmento": fragmento}
+    return perfil.perfilado(PERFIL_DIR, etiquetas, manter=PERFIL_MAX)
+
+
+def etiquetas_execucao():
+    """Aba e seleções ativas na sessão, para identificar o relatório de perfil."""
+    estado = st.session_state
+    selecoes = {
+        chave: estado[chave] for chave in sorted(estado.keys())
+        if isinstance(chave, str) and chave.startswith(PREFIXOS_SELECAO) and not chave.endswith(SUFIXOS_IGNORADOS)
+    }
+    return {
+        "aba": estado.get("aba", "login" if not estado.get("auth") else ""),
+        "selecoes": selecoes,
+    }
+
+
+# -------------------- Métricas (Prometheus) --------------------
+# Com PREDIMOVEIS_METRICAS_PORTA definido, o processo expõe `/metrics` (tempos
+# das funções instrumentadas, acertos/faltas dos caches e latência das
+# execuções) para o Prometheus. Os administradores veem as últimas medições na
+# barra lateral.
+METRICAS_PORTA = os.environ.get("PREDIMOVEIS_METRICAS_PORTA")
+METRICAS_HOST = os.environ.get("PREDIMOVEIS_METRICAS_HOST", "127.0.0.1")
+PAINEL_METRICAS = os.environ.get("PREDIMOVEIS_PAINEL_METRICAS", "1") != "0"
+ADMINS = {u.strip() for u in os.environ.get("PREDIMOVEIS_ADMINS", "admin").split(",") if u.strip()}
+
+
+@st.cache_resource(show_spinner=False)
+def servidor_metricas():
+    """Servidor `/metrics` do processo (um só para todas as sessões), se a porta foi configurada."""
+    if not METRICAS_PORTA:
+        return None
+    try:
+        return metricas.servir(int(METRICAS_PORTA), METRICAS_HOST)
+    except OSError as e:
+        # Ex.: outro processo do Streamlit na mesma máquina já ocupa a porta.
+        log.warning("Métricas não expostas em %s:%s: %s", METRICAS_HOST, METRICAS_PORTA, e)
+        return None
+
+
+def tabela_metricas():
+    linhas = []
+    for m in metricas.REGISTRO.ultimas():
+        linhas.append({
+            "Medição": ", ".join(str(v) for v in m["rotulos"].values()) or m["metrica"],
+            "Última (ms)": round(m["ultima_s"] * 1000, 1),
+            "Média (ms)": round(m["media_s"] * 1000, 1),
+            "Qtd": m["qtd"],
+        })
+    return pd.DataFrame(linhas)
+
+
+def tabela_caches():
+    linhas = []
+    for cache, consultas in sorted(metricas.REGISTRO.consultas_cache().items()):
+        total = consultas["acerto"] + consultas["falta"]
+        linhas.append({
+            "Cache": cache,
+            "Acertos": consultas["acerto"],
+            "Faltas": consultas["falta"],
+            "Acerto (%)": round(100 * consultas["acerto"] / total, 1) if total else 0.0,
+        })
+    return pd.DataFrame(linhas)
+
+
+def mostrar_metricas():
+    if not PAINEL_METRICAS or st.session_state.get("usuario") not in ADMINS:
+        return
+    with st.sidebar.expander("🛠️ Métricas do processo (admin)"):
+        medicoes = tabela_metricas()
+        if medicoes.empty:
+            st.caption("Sem medições ainda.")
+        else:
+            st.dataframe(medicoes, hide_index=True)
+        caches = tabela_caches()
+        if not caches.empty:
+            st.dataframe(caches, hide_index=True)
+        if servidor_metricas() is not None:
+            st.caption(f"Prometheus: http://{METRICAS_HOST}:{servidor_metricas().server_address[1]}/metrics")
+
+
+@fragmento_medido
+def botao_ouvir(rotulo, gerar_texto, *args):
+    """Botão de leitura em voz alta isolado: o clique não reexecuta o painel."""
+    if st.button(rotulo):
+        ler_texto_em_voz_alta(gerar_texto(*args))
+
+
+# -------------------- Tabela paginada --------------------
+# Filtro, ordenação e paginação acontecem no servidor, sobre as posições das
+# linhas; o navegador recebe só a página visível. A exportação percorre a
+# seleção inteira em blocos (ver `exportacao`), gerada só quando pedida; o
+# arquivo pronto fica em memória até o download (o Streamlit só serve bytes),
+# por isso a interface só exporta até PREDIMOVEIS_EXPORTACAO_MAX_LINHAS linhas.
+# Acima disso, a API (`/exportacao`, em pedaços) ou `python exportacao.py`.
+TAMANHOS_PAGINA = [25, 50, 100, 250]
+EXPORTACAO_MAX_LINHAS = int(os.environ.get("PREDIMOVEIS_EXPORTACAO_MAX_LINHAS", "200000"))
+
+
+def selecionar_linhas(df, ordenar_por=None, decrescente=False, coluna_data=None, inicio=None, fim=None):
+    """Posições das linhas de `df` no intervalo de datas [inicio, fim] e na ordem pedida, sem copiar a tabela."""
+    posicoes = np.arange(len(df))
+    if coluna_data is not None and (inicio is not None or fim is not None):
+        datas = df[coluna_data].to_numpy()
+        manter = np.ones(len(df), dtype=bool)
+        if inicio is not None:
+            manter &= datas >= np.datetime64(pd.Timestamp(inicio))
+        if fim is not None:
+            manter &= datas < np.datetime64(pd.Timestamp(fim) + pd.Timedelta(days=1))
+        posicoes = posicoes[manter]
+    if ordenar_por is not None:
+        ordem = np.argsort(df[ordenar_por].to_numpy()[posicoes], kind="stable")
+        posicoes = posicoes[ordem[::-1] if decrescente else ordem]
+    return posicoes
+
+
+def aviso_exportacao(total, limite=None):
+    """Mensagem quando a seleção passa do que a interface exporta (None se cabe)."""
+    limite = EXPORTACAO_MAX_LINHAS if limite is None else limite
+    if total <= limite:
+        return None
+    milhar = lambda n: f"{n:_}".replace("_", ".")
+    return (
+        f"A seleção tem {milhar(total)} linhas; pela interface, a exportação vai até {milhar(limite)}. "
+        "Filtre o período ou use a exportação em lote: `GET /exportacao` na API "
+        "(`python api_dados.py servir`), que transmite cada partição em pedaços, ou "
+        "`python exportacao.py --dir <destino>`."
+    )
+
+
+def pagina_de(df, posicoes, pagina, por_pagina):
+    inicio = (pagina - 1) * por_pagina
+    return df.iloc[posicoes[inicio:inicio + por_pagina]]
+
+
+@fragmento_medido
+def tabela_paginada(df, chave, colunas=None, rotulos=None, nome_arquivo="dados"):
+    """Tabela de `df` com filtro por data, ordenação, paginação e exportação CSV/Parquet da seleção."""
+    colunas = list(df.columns) if colunas is None else list(colunas)
+    rotulos = rotulos or {}
+    coluna_data = next((c for c in colunas if pd.api.types.is_datetime64_any_dtype(df[c])), None)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        ordenar_por = st.selectbox(
+            "Ordenar por:", colunas, format_func=lambda c: rotulos.get(c, c), key=f"{chave}_ordem"
+        )
+        decrescente = st.checkbox("Decrescente", key=f"{chave}_desc")
+    inicio = fim = None
+    with col2:
+        if coluna_data is not None and len(df):
+            menor, maior = df[coluna_data].min().date(), df[coluna_data].max().date()
+            periodo = st.date_input(
+                "Período:", value=(menor, maior), min_value=menor, max_value=maior, key=f"{chave}_periodo"
+            )
+            if isinstance(periodo, (tuple, list)) and len(periodo) == 2:
+                inicio, fim = periodo
+    with col3:
+        por_pagina = st.selectbox("Linhas por página:", TAMANHOS_PAGINA, key=f"{chave}_tamanho")
+
+    posicoes = selecionar_linhas(df, ordenar_por, decrescente, coluna_data, inicio, fim)
+    total = len(posicoes)
+    paginas = max(1, -(-total // por_pagina))
+    # O valor da página vive só no session_state (o widget não recebe `value=`),
+    # então pode ser corrigido antes do widget: filtro ou série novos podem ter
+    # menos páginas do que a escolhida antes.
+    chave_pagina = f"{chave}_pagina"
+    st.session_state[chave_pagina] = min(st.session_state.get(chave_pagina, 1), paginas)
+    pagina = st.number_input(f"Página (de {paginas}):", min_value=1, max_value=paginas, step=1, key=chave_pagina)
+
+    st.dataframe(
+        pagina_de(df, posicoes, pagina, por_pagina)[colunas].rename(columns=rotulos),
+        hide_index=True,
+    )
+    primeira = (pagina - 1) * por_pagina
+    st.caption(f"Linhas {min(primeira + 1, total)}–{min(primeira + por_pagina, total)} de {total}.")
+
+    aviso = aviso_exportacao(total)
+    if aviso:
+        st.info(aviso)
+        return
+    col_csv, col_parquet = st.columns(2)
+    col_csv.download_button(
+        "⬇️ Exportar seleção (CSV)",
+        data=lambda: exportacao.arquivo_exportado(exportacao.escrever_csv, df, posicoes, colunas),
+        file_name=f"{nome_arquivo}.csv",
+        mime="text/csv",
+        on_click="ignore",
+        key=f"{chave}_csv",
+    )
+    col_parquet.download_button(
+        "⬇️ Exportar seleção (Parquet)",
+        data=lambda: exportacao.arquivo_exportado(exportacao.escrever_parquet, df, posicoes, colunas),
+        file_name=f"{nome_arquivo}.parquet",
+        mime="application/vnd.apache.parquet",
+        on_click="ignore",
+        key=f"{chave}_parquet",
+    )
+
+
+# -------------------- Aba 1: histórico --------------------
+@fragmento_medido
+@metricas.cronometrado
+def painel_dashboard(df_hist):
+    st.header("📊 Visão Histórica do Mercado Imobiliário")
+    st.caption("Evolução do preço médio (R$/m²) ao longo do tempo, por cidade e tipo de mercado.")
+
+    if df_hist.empty:
+        st.warning("⚠ Ainda não consegui montar a base histórica. Veja avisos acima 👆.")
+        return
+
+    cidades = sorted(df_hist["cidade"].unique())
+    mercados = sorted(df_hist["tipo_mercado"].unique())
+
+    col1, col2 = st.columns(2)
+    with col1:
+        cidade_sel = st.selectbox("Cidade:", cidades, key="dash_cidade")
+    with col2:
+        mercado_sel = st.selectbox("Tipo de Mercado:", mercados, key="dash_mercado")
+
+    base = serie_historica(cidade_sel, mercado_sel)
+
+    if base.empty:
+        st.warning("Sem dados para esse filtro.")
+        return
+
+    registrar_visualizacao(cidade_sel, mercado_sel)
+
+    botao_ouvir("🎧 Ouvir explicação desta seção", texto_dashboard_acessivel, base, cidade_sel, mercado_sel)
+
+    st.plotly_chart(figura_historico_cache(cidade_sel, mercado_sel), use_container_width=True)
+
+    with st.expander("📋 Ver dados brutos"):
+        tabela_paginada(base, "tabela_hist", nome_arquivo=f"historico_{cidade_sel}_{mercado_sel}")
+
+
+# -------------------- Aba 2: previsões --------------------
+@fragmento_medido
+@metricas.cronometrado
+def painel_previsoes(pacote):
+    st.header("🤖 Previsões de Preço Futuro")
+    st.caption("Projeções SARIMA até 2028, baseadas em dados históricos consolidados.")
+
+    if pacote is None or "previsoes_futuras" not in pacote:
+        st.error("⚠ Nenhuma previsão disponível. Verifique se o arquivo modelos_sarima.joblib está correto.")
+        return
+
+    previsoes = pacote["previsoes_futuras"]
+
+    cidades = sorted(previsoes["cidade"].unique())
+    mercados = sorted(previsoes["tipo_mercado"].unique())
+
+    col1, col2 = st.columns(2)
+    with col1:
+        cidade_sel = st.selectbox("Cidade (previsão):", cidades, key="prev_cidade")
+    with col2:
+        mercado_sel = st.selectbox("Tipo de Mercado (previsão):", mercados, key="prev_mercado")
+
+    registrar_visualizacao(cidade_sel, mercado_sel)
+
+    art = artefatos_previsoes(cidade_sel, mercado_sel)
+    fut = art["fut"]
+    ultima_data_hist = art["ultima_data_hist"]
+
+    botao_ouvir(
+        "🎧 Ouvir explicação das previsões",
+        texto_previsoes_acessivel, fut, cidade_sel, mercado_sel, ultima_data_hist
+    )
+
+    st.plotly_chart(figura_previsoes_cache(cidade_sel, mercado_sel), use_container_width=True)
+
+    st.markdown("#### Próximos 6 meses estimados")
+    preview = fut[["data", "preco_previsto"]].tail(6).rename(columns={
+        "data": "Data",
+        "preco_previsto": "Preço Previsto (R$/m²)"
+    })
+    st.dataframe(preview.reset_index(drop=True))
+
+
+# -------------------- Aba 3: dashboards + relatório --------------------
+@fragmento_medido
+def secao_pdf(cidade_sel, mercado_sel, periodo):
+    """Gera o PDF só a pedido (ou reaproveita o do cache) e oferece o download."""
+    chave = chave_pdf(cidade_sel, mercado_sel, periodo)
+    pedido = st.session_state.get("pdf_pedido") == chave
+
+    if not pedido and chave not in cache_pdfs():
+        if not st.button("📄 Gerar relatório em PDF"):
+            return
+        st.session_state["pdf_pedido"] = chave
+
+    with st.spinner("Gerando relatório..."):
+        pdf_bytes = obter_pdf_relatorio(cidade_sel, mercado_sel, periodo)
+
+    st.download_button(
+        label="⬇️ Baixar relatório em PDF",
+        data=pdf_bytes,
+        file_name=f"relatorio_{cidade_sel}_{mercado_sel}.pdf",
+        mime="application/pdf"
+    )
+
+
+@fragmento_medido
+@metricas.cronometrado
+def painel_relatorios(df_hist):
+    st.header("📑 Análise Exploratória por Cidade + Relatório em PDF")
+    st.caption("Dashboards exploratórios e relatório automático em PDF.")
+
+    if df_hist.empty:
+        st.warning("⚠ Ainda não há dados históricos suficientes para montar o relatório.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        cidade_sel = st.selectbox("Cidade:", sorted(df_hist["cidade"].unique()), key="rel_cidade")
+    with col2:
+        mercado_sel = st.selectbox("Tipo de mercado:", sorted(df_hist["tipo_mercado"].unique()), key="rel_mercado")
+    with col3:
+        periodo = st.selectbox(
+            "Período:",
+            PERIODOS_RELATORIO,
+            index=1,
+            key="rel_periodo"
+        )
+
+    art = artefatos_relatorio(cidade_sel, mercado_sel, periodo)
+
+    if art is None:
+        st.warning("Sem dados para esse filtro.")
+        return
+
+    registrar_visualizacao(cidade_sel, mercado_sel)
+
+    base = art["base"]
+    ind = art["indicadores"]
+    figuras = figuras_relatorio_cache(cidade_sel, mercado_sel, periodo)
+
+    col_kpi1, col_kpi2, col_kpi3 = st.columns(3)
+    col_kpi1.metric("Preço atual (R$/m²)", ind["preco_atual_str"])
+    col_kpi2.metric("Média no período (R$/m²)", ind["preco_medio_str"])
+    col_kpi3.metric(
+        "Variação acumulada",
+        f"{ind['variacao_pct_str']}%",
+        ind["variacao_abs_str"]
+    )
+
+    botao_ouvir(
+        "🎧 Ouvir resumo desta seção",
+        texto_relatorio_acessivel, ind["texto_resumo"], ind["resumo_kpis_audio"]
+    )
+
+    st.markdown("### 📝 Resumo em texto corrido")
+    st.text(ind["texto_resumo"])
+
+    # gráficos
+    st.markdown("### 📈 Tendência no período selecionado")
+    st.plotly_chart(figuras["linha"], use_container_width=True)
+    st.caption(f'<p style="font-size: 0.875rem">{ind["texto_linha"]}</p>', unsafe_allow_html=True)
+
+    col_g1, col_g2 = st.columns(2)
+    with col_g1:
+        st.plotly_chart(figuras["barras_ano"], use_container_width=True)
+
+    with col_g2:
+        st.plotly_chart(figuras["box"], use_container_width=True)
+
+    st.markdown(f"**Como interpretar esses dois gráficos:** {ind['texto_ano']} {ind['texto_box']}")
+
+    # pizza + barras por faixa
+    st.markdown("### 🔍 Análise exploratória da distribuição de preços")
+    col_p1, col_p2 = st.columns(2)
+    with col_p1:
+        st.plotly_chart(figuras["pizza"], use_container_width=True)
+
+    with col_p2:
+        st.plotly_chart(figuras["barras_faixa"], use_container_width=True)
+
+    st.caption(ind["texto_faixas"])
 
     # estatísticas descritivas
     st.markdown("### 📊 Estatísticas descritivas da cidade selecionada")
@@ -815,45 +2138,82 @@ def painel_relatorios(df_hist):
     st.table(descr.to_frame("R$/m²").style.format("{:.2f}"))
 
     with st.expander("📋 Ver dados detalhados do período"):
-        st.dataframe(
-            base[["data", "preco_m2"]]
-            .sort_values("data")
-            .rename(columns={"data": "Data", "preco_m2": "Preço (R$/m²)"})
-            .reset_index(drop=True)
+        tabela_paginada(
+            base, "tabela_rel",
+            colunas=["data", "preco_m2"],
+            rotulos={"data": "Data", "preco_m2": "Preço (R$/m²)"},
+            nome_arquivo=f"relatorio_{cidade_sel}_{mercado_sel}",
         )
 
     # PDF
     st.markdown("### 📄 Exportar relatório em PDF")
+    secao_pdf(cidade_sel, mercado_sel, periodo)
 
-    resumo_kpis = {
-        "Preço atual (R$/m²)": f"R$ {preco_atual_str}",
-        "Média no período": f"R$ {preco_medio_str}",
-        "Mínimo no período": f"R$ {formata_valor(minimo)}",
-        "Máximo no período": f"R$ {formata_valor(maximo)}",
-        "Variação acumulada": f"{variacao_pct_str}%",
-    }
-
-    pdf_bytes = gerar_pdf_relatorio(
-        cidade_sel,
-        mercado_sel,
-        base,
-        resumo_kpis,
-        texto_resumo
+    botao_ouvir(
+        "🎧 Ouvir resumo e indicadores",
+        texto_relatorio_acessivel, ind["texto_resumo"], ind["resumo_kpis"]
     )
 
-    st.download_button(
-        label="⬇️ Baixar relatório em PDF",
-        data=pdf_bytes,
-        file_name=f"relatorio_{cidade_sel}_{mercado_sel}.pdf",
-        mime="application/pdf"
-    )
 
-    if st.button("🎧 Ouvir resumo e indicadores"):
-        ler_texto_em_voz_alta(texto_relatorio_acessivel(texto_resumo, resumo_kpis))
+# -------------------- Aba 4: comparação de séries --------------------
+@fragmento_medido
+@metricas.cronometrado
+def painel_comparacao(df_hist):
+    st.header("📈 Comparação entre Séries")
+    st.caption("Várias cidades e tipos de mercado no mesmo gráfico, em R$/m² ou como índice a partir de uma data-base.")
+
+    if df_hist.empty:
+        st.warning("⚠ Ainda não há dados históricos para comparar.")
+        return
+
+    indice = derivados_bases()["historico"]
+    cidades = sorted({c for c, _ in indice})
+    mercados = sorted({m for _, m in indice})
+
+    col1, col2 = st.columns(2)
+    with col1:
+        cidades_sel = st.multiselect("Cidades:", cidades, default=cidades[:3], key="cmp_cidades")
+    with col2:
+        mercados_sel = st.multiselect("Tipos de mercado:", mercados, default=mercados[:1], key="cmp_mercados")
+
+    data_base = None
+    if st.checkbox("Normalizar (índice = 100 na data-base)", key="cmp_normalizar"):
+        inicio, fim = df_hist["data"].min().date(), df_hist["data"].max().date()
+        data_base = st.date_input("Data-base:", value=inicio, min_value=inicio, max_value=fim, key="cmp_data_base")
+
+    pares = [(c, m) for c in cidades_sel for m in mercados_sel if (c, m) in indice]
+    if not pares:
+        st.info("Escolha ao menos uma cidade e um tipo de mercado com dados.")
+        return
+
+    series = comparar_series(df_hist, indice, pares, data_base)
+    presentes = {s["rotulo"] for s in series}
+    sem_base = [f"{c} — {m}" for c, m in pares if f"{c} — {m}" not in presentes]
+    if sem_base:
+        st.warning(f"⚠ Sem preço na data-base (zero ou ausente), fora do índice: {', '.join(sem_base)}.")
+    if not series:
+        return
+
+    botao_ouvir("🎧 Ouvir resumo da comparação", texto_comparacao_acessivel, series, data_base is not None)
+
+    figura = figura_em_cache(
+        "comparacao", tuple(cidades_sel), tuple(mercados_sel),
+        str(data_base) if data_base is not None else None,
+        lambda: figura_comparacao(series, data_base is not None),
+    )
+    st.plotly_chart(figura, use_container_width=True)
+    st.caption(f"{len(series)} séries, {sum(len(s['valor']) for s in series)} observações.")
 
 
 # -------------------- Main --------------------
 def main():
+    servidor_metricas()
+    if AQUECIMENTO_ATIVO:
+        # Primeira execução do script no processo: dispara o aquecimento sem esperar por ele.
+        aquecimento = iniciar_aquecimento()
+    # Idem para as narrações: uma pré-geração por versão dos dados.
+    pregeracao = iniciar_pregeracao_narracoes() if pregeracao_ativa() else None
+
     if "auth" not in st.session_state:
         st.session_state["auth"] = False
     if "basic_auth" not in st.session_state:
@@ -865,6 +2225,9 @@ def main():
 
     st.title("🏠 PredImóveis")
     st.caption("Dashboard acadêmico de análise e previsão de preços de imóveis.")
+    mensagem = st.session_state.pop("mensagem_login", None)
+    if mensagem:
+        st.success(mensagem)
 
     st.sidebar.markdown("### 👤 Sessão")
     if st.sidebar.button("Sair"):
@@ -878,12 +2241,20 @@ def main():
             "📊 Visualização de Dados",
             "🤖 Previsões Inteligentes",
             "📑 Relatórios e PDF",
+            "📈 Comparar Séries",
         ],
-        index=0
+        index=0,
+        key="aba",
     )
 
-    df_hist = carregar_dados_historicos()
-    pacote_prev = carregar_snapshot_previsoes()
+    if AQUECIMENTO_ATIVO:
+        mostrar_progresso_aquecimento(aquecimento)
+    if pregeracao is not None:
+        mostrar_progresso_pregeracao(pregeracao)
+    mostrar_latencias()
+    mostrar_metricas()
+
+    df_hist, pacote_prev = carregar_bases()
 
     if aba.startswith("📊"):
         painel_dashboard(df_hist)
@@ -891,13 +2262,24 @@ def main():
         painel_previsoes(pacote_prev)
     elif aba.startswith("📑"):
         painel_relatorios(df_hist)
+    elif aba.startswith("📈"):
+        painel_comparacao(df_hist)
 
     st.markdown("---")
     st.caption(
-        "Protótipo acadêmico. A aplicação utiliza recursos de acessibilidade, como síntese de voz (gTTS), "
+        "Protótipo acadêmico. A aplicação utiliza recursos de acessibilidade, como síntese de voz (espeak-ng ou gTTS), "
         "além de modelos estatísticos (SARIMA) para previsão de preços."
     )
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Copy-on-write no processo do Streamlit: recortes das bases compartilhadas
+    # são views e nunca alteram o original. Vale para o processo inteiro, por
+    # isso só aqui; quem importa `app` (lote, API, benchmarks, testes) mantém a
+    # própria configuração do pandas, e as bases congeladas recusam escritas.
+    pd.set_option("mode.copy_on_write", True)
+    if perfil_ativo():
+        with perfilar():
+            executar_medindo(main)
+    else:
+        executar_medindo(main)
@@ -0,0 +1,240 @@
+"""Benchmark de escala: as etapas quentes do app sobre bases sintéticas de 1x, 100x e 10.000x.
+
+Cada escala gera uma base no formato do `csv_unico.csv` (ver `dados_sinteticos`;
+`--formato br` mede o caminho pt-BR do parser) e um snapshot de previsões, e
+mede com as funções do app, sem os caches do Streamlit:
+
+    leitura_csv     ler_dados_historicos (o carregamento real, com o parser pt-BR)
+    indice_series   montar_indice_series sobre a base lida
+    snapshot        joblib.load + preparar_snapshot
+    fatiamento      fatia_serie + recortar_periodo, por série
+    kpis            calcular_indicadores_relatorio, por série
+    figuras         histórico, previsões e gráficos do relatório (Plotly), por série
+    pdf             gráficos PNG + gerar_pdf_relatorio, por série
+
+As etapas por série rodam numa amostra fixa (semente) de séries. O resultado,
+com o ambiente e o pico de memória, vai para um JSON, regravado ao fim de cada
+escala (uma escala que derruba o processo não leva as anteriores junto);
+`--comparar` mostra a razão entre a execução atual e uma anterior. Por padrão
+rodam 1x e 100x; 10.000x só quando pedida.
+
+Uso:
+    python benchmark_escala.py --escalas 1 100 --json bench.json --comparar bench_anterior.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import app
+import dados_sinteticos
+import memoria_compartilhada
+
+# escala -> (cidades, meses). 1x ≈ base real (9 cidades × 2 mercados × 48 meses);
+# a partir de 100x as séries têm 40 anos e a escala cresce em número de séries.
+ESCALAS = {1: (9, 48), 100: (90, 480), 10000: (9000, 480)}
+# 10.000x precisa de bem mais memória que uma máquina de desenvolvimento: só quando pedida.
+ESCALAS_PADRAO = (1, 100)
+AMOSTRAS_SERIES = 20
+AMOSTRAS_PDF = 5
+LIMITE_REGRESSAO = 1.2
+ETAPAS = ["leitura_csv", "indice_series", "snapshot", "fatiamento", "kpis", "figuras", "pdf"]
+
+
+def resumo_ms(segundos):
+    ms = np.asarray(segundos) * 1000
+    return {
+        "n": len(ms),
+        "media_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def cronometrar(func, *args):
+    inicio = time.perf_counter()
+    resultado = func(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def mb(kb):
+    """kB -> MB com uma casa; None (memória indisponível nesta plataforma) passa direto."""
+    return None if kb is None else round(kb / 1024, 1)
+
+
+def rss_mb():
+    return mb(memoria_compartilhada.memoria_processo()["rss_kb"])
+
+
+def medir_escala(escala, diretorio, amostras=AMOSTRAS_SERIES, amostras_pdf=AMOSTRAS_PDF, semente=42,
+                 formato="real"):
+    cidades, meses = ESCALAS[escala]
+    caminho_csv = os.path.join(diretorio, f"base_{escala}x.csv")
+    caminho_joblib = os.path.join(diretorio, f"modelos_{escala}x.joblib")
+    base, geracao_s = cronometrar(
+        lambda: dados_sinteticos.gerar_base(caminho_csv, cidades, meses, caminho_joblib, formato=formato)
+    )
+    resultado = {
+        "cidades": base["cidades"],
+        "meses": base["meses"],
+        "series": base["series"],
+        "linhas": base["linhas"],
+        "csv_mb": round(os.path.getsize(caminho_csv) / 1024 / 1024, 2),
+        "geracao_s": round(geracao_s, 3),
+        "rss_mb": {"antes": rss_mb()},
+        "etapas": {},
+    }
+    try:
+        _medir_etapas(resultado["etapas"], caminho_csv, caminho_joblib, amostras, amostras_pdf, semente)
+    except MemoryError:
+        # Também é resultado: a escala não coube na memória nesta máquina.
+        faltando = [e for e in ETAPAS if e not in resultado["etapas"]]
+        resultado["erro"] = f"MemoryError em {faltando[0]}"
+    resultado["rss_mb"]["depois"] = rss_mb()
+    gc.collect()
+    return resultado
+
+
+def _medir_etapas(etapas, caminho_csv, caminho_joblib, amostras, amostras_pdf, semente):
+    df_hist, t = cronometrar(app.ler_dados_historicos, caminho_csv)
+    etapas["leitura_csv"] = resumo_ms([t])
+    indice, t = cronometrar(app.montar_indice_series, df_hist)
+    etapas["indice_series"] = resumo_ms([t])
+    pacote, t = cronometrar(lambda: app.preparar_snapshot(joblib.load(caminho_joblib)))
+    etapas["snapshot"] = resumo_ms([t])
+    indices_prev = {"previsoes_futuras": app.montar_indice_series(pacote["previsoes_futuras"])}
+    ano = df_hist["data"].dt.year
+
+    rng = np.random.default_rng(semente)
+    chaves = sorted(indice)
+    amostra = [chaves[i] for i in rng.choice(len(chaves), min(amostras, len(chaves)), replace=False)]
+    tempos = {nome: [] for nome in ETAPAS[3:]}
+    for i, (cidade, mercado) in enumerate(amostra):
+        inicio = time.perf_counter()
+        serie = app.fatia_serie(df_hist, indice, cidade, mercado)
+        app.recortar_periodo(serie, "Últimos 24 meses")
+        tempos["fatiamento"].append(time.perf_counter() - inicio)
+
+        ind, t = cronometrar(app.calcular_indicadores_relatorio, serie, cidade, mercado, ano.loc[serie.index])
+        tempos["kpis"].append(t)
+
+        inicio = time.perf_counter()
+        app.figura_historico(serie, cidade, mercado)
+        app.figura_previsoes(app.series_previsoes(pacote, cidade, mercado, indices_prev), cidade, mercado)
+        app.figuras_relatorio(serie, ind, cidade, mercado)
+        tempos["figuras"].append(time.perf_counter() - inicio)
+
+        if i < amostras_pdf:
+            inicio = time.perf_counter()
+            graficos = app.graficos_relatorio_png(serie, ind, cidade, mercado)
+            app.gerar_pdf_relatorio(cidade, mercado, serie, ind["resumo_kpis"], ind["texto_resumo"], graficos)
+            tempos["pdf"].append(time.perf_counter() - inicio)
+    for nome, valores in tempos.items():
+        etapas[nome] = resumo_ms(valores)
+
+
+def executar(escalas=ESCALAS_PADRAO, amostras=AMOSTRAS_SERIES, diretorio=None, manter=False, formato="real",
+             ao_medir=None):
+    """Roda as escalas pedidas, em ordem crescente, e devolve o resultado completo.
+
+    `ao_medir(resultado)` é chamada ao fim de cada escala, com o resultado parcial.
+    """
+    diretorio = diretorio or tempfile.mkdtemp(prefix="bench_escala_")
+    os.makedirs(diretorio, exist_ok=True)
+    resultado = {
+        "gerado_em": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "ambiente": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+        },
+        "amostras_series": amostras,
+        "formato_csv": formato,
+        "escalas": {},
+    }
+    try:
+        for escala in sorted(escalas):
+            resultado["escalas"][str(escala)] = medir_escala(escala, diretorio, amostras, formato=formato)
+            resultado["rss_pico_mb"] = mb(memoria_compartilhada.pico_rss_kb())
+            if ao_medir:
+                ao_medir(resultado)
+    finally:
+        if not manter:
+            shutil.rmtree(diretorio, ignore_errors=True)
+    return resultado
+
+
+def gravar_json(resultado, caminho):
+    """Grava o resultado sem nunca deixar um JSON pela metade em `caminho`."""
+    with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    os.replace(caminho + ".tmp", caminho)
+
+
+def comparar(atual, anterior, limite=LIMITE_REGRESSAO):
+    """Linhas (escala, etapa, p50 anterior, p50 atual, razão, regrediu?) das etapas presentes nos dois."""
+    linhas = []
+    for escala, medidas in atual["escalas"].items():
+        antes = anterior.get("escalas", {}).get(escala)
+        if not antes:
+            continue
+        for etapa, m in medidas["etapas"].items():
+            if etapa not in antes["etapas"]:
+                continue
+            p50_antes, p50 = antes["etapas"][etapa]["p50_ms"], m["p50_ms"]
+            razao = p50 / p50_antes if p50_antes else float("inf")
+            linhas.append((escala, etapa, p50_antes, p50, razao, razao > limite))
+    return linhas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de escala com bases sintéticas")
+    parser.add_argument("--escalas", type=int, nargs="+", choices=list(ESCALAS), default=list(ESCALAS_PADRAO),
+                        help="padrão: 1 e 100 (10000 precisa de muita memória)")
+    parser.add_argument("--amostras", type=int, default=AMOSTRAS_SERIES, help="séries medidas por escala")
+    parser.add_argument("--json", help="arquivo do resultado (padrão: .cache/benchmarks/escala-<data>.json)")
+    parser.add_argument("--comparar", help="resultado anterior para comparar")
+    parser.add_argument("--dir", help="onde gravar as bases sintéticas (padrão: diretório temporário)")
+    parser.add_argument("--manter", action="store_true", help="não apaga as bases geradas")
+    parser.add_argument("--formato", choices=list(dados_sinteticos.FORMATOS_CSV), default="real",
+                        help="formato das bases (real: como o csv_unico.csv)")
+    args = parser.parse_args(argv)
+
+    caminho = args.json or os.path.join(app.CACHE_DIR, "benchmarks", f"escala-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    resultado = executar(
+        args.escalas, args.amostras, args.dir, args.manter, args.formato,
+        ao_medir=lambda parcial: gravar_json(parcial, caminho),
+    )
+
+    print(f"{'Escala':>7}{'Linhas':>12}{'Etapa':>16}{'p50 (ms)':>12}{'p95 (ms)':>12}")
+    for escala, medidas in resultado["escalas"].items():
+        for etapa, m in medidas["etapas"].items():
+            print(f"{escala + 'x':>7}{medidas['linhas']:>12}{etapa:>16}{m['p50_ms']:>12}{m['p95_ms']:>12}")
+        if "erro" in medidas:
+            print(f"{escala + 'x':>7}{medidas['linhas']:>12}  {medidas['erro']}")
+    if resultado.get("rss_pico_mb") is not None:
+        print(f"RSS de pico: {resultado['rss_pico_mb']} MB")
+    print(f"Resultado em {caminho}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+        print(f"\nComparação com {args.comparar} (p50, razão > {LIMITE_REGRESSAO} marcada):")
+        for escala, etapa, antes, agora, razao, regrediu in comparar(resultado, anterior):
+            print(f"{escala + 'x':>7}{etapa:>16}{antes:>12}{agora:>12}{razao:>8.2f}x{'  ⚠' if regrediu else ''}")
+
+
+if __name__ == "__main__":
+    main()
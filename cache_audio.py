@@ -0,0 +1,166 @@
+"""Cache em disco dos áudios de leitura em voz alta, endereçado pelo conteúdo.
+
+A chave é o hash (SHA-256) do idioma + texto: a mesma narração pedida por
+qualquer usuário aponta para o mesmo arquivo, que é devolvido sem nova síntese.
+O diretório tem um limite de bytes; ao passar dele, os áudios usados há mais
+tempo são apagados (LRU, pela data de último acesso gravada no mtime).
+
+O limite vale por processo: cada instância só conta o que achou no diretório
+ao abrir e o que ela mesma gravou. Com vários servidores no mesmo diretório, o
+disco pode chegar à soma dos limites; divida o limite entre eles.
+"""
+import contextlib
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# Temporários mais velhos que isso são de escritas que não terminaram (processo derrubado).
+IDADE_TEMPORARIO_S = 3600
+
+
+def chave_audio(texto, idioma):
+    return hashlib.sha256(f"{idioma}\0{texto}".encode("utf-8")).hexdigest()
+
+
+class CacheAudioDisco:
+    def __init__(self, diretorio, limite_bytes, extensao=".mp3"):
+        self.diretorio = diretorio
+        self.limite_bytes = limite_bytes
+        self.extensao = extensao
+        self._lock = threading.Lock()
+        self._gerando = {}
+        self.acertos = 0
+        self.faltas = 0
+        self.despejos = 0
+
+        os.makedirs(diretorio, exist_ok=True)
+        # Índice em memória (chave -> bytes), do menos para o mais recente.
+        arquivos = []
+        for nome in os.listdir(diretorio):
+            if nome.endswith(extensao):
+                info = os.stat(os.path.join(diretorio, nome))
+                arquivos.append((info.st_mtime, nome[: -len(extensao)], info.st_size))
+        self._itens = OrderedDict((chave, tamanho) for _, chave, tamanho in sorted(arquivos))
+        self._bytes = sum(self._itens.values())
+        self._varrer_temporarios()
+        with self._lock:
+            self._despejar()
+
+    def caminho(self, chave):
+        return os.path.join(self.diretorio, chave + self.extensao)
+
+    def _ler(self, chave):
+        """Conteúdo do arquivo em cache (ou None), marcando-o como recém-usado."""
+        with self._lock:
+            if chave not in self._itens:
+                return None
+            self._itens.move_to_end(chave)
+        try:
+            with open(self.caminho(chave), "rb") as f:
+                dados = f.read()
+            os.utime(self.caminho(chave))
+            return dados
+        except FileNotFoundError:
+            # Apagado por fora (limpeza manual, outro processo): vira uma falta.
+            with self._lock:
+                self._bytes -= self._itens.pop(chave, 0)
+            return None
+
+    def obter(self, texto, idioma):
+        dados = self._ler(chave_audio(texto, idioma))
+        with self._lock:
+            if dados is None:
+                self.faltas += 1
+            else:
+                self.acertos += 1
+        return dados
+
+    def guardar(self, texto, idioma, dados):
+        if len(dados) > self.limite_bytes:
+            return
+        chave = chave_audio(texto, idioma)
+        # Escrita atômica: quem lê nunca vê um MP3 pela metade.
+        fd, temporario = tempfile.mkstemp(dir=self.diretorio, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(dados)
+            os.replace(temporario, self.caminho(chave))
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(temporario)
+            raise
+        with self._lock:
+            self._bytes += len(dados) - self._itens.pop(chave, 0)
+            self._itens[chave] = len(dados)
+            self._despejar()
+
+    def _despejar(self):
+        despejou = False
+        while self._bytes > self.limite_bytes and self._itens:
+            chave, tamanho = self._itens.popitem(last=False)
+            self._bytes -= tamanho
+            self.despejos += 1
+            despejou = True
+            try:
+                os.remove(self.caminho(chave))
+            except FileNotFoundError:
+                pass
+        if despejou:
+            self._varrer_temporarios()
+
+    def _varrer_temporarios(self, idade_s=IDADE_TEMPORARIO_S):
+        """Apaga os `.tmp` abandonados por escritas interrompidas (de qualquer processo)."""
+        limite = time.time() - idade_s
+        for nome in os.listdir(self.diretorio):
+            if not nome.endswith(".tmp"):
+                continue
+            caminho = os.path.join(self.diretorio, nome)
+            with contextlib.suppress(FileNotFoundError):
+                if os.stat(caminho).st_mtime < limite:
+                    os.remove(caminho)
+
+    def obter_ou_gerar(self, texto, idioma, gerar):
+        """Áudio em cache para (texto, idioma), sintetizado com `gerar()` uma única vez em caso de falta."""
+        dados = self.obter(texto, idioma)
+        if dados is not None:
+            return dados
+
+        chave = chave_audio(texto, idioma)
+        with self._lock:
+            trava = self._gerando.setdefault(chave, threading.Lock())
+        with trava:
+            # Outra thread pode ter sintetizado enquanto esperávamos pela trava.
+            dados = self._ler(chave)
+            if dados is not None:
+                return dados
+            try:
+                dados = gerar()
+                self.guardar(texto, idioma, dados)
+            finally:
+                with self._lock:
+                    self._gerando.pop(chave, None)
+        return dados
+
+    def __contains__(self, texto_idioma):
+        with self._lock:
+            return chave_audio(*texto_idioma) in self._itens
+
+    def __len__(self):
+        with self._lock:
+            return len(self._itens)
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.faltas
+            return {
+                "itens": len(self._itens),
+                "bytes": self._bytes,
+                "limite_bytes": self.limite_bytes,
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "despejos": self.despejos,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+            }
@@ -0,0 +1,87 @@
+"""Cache LRU em memória, limitado pelo tamanho total dos valores em bytes.
+
+Pensado para ficar dentro de um `st.cache_resource` e ser compartilhado por
+todas as sessões de um processo: é thread-safe e, em `obter_ou_gerar`, garante
+que duas sessões pedindo a mesma chave ao mesmo tempo não geram o valor duas vezes.
+"""
+import threading
+from collections import OrderedDict
+
+
+class CacheLRU:
+    def __init__(self, limite_bytes, tamanho=len):
+        self.limite_bytes = limite_bytes
+        self.tamanho = tamanho
+        self._itens = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._gerando = {}
+        self.acertos = 0
+        self.faltas = 0
+        self.despejos = 0
+
+    def obter(self, chave):
+        with self._lock:
+            if chave not in self._itens:
+                self.faltas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return self._itens[chave][0]
+
+    def guardar(self, chave, valor):
+        tamanho = self.tamanho(valor)
+        if tamanho > self.limite_bytes:
+            return  # maior que o cache inteiro: não vale despejar tudo por ele
+        with self._lock:
+            if chave in self._itens:
+                self._bytes -= self._itens.pop(chave)[1]
+            self._itens[chave] = (valor, tamanho)
+            self._bytes += tamanho
+            while self._bytes > self.limite_bytes:
+                _, (_, tamanho_antigo) = self._itens.popitem(last=False)
+                self._bytes -= tamanho_antigo
+                self.despejos += 1
+
+    def obter_ou_gerar(self, chave, gerar):
+        """Valor em cache para `chave`, gerando com `gerar()` uma única vez em caso de falta."""
+        valor = self.obter(chave)
+        if valor is not None:
+            return valor
+
+        with self._lock:
+            trava = self._gerando.setdefault(chave, threading.Lock())
+        with trava:
+            # Outra thread pode ter gerado enquanto esperávamos pela trava.
+            with self._lock:
+                if chave in self._itens:
+                    self._itens.move_to_end(chave)
+                    return self._itens[chave][0]
+            try:
+                valor = gerar()
+                self.guardar(chave, valor)
+            finally:
+                with self._lock:
+                    self._gerando.pop(chave, None)
+        return valor
+
+    def __contains__(self, chave):
+        with self._lock:
+            return chave in self._itens
+
+    def __len__(self):
+        with self._lock:
+            return len(self._itens)
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.faltas
+            return {
+                "itens": len(self._itens),
+                "bytes": self._bytes,
+                "limite_bytes": self.limite_bytes,
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "despejos": self.despejos,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+            }
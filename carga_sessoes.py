@@ -0,0 +1,307 @@
+"""Teste de carga em processo: N sessões simultâneas do app completo via AppTest.
+
+Cada sessão faz o fluxo de um usuário real: login (usuário/senha + MFA), troca
+de abas, mudança de filtros e geração/download do PDF. Todas rodam no mesmo
+processo, como sessões de um único servidor Streamlit, compartilhando os
+caches `cache_resource`. Ao final, sai a latência p50/p95/p99 por etapa e a
+memória (RSS) do processo. Não usa rede nem navegador.
+
+Uso:
+    python carga_sessoes.py --sessoes 8 --rodadas 3 --json carga.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import memoria_compartilhada
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# `runtime_compartilhado` troca internos do AppTest; só foi verificado nestas versões (major, minor).
+STREAMLIT_VERIFICADO = ((1, 66), (1, 66))
+ABA_DADOS = "📊 Visualização de Dados"
+ABA_PREVISOES = "🤖 Previsões Inteligentes"
+ABA_RELATORIOS = "📑 Relatórios e PDF"
+
+
+def checar_streamlit():
+    """Falha logo se o Streamlit instalado não é uma versão em que os internos usados foram verificados."""
+    import streamlit
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    versao = tuple(int(parte) for parte in streamlit.__version__.split(".")[:2])
+    minima, maxima = STREAMLIT_VERIFICADO
+    internos = [
+        hasattr(app_test, nome) for nome in ("Runtime", "ScriptCache", "patch_config_options")
+    ] + [hasattr(local_script_runner, "ScriptCache"), hasattr(local_script_runner, "LocalScriptRunner")]
+    if not minima <= versao <= maxima or not all(internos):
+        raise RuntimeError(
+            f"carga_sessoes depende de internos do AppTest verificados no Streamlit "
+            f"{'.'.join(map(str, minima))}–{'.'.join(map(str, maxima))}; instalado: {streamlit.__version__}. "
+            "Confira runtime_compartilhado() e atualize STREAMLIT_VERIFICADO."
+        )
+
+
+@contextlib.contextmanager
+def runtime_compartilhado():
+    """Um único Runtime (simulado) para todas as sessões, como num servidor real.
+
+    Cada `AppTest.run` instala o seu Runtime no atributo global `Runtime._instance`
+    e o zera ao terminar; com sessões em paralelo, uma zeraria o da outra no meio
+    da execução. Aqui o AppTest enxerga um substituto da classe `Runtime`: o
+    primeiro Runtime instalado fica valendo para todos e nenhum é zerado. Pelo
+    mesmo motivo a opção `global.appTest` (que cada execução liga e desliga)
+    fica ligada durante toda a carga. O bytecode do script também é um só
+    (`ScriptCache` do servidor): compilar o app.py em várias threads ao mesmo
+    tempo quebra o `ast.parse` do CPython 3.11. E como todo AppTest usa o mesmo
+    id de sessão, cada sessão recebe um id próprio para que mídias e limpezas
+    por sessão não se misturem.
+    """
+    import uuid
+
+    checar_streamlit()
+    from streamlit.runtime import Runtime
+    from streamlit.testing.v1 import app_test, local_script_runner
+    from streamlit.testing.v1.util import patch_config_options
+
+    class _Meta(type):
+        def __setattr__(cls, nome, valor):
+            if nome != "_instance":
+                setattr(Runtime, nome, valor)
+            elif valor is not None and Runtime._instance is None:
+                Runtime._instance = valor
+
+        def __getattr__(cls, nome):
+            return getattr(Runtime, nome)
+
+        def __dir__(cls):
+            # `MagicMock(spec=...)` usa o dir(): o mock continua com a interface do Runtime.
+            return dir(Runtime)
+
+    class RuntimeCompartilhado(metaclass=_Meta):
+        pass
+
+    init_original = local_script_runner.LocalScriptRunner.__init__
+
+    def init_com_sessao_propria(self, *args, **kwargs):
+        init_original(self, *args, **kwargs)
+        self._session_id = getattr(self.session_state, "_id_carga", None) or str(uuid.uuid4())
+        self.session_state._id_carga = self._session_id
+
+    cache_script = app_test.ScriptCache()
+
+    original = app_test.Runtime
+    patch_original = app_test.patch_config_options
+    script_cache_original = app_test.ScriptCache
+    app_test.Runtime = RuntimeCompartilhado
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: cache_script
+    app_test.patch_config_options = lambda opcoes: contextlib.nullcontext()
+    local_script_runner.LocalScriptRunner.__init__ = init_com_sessao_propria
+    try:
+        with patch_config_options({"global.appTest": True}):
+            yield
+    finally:
+        app_test.Runtime = original
+        app_test.patch_config_options = patch_original
+        app_test.ScriptCache = local_script_runner.ScriptCache = script_cache_original
+        local_script_runner.LocalScriptRunner.__init__ = init_original
+        Runtime._instance = None
+
+
+class Sessao:
+    """Uma sessão do app dirigida pelo AppTest, medindo cada etapa."""
+
+    def __init__(self, codigo_mfa, tempos, timeout=120):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(os.path.join(HERE, "app.py"), default_timeout=timeout)
+        self.codigo_mfa = codigo_mfa
+        self.tempos = tempos
+        self.erros = []
+
+    def _medir(self, etapa, acao):
+        inicio = time.perf_counter()
+        acao()
+        self.tempos.setdefault(etapa, []).append(time.perf_counter() - inicio)
+        if self.at.exception:
+            self.erros.append(f"{etapa}: {self.at.exception[0].message}")
+
+    def login(self):
+        def entrar():
+            self.at.run()
+            self.at.text_input[0].input("admin")
+            self.at.text_input[1].input("admin")
+            self.at.button[0].click().run()
+            self.at.text_input[0].input(self.codigo_mfa())
+            self.at.button[0].click().run()
+            if not self.at.session_state["auth"]:
+                raise RuntimeError("login não concluído")
+
+        self._medir("login", entrar)
+
+    def aba(self, nome):
+        self._medir(f"aba: {nome[2:].strip()}", lambda: self.at.radio[0].set_value(nome).run())
+
+    def filtro(self, chave_ou_indice, rotulo, sorteio):
+        def mudar():
+            caixa = self.at.selectbox(key=chave_ou_indice) if isinstance(chave_ou_indice, str) \
+                else self.at.selectbox[chave_ou_indice]
+            caixa.set_value(sorteio.choice(caixa.options)).run()
+
+        self._medir(f"filtro: {rotulo}", mudar)
+
+    def baixar_pdf(self):
+        def gerar():
+            botoes = [b for b in self.at.button if b.label.startswith("📄")]
+            if botoes:
+                botoes[0].click().run()
+            if not self.at.get("download_button"):
+                raise RuntimeError("botão de download não apareceu")
+
+        self._medir("pdf", gerar)
+
+
+def executar_sessao(codigo_mfa, tempos, rodadas, semente):
+    sorteio = random.Random(semente)
+    sessao = Sessao(codigo_mfa, tempos)
+    try:
+        sessao.login()
+        for _ in range(rodadas):
+            sessao.filtro(0, "cidade (histórico)", sorteio)
+            sessao.aba(ABA_PREVISOES)
+            sessao.filtro(0, "cidade (previsões)", sorteio)
+            sessao.aba(ABA_RELATORIOS)
+            sessao.filtro("rel_cidade", "cidade (relatório)", sorteio)
+            sessao.filtro("rel_periodo", "período (relatório)", sorteio)
+            sessao.baixar_pdf()
+            sessao.aba(ABA_DADOS)
+    except Exception as e:
+        sessao.erros.append(f"{type(e).__name__}: {e}")
+    return sessao.erros
+
+
+def rss_kb():
+    """RSS atual do processo em kB; None fora do Linux."""
+    return memoria_compartilhada.memoria_processo()["rss_kb"]
+
+
+def _mb(kb):
+    return f"{kb / 1024:.0f} MB" if kb is not None else "n/d"
+
+
+def executar_carga(sessoes=8, rodadas=3):
+    """Roda `sessoes` sessões simultâneas e devolve o resumo (latências por etapa e RSS).
+
+    O cadastro MFA é sempre um SQLite temporário, mesmo com PREDIMOVEIS_MFA_DB
+    definido: o teste nunca cadastra nem lê o segredo do "admin" da base real.
+    Diretório atual e PREDIMOVEIS_MFA_DB voltam ao que eram no fim, e o
+    cadastro temporário é apagado.
+    """
+    diretorio_original = os.getcwd()
+    mfa_original = os.environ.get("PREDIMOVEIS_MFA_DB")
+    with tempfile.TemporaryDirectory(prefix="carga_mfa_") as temporario:
+        # Cadastro MFA isolado para o teste: todas as sessões usam o mesmo segredo.
+        os.environ["PREDIMOVEIS_MFA_DB"] = os.path.join(temporario, "mfa.sqlite3")
+        try:
+            # O app abre arquivos (logo, base) relativos à raiz do repositório, como no `streamlit run`.
+            os.chdir(HERE)
+            return _executar_carga(sessoes, rodadas)
+        finally:
+            os.chdir(diretorio_original)
+            if mfa_original is None:
+                os.environ.pop("PREDIMOVEIS_MFA_DB", None)
+            else:
+                os.environ["PREDIMOVEIS_MFA_DB"] = mfa_original
+
+
+def _executar_carga(sessoes, rodadas):
+    import pyotp
+    from cofre_mfa import CofreMFA
+
+    totp = pyotp.TOTP(CofreMFA(os.environ["PREDIMOVEIS_MFA_DB"]).obter_ou_cadastrar("admin")["segredo"])
+
+    rss_inicial = rss_kb()
+    tempos_por_sessao = [{} for _ in range(sessoes)]
+    amostras_rss = []
+    parar = threading.Event()
+
+    def amostrar_rss():
+        while not parar.wait(0.2):
+            rss = rss_kb()
+            if rss is not None:
+                amostras_rss.append(rss)
+
+    amostrador = threading.Thread(target=amostrar_rss, daemon=True)
+    amostrador.start()
+    inicio = time.perf_counter()
+    try:
+        with runtime_compartilhado(), ThreadPoolExecutor(max_workers=sessoes) as executor:
+            erros = list(executor.map(
+                lambda i: executar_sessao(totp.now, tempos_por_sessao[i], rodadas, semente=i),
+                range(sessoes),
+            ))
+    finally:
+        parar.set()
+        amostrador.join()
+    duracao = time.perf_counter() - inicio
+
+    tempos = {}
+    for por_sessao in tempos_por_sessao:
+        for etapa, valores in por_sessao.items():
+            tempos.setdefault(etapa, []).extend(valores)
+
+    etapas = {}
+    for etapa, valores in tempos.items():
+        ms = np.array(valores) * 1000
+        etapas[etapa] = {
+            "qtd": len(ms),
+            "p50_ms": round(float(np.percentile(ms, 50)), 1),
+            "p95_ms": round(float(np.percentile(ms, 95)), 1),
+            "p99_ms": round(float(np.percentile(ms, 99)), 1),
+        }
+    return {
+        "sessoes": sessoes,
+        "rodadas": rodadas,
+        "duracao_s": round(duracao, 2),
+        "etapas": etapas,
+        "rss_kb": {
+            "inicial": rss_inicial,
+            "final": rss_kb(),
+            "pico": max(amostras_rss, default=rss_kb()),
+            "pico_processo": memoria_compartilhada.pico_rss_kb(),
+        },
+        "erros": [e for lista in erros for e in lista],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessoes", type=int, default=8)
+    parser.add_argument("--rodadas", type=int, default=3, help="repetições do fluxo por sessão após o login")
+    parser.add_argument("--json", help="arquivo onde gravar o resumo")
+    args = parser.parse_args(argv)
+
+    resumo = executar_carga(args.sessoes, args.rodadas)
+
+    print(f"{resumo['sessoes']} sessões × {resumo['rodadas']} rodadas em {resumo['duracao_s']} s")
+    print(f"{'Etapa':<28}{'Qtd':>6}{'p50 (ms)':>12}{'p95 (ms)':>12}{'p99 (ms)':>12}")
+    for etapa, m in resumo["etapas"].items():
+        print(f"{etapa:<28}{m['qtd']:>6}{m['p50_ms']:>12}{m['p95_ms']:>12}{m['p99_ms']:>12}")
+    rss = resumo["rss_kb"]
+    print(f"RSS: inicial {_mb(rss['inicial'])} | pico {_mb(rss['pico'])} | final {_mb(rss['final'])}")
+    if resumo["erros"]:
+        print(f"{len(resumo['erros'])} erros; primeiro: {resumo['erros'][0]}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resumo, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
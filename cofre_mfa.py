@@ -0,0 +1,106 @@
+"""Cadastro persistente do MFA (TOTP) por usuário, em SQLite.
+
+Cada usuário recebe um segredo uma única vez; o QR code de provisionamento é
+renderizado nesse momento e guardado junto (PNG), então as reexecuções da tela
+de MFA não fazem nenhum trabalho de imagem. Depois do primeiro código válido o
+cadastro fica confirmado e o usuário que volta vai direto para o código, sem QR.
+
+Para refazer o cadastro de um usuário (ex.: perdeu o celular):
+    python cofre_mfa.py redefinir admin --db .dados/mfa.sqlite3
+"""
+import argparse
+import contextlib
+import os
+import sqlite3
+import time
+from io import BytesIO
+
+import pyotp
+import qrcode
+
+
+class CofreMFA:
+    """Cadastros lidos do SQLite a cada consulta (uma leitura por chave primária).
+
+    Sem cache em memória: um `redefinir` feito por outro processo (a linha de
+    comando abaixo) vale na hora para os servidores já em execução.
+    """
+
+    def __init__(self, caminho, emissor="PredImóveis"):
+        self.caminho = caminho
+        self.emissor = emissor
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        with self._conectar() as con:
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cadastros (
+                    usuario TEXT PRIMARY KEY,
+                    segredo TEXT NOT NULL,
+                    qr_png BLOB NOT NULL,
+                    confirmado INTEGER NOT NULL DEFAULT 0,
+                    criado_em REAL NOT NULL
+                )
+                """
+            )
+
+    @contextlib.contextmanager
+    def _conectar(self):
+        """Conexão em uma transação (commit ao sair sem erro), sempre fechada no fim."""
+        with contextlib.closing(sqlite3.connect(self.caminho, timeout=10)) as con, con:
+            yield con
+
+    def _renderizar_qr(self, usuario, segredo):
+        uri = pyotp.TOTP(segredo).provisioning_uri(name=f"{usuario}@example.com", issuer_name=self.emissor)
+        buf = BytesIO()
+        qrcode.make(uri).save(buf, format="PNG")
+        return buf.getvalue()
+
+    def obter(self, usuario):
+        """Cadastro do usuário ({segredo, qr_png, confirmado}) ou None."""
+        with self._conectar() as con:
+            linha = con.execute(
+                "SELECT segredo, qr_png, confirmado FROM cadastros WHERE usuario = ?", (usuario,)
+            ).fetchone()
+        if linha is None:
+            return None
+        return {"segredo": linha[0], "qr_png": bytes(linha[1]), "confirmado": bool(linha[2])}
+
+    def obter_ou_cadastrar(self, usuario):
+        cadastro = self.obter(usuario)
+        if cadastro is not None:
+            return cadastro
+        segredo = pyotp.random_base32()
+        qr_png = self._renderizar_qr(usuario, segredo)
+        with self._conectar() as con:
+            # Se outro processo cadastrou no meio tempo, vale o que já está gravado.
+            con.execute(
+                "INSERT OR IGNORE INTO cadastros (usuario, segredo, qr_png, confirmado, criado_em) "
+                "VALUES (?, ?, ?, 0, ?)",
+                (usuario, segredo, qr_png, time.time()),
+            )
+        return self.obter(usuario)
+
+    def confirmar(self, usuario):
+        """Marca o cadastro como concluído (primeiro código válido lido do app autenticador)."""
+        with self._conectar() as con:
+            con.execute("UPDATE cadastros SET confirmado = 1 WHERE usuario = ?", (usuario,))
+
+    def redefinir(self, usuario):
+        with self._conectar() as con:
+            con.execute("DELETE FROM cadastros WHERE usuario = ?", (usuario,))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cadastro do MFA (TOTP) por usuário")
+    parser.add_argument("--db", default=os.environ.get("PREDIMOVEIS_MFA_DB", os.path.join(".dados", "mfa.sqlite3")))
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_redefinir = sub.add_parser("redefinir", help="apaga o cadastro; o usuário verá o QR code de novo")
+    p_redefinir.add_argument("usuario")
+    args = parser.parse_args(argv)
+
+    CofreMFA(args.db).redefinir(args.usuario)
+    print(f"Cadastro MFA de {args.usuario!r} removido.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Bases sintéticas no formato do `csv_unico.csv` e do snapshot SARIMA, em qualquer escala.
+
+Reproduz as colunas da base real (Data, Cidade, Tipo_Mercado, Numero_Indice_Total,
+Var_Mensal_Percent, Var_12m_Percent, Preco_m2, IPCA, IGP-M, IPCA_var, IGPM_var,
+SELIC_media_mensal) em dois formatos: `real`, o do arquivo do repositório ("," separa
+as colunas, "." é o decimal, preço com uma casa), e `br`, o de planilhas pt-BR
+(";" separa as colunas, "," é o decimal e o preço leva "." de milhar), que passa
+pelo outro caminho do parser do app. Os indicadores macro são séries
+nacionais, as mesmas para todas as cidades; cada série de preço tem tendência,
+sazonalidade anual e ruído próprios. A geração é determinística (semente) e
+gravada em blocos de cidades, então a memória não cresce com a base.
+
+Uso:
+    python dados_sinteticos.py --cidades 90 --meses 480 --csv base.csv --joblib modelos.joblib [--formato br]
+"""
+import argparse
+
+import joblib
+import numpy as np
+import pandas as pd
+
+CIDADES_NORDESTE = [
+    "Aracaju", "Fortaleza", "João Pessoa", "Maceió", "Natal", "Recife", "Salvador", "São Luís", "Teresina",
+]
+MERCADOS = ["Locacao", "Venda"]
+COLUNAS = [
+    "Data", "Cidade", "Tipo_Mercado", "Numero_Indice_Total", "Var_Mensal_Percent", "Var_12m_Percent",
+    "Preco_m2", "IPCA", "IGP-M", "IPCA_var", "IGPM_var", "SELIC_media_mensal",
+]
+# Faixa do preço inicial (R$/m²) por tipo de mercado.
+PRECO_INICIAL = {"Locacao": (15.0, 60.0), "Venda": (3500.0, 12000.0)}
+ULTIMA_DATA = "2025-04-01"
+HORIZONTE_MESES = 36
+# Formato -> opções do `to_csv`; `real` é o do csv_unico.csv.
+FORMATOS_CSV = {
+    "real": {"sep": ",", "decimal": "."},
+    "br": {"sep": ";", "decimal": ",", "float_format": "%.4f"},
+}
+CIDADES_POR_BLOCO = 500
+
+
+def nomes_cidades(n):
+    """As capitais do Nordeste e, além delas, cidades numeradas."""
+    extras = [f"Cidade Sintética {i:05d}" for i in range(1, n - len(CIDADES_NORDESTE) + 1)]
+    return (CIDADES_NORDESTE + extras)[:n]
+
+
+def datas_mensais(meses, fim=ULTIMA_DATA):
+    return pd.date_range(end=fim, periods=meses, freq="MS")
+
+
+def _ar1(rng, n, media, phi, desvio, inicio=None):
+    valores = np.empty(n)
+    valores[0] = media if inicio is None else inicio
+    choques = rng.normal(0.0, desvio, n)
+    for t in range(1, n):
+        valores[t] = media + phi * (valores[t - 1] - media) + choques[t]
+    return valores
+
+
+def series_macro(meses, rng):
+    """IPCA e IGP-M acumulados em 12 meses (%), suas variações mensais (%) e a SELIC média."""
+    ipca = np.clip(_ar1(rng, meses, 5.0, 0.95, 0.35), 0.5, 15.0)
+    igpm = np.clip(_ar1(rng, meses, 6.0, 0.93, 0.8), -5.0, 35.0)
+    selic = np.clip(_ar1(rng, meses, 0.04, 0.97, 0.002), 0.005, 0.08)
+    variacao = lambda v: np.concatenate([[np.nan], (v[1:] / v[:-1] - 1) * 100])
+    return pd.DataFrame({
+        "IPCA": ipca,
+        "IGP-M": igpm,
+        "IPCA_var": variacao(ipca),
+        "IGPM_var": variacao(igpm),
+        "SELIC_media_mensal": selic,
+    })
+
+
+def indices_precos(n_series, meses, rng):
+    """Índices (base 100 no 1º mês): passeio aleatório com tendência mais sazonalidade anual, por série."""
+    tendencia = rng.normal(0.004, 0.003, (n_series, 1))
+    amplitude = rng.uniform(0.005, 0.03, (n_series, 1))
+    fase = rng.uniform(0, 2 * np.pi, (n_series, 1))
+    meses_ = np.arange(meses)
+    choques = rng.normal(0.0, 0.008, (n_series, meses))
+    log_indice = np.cumsum(tendencia + choques, axis=1) + amplitude * np.sin(2 * np.pi * meses_ / 12 + fase)
+    return 100 * np.exp(log_indice - log_indice[:, :1])
+
+
+def formatar_preco_br(valores):
+    """'8.123,45': duas casas, vírgula decimal e ponto de milhar (vetorizado)."""
+    centavos = np.round(np.asarray(valores, dtype=float) * 100).astype(np.int64)
+    inteiro, fracao = np.divmod(centavos, 100)
+    # Grupos de 3 dígitos com zeros à esquerda, juntados por "."; os zeros do início saem no fim.
+    texto = np.char.zfill((inteiro % 1000).astype(str), 3)
+    resto = inteiro // 1000
+    while (resto > 0).any():
+        grupo = np.char.zfill((resto % 1000).astype(str), 3)
+        texto = np.where(resto > 0, np.char.add(np.char.add(grupo, "."), texto), texto)
+        resto //= 1000
+    texto = np.char.lstrip(texto, "0")
+    texto = np.where(texto == "", "0", texto)
+    return np.char.add(np.char.add(texto, ","), np.char.zfill(fracao.astype(str), 2))
+
+
+def _bloco(cidades, mercados, datas, macro, rng, formato="real"):
+    """Linhas de todas as séries de `cidades` × `mercados`, ordenadas por série e data."""
+    meses = len(datas)
+    series = [(c, m) for c in cidades for m in mercados]
+    indices = indices_precos(len(series), meses, rng)
+    inicial = np.array([rng.uniform(*PRECO_INICIAL[m]) for _, m in series])[:, None]
+    precos = inicial * indices / 100
+
+    var_mensal = np.full_like(indices, np.nan)
+    var_mensal[:, 1:] = (indices[:, 1:] / indices[:, :-1] - 1) * 100
+    var_12m = np.zeros_like(indices)
+    var_12m[:, 12:] = (indices[:, 12:] / indices[:, :-12] - 1) * 100
+
+    bloco = pd.DataFrame({
+        "Data": np.tile(datas.strftime("%Y-%m-%d"), len(series)),
+        "Cidade": np.repeat([c for c, _ in series], meses),
+        "Tipo_Mercado": np.repeat([m for _, m in series], meses),
+        "Numero_Indice_Total": np.round(indices, 1).ravel(),
+        "Var_Mensal_Percent": var_mensal.ravel(),
+        "Var_12m_Percent": var_12m.ravel(),
+        "Preco_m2": formatar_preco_br(precos.ravel()) if formato == "br" else np.round(precos.ravel(), 1),
+    })
+    for coluna in macro.columns:
+        bloco[coluna] = np.tile(macro[coluna].to_numpy(), len(series))
+    return bloco[COLUNAS], series, precos[:, -1]
+
+
+def gerar_base(caminho_csv, n_cidades=len(CIDADES_NORDESTE), meses=48, caminho_joblib=None,
+               mercados=MERCADOS, semente=42, horizonte=HORIZONTE_MESES, formato="real"):
+    """Grava a base (e, com `caminho_joblib`, um snapshot de previsões); devolve um resumo."""
+    if formato not in FORMATOS_CSV:
+        raise ValueError(f"Formato desconhecido: {formato!r} (use {', '.join(FORMATOS_CSV)}).")
+    rng = np.random.default_rng(semente)
+    datas = datas_mensais(meses)
+    macro = series_macro(meses, rng)
+    cidades = nomes_cidades(n_cidades)
+
+    linhas = 0
+    previsoes = []
+    with open(caminho_csv, "w", encoding="utf-8", newline="") as destino:
+        for inicio in range(0, len(cidades), CIDADES_POR_BLOCO):
+            bloco, series, ultimos = _bloco(cidades[inicio:inicio + CIDADES_POR_BLOCO], mercados, datas, macro, rng, formato)
+            bloco.to_csv(destino, index=False, header=linhas == 0, **FORMATOS_CSV[formato])
+            linhas += len(bloco)
+            if caminho_joblib:
+                previsoes.append(_previsoes(series, ultimos, datas[-1], horizonte, rng))
+
+    if caminho_joblib:
+        gravar_snapshot(caminho_joblib, pd.concat(previsoes, ignore_index=True), datas[-1], horizonte, rng)
+    return {"linhas": linhas, "series": len(cidades) * len(mercados), "cidades": len(cidades), "meses": meses}
+
+
+def _previsoes(series, ultimos, ultima_data, horizonte, rng):
+    datas = pd.date_range(ultima_data + pd.DateOffset(months=1), periods=horizonte, freq="MS")
+    crescimento = np.cumsum(rng.normal(0.004, 0.002, (len(series), horizonte)), axis=1)
+    return pd.DataFrame({
+        "data": np.tile(datas.values, len(series)),
+        "cidade": np.repeat([c for c, _ in series], horizonte),
+        "tipo_mercado": np.repeat([m for _, m in series], horizonte),
+        "preco_previsto": (ultimos[:, None] * np.exp(crescimento)).ravel(),
+    })
+
+
+def gravar_snapshot(caminho, previsoes, ultima_data, horizonte, rng):
+    """Snapshot no formato do `modelos_sarima.joblib`: previsões, métricas e info."""
+    metricas = previsoes[["cidade", "tipo_mercado"]].drop_duplicates().reset_index(drop=True)
+    metricas["mae"] = rng.uniform(0.1, 2.0, len(metricas))
+    metricas["rmse"] = metricas["mae"] * rng.uniform(1.1, 1.6, len(metricas))
+    joblib.dump({
+        "previsoes_futuras": previsoes,
+        "metricas_modelo": metricas,
+        "info": {
+            "modelo": "SARIMA(1,1,1)(1,1,1,12)",
+            "horizonte_previsao_meses": horizonte,
+            "ultima_data_historica": f"{ultima_data:%Y-%m-%d}",
+            "gerado_por": "dados_sinteticos.py",
+        },
+    }, caminho)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera uma base sintética no formato do csv_unico.csv")
+    parser.add_argument("--csv", required=True)
+    parser.add_argument("--joblib", help="grava também um snapshot de previsões neste arquivo")
+    parser.add_argument("--cidades", type=int, default=len(CIDADES_NORDESTE))
+    parser.add_argument("--meses", type=int, default=48)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--formato", choices=list(FORMATOS_CSV), default="real",
+                        help="real: como o csv_unico.csv; br: ';' e vírgula decimal")
+    args = parser.parse_args(argv)
+
+    resumo = gerar_base(args.csv, args.cidades, args.meses, args.joblib, semente=args.semente, formato=args.formato)
+    print(f"{resumo['linhas']} linhas, {resumo['series']} séries ({resumo['cidades']} cidades × {resumo['meses']} meses) em {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Exportação de tabelas em CSV, Parquet e Arrow IPC, bloco a bloco.
+
+A seleção (posições das linhas, já filtradas e ordenadas) é percorrida em
+blocos de `LINHAS_POR_BLOCO` linhas: cada bloco é convertido e gravado no
+destino antes do próximo ser montado, então o pico de memória é o de um bloco,
+não o da tabela inteira em texto. No Parquet, cada bloco vira um row group; no
+Arrow IPC, um record batch.
+
+A exportação em lote grava a base histórica e as previsões inteiras,
+particionadas por cidade/tipo_mercado (layout Hive, legível por
+`pyarrow.dataset`, Spark, DuckDB...), com um manifesto de contagens e versões:
+
+    python exportacao.py --dir exportacao/ --formato parquet
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+LINHAS_POR_BLOCO = 50_000
+
+
+def blocos(df, posicoes=None, colunas=None, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """DataFrames com as linhas de `posicoes` (todas, se None), em ordem, `linhas_por_bloco` por vez."""
+    # As colunas são escolhidas por bloco: `df[colunas]` de uma vez copiaria a tabela inteira.
+    colunas = slice(None) if colunas is None else [df.columns.get_loc(c) for c in colunas]
+    if posicoes is None:
+        # Sem seleção, cada bloco é uma fatia contígua (sem gather das linhas).
+        for inicio in range(0, len(df), linhas_por_bloco):
+            yield df.iloc[inicio:inicio + linhas_por_bloco, colunas]
+        return
+    posicoes = np.asarray(posicoes)
+    for inicio in range(0, len(posicoes), linhas_por_bloco):
+        yield df.iloc[posicoes[inicio:inicio + linhas_por_bloco], colunas]
+
+
+def escrever_csv(df, destino, posicoes=None, colunas=None, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Grava a seleção como CSV (UTF-8) no arquivo binário `destino`."""
+    texto = io.TextIOWrapper(destino, encoding="utf-8", newline="", write_through=True)
+    try:
+        cabecalho = True
+        for bloco in blocos(df, posicoes, colunas, linhas_por_bloco):
+            bloco.to_csv(texto, header=cabecalho, index=False)
+            cabecalho = False
+        if cabecalho:
+            # Seleção vazia: só o cabeçalho.
+            (df if colunas is None else df[list(colunas)]).head(0).to_csv(texto, index=False)
+    finally:
+        texto.detach()
+
+
+def escrever_parquet(df, destino, posicoes=None, colunas=None, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Grava a seleção como Parquet no arquivo binário (ou caminho) `destino`, um row group por bloco."""
+    escritor = None
+    try:
+        for bloco in blocos(df, posicoes, colunas, linhas_por_bloco):
+            if escritor is None:
+                # O esquema vem do primeiro bloco: numa tabela vazia, colunas de texto não têm tipo.
+                tabela = pa.Table.from_pandas(bloco, preserve_index=False)
+                esquema = tabela.schema
+                escritor = pq.ParquetWriter(destino, esquema)
+            else:
+                tabela = pa.Table.from_pandas(bloco, schema=esquema, preserve_index=False)
+            escritor.write_table(tabela)
+        if escritor is None:
+            vazia = (df if colunas is None else df[list(colunas)]).head(0)
+            pq.write_table(pa.Table.from_pandas(vazia, preserve_index=False), destino)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+def escrever_arrow(df, destino, posicoes=None, colunas=None, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Grava a seleção como arquivo Arrow IPC (Feather v2) em `destino`, um record batch por bloco."""
+    escritor = None
+    try:
+        for bloco in blocos(df, posicoes, colunas, linhas_por_bloco):
+            if escritor is None:
+                tabela = pa.Table.from_pandas(bloco, preserve_index=False)
+                esquema = tabela.schema
+                escritor = pa.ipc.new_file(destino, esquema)
+            else:
+                tabela = pa.Table.from_pandas(bloco, schema=esquema, preserve_index=False)
+            escritor.write_table(tabela)
+        if escritor is None:
+            vazia = pa.Table.from_pandas((df if colunas is None else df[list(colunas)]).head(0), preserve_index=False)
+            escritor = pa.ipc.new_file(destino, vazia.schema)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+def arquivo_exportado(escrever, df, posicoes=None, colunas=None):
+    """BytesIO (posicionado no início) com a exportação feita por `escrever`.
+
+    Fica inteiro em memória: o `st.download_button` só aceita bytes e guarda o
+    arquivo na memória do servidor até o download. O limite prático é, então,
+    a RAM do processo; para a base inteira, use a exportação em lote abaixo.
+    """
+    arquivo = io.BytesIO()
+    escrever(df, arquivo, posicoes, colunas)
+    arquivo.seek(0)
+    return arquivo
+
+
+# -------------------- Exportação em lote, particionada --------------------
+FORMATOS = {"parquet": escrever_parquet, "arrow": escrever_arrow}
+MANIFESTO = "manifesto.json"
+COLUNAS_PARTICAO = ("cidade", "tipo_mercado")
+
+
+def valor_particao(valor):
+    """Valor de partição para o nome do diretório, escapando só o que quebraria o caminho (como o Hive)."""
+    return "".join(f"%{ord(c):02X}" if c in '%/\\:=#?"' or ord(c) < 32 else c for c in str(valor))
+
+
+def arquivo_particao(tabela, cidade, mercado, formato):
+    """Caminho relativo (com '/') do arquivo de uma partição."""
+    return f"{tabela}/cidade={valor_particao(cidade)}/tipo_mercado={valor_particao(mercado)}/dados.{formato}"
+
+
+def particoes(tabelas, formato):
+    """(arquivo, tabela, cidade, tipo_mercado, início, fim) de cada série, na ordem das tabelas.
+
+    `tabelas` é {nome: (DataFrame ordenado por série, índice de posições por série)};
+    cada partição é a fatia [início, fim) do frame, sem cópia.
+    """
+    for nome, (df, indice) in tabelas.items():
+        for (cidade, mercado), (ini, fim) in sorted(indice.items()):
+            if fim > ini:
+                yield arquivo_particao(nome, cidade, mercado, formato), nome, cidade, mercado, ini, fim
+
+
+def montar_manifesto(tabelas, formato, versoes=None):
+    """Manifesto da exportação: versões dos dados e linhas de cada tabela e partição."""
+    manifesto = {
+        "formato": formato,
+        "gerado_em": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "particionamento": list(COLUNAS_PARTICAO),
+        "versoes": versoes or {},
+        "tabelas": {},
+    }
+    for nome, (df, indice) in tabelas.items():
+        manifesto["tabelas"][nome] = {
+            "linhas": 0,
+            "colunas": [c for c in df.columns if c not in COLUNAS_PARTICAO],
+            "particoes": [],
+        }
+    for arquivo, nome, cidade, mercado, ini, fim in particoes(tabelas, formato):
+        tabela = manifesto["tabelas"][nome]
+        tabela["linhas"] += fim - ini
+        tabela["particoes"].append({"arquivo": arquivo, "cidade": cidade, "tipo_mercado": mercado, "linhas": fim - ini})
+    return manifesto
+
+
+def escrever_particao(df, ini, fim, destino, formato):
+    """Grava as linhas [ini, fim) de `df` (sem as colunas de partição) em `destino`."""
+    colunas = [c for c in df.columns if c not in COLUNAS_PARTICAO]
+    FORMATOS[formato](df.iloc[ini:fim], destino, colunas=colunas)
+
+
+def exportar_particionado(tabelas, diretorio, formato="parquet", versoes=None):
+    """Grava todas as partições e o manifesto em `diretorio`, substituindo a exportação anterior.
+
+    Tudo é gravado num diretório temporário ao lado e trocado no fim: quem lê
+    `diretorio` nunca vê uma exportação pela metade. Só uma exportação anterior
+    (com `manifesto.json`) ou um diretório vazio são substituídos: um `--dir`
+    digitado errado não apaga nada.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconhecido: {formato!r} (use {', '.join(FORMATOS)}).")
+    diretorio = os.path.abspath(diretorio)
+    if os.path.exists(diretorio) and not (
+        os.path.isdir(diretorio) and (not os.listdir(diretorio) or os.path.isfile(os.path.join(diretorio, MANIFESTO)))
+    ):
+        raise ValueError(f"{diretorio} já existe e não é uma exportação anterior (sem {MANIFESTO}); escolha outro destino.")
+    pai = os.path.dirname(diretorio)
+    os.makedirs(pai, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".exportacao-", dir=pai)
+    try:
+        for arquivo, nome, _, _, ini, fim in particoes(tabelas, formato):
+            caminho = os.path.join(tmp, *arquivo.split("/"))
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            escrever_particao(tabelas[nome][0], ini, fim, caminho, formato)
+        manifesto = montar_manifesto(tabelas, formato, versoes)
+        with open(os.path.join(tmp, MANIFESTO), "w", encoding="utf-8") as f:
+            json.dump(manifesto, f, ensure_ascii=False, indent=2, default=str)
+
+        antigo = None
+        if os.path.exists(diretorio):
+            antigo = tempfile.mkdtemp(prefix=".exportacao-antiga-", dir=pai)
+            os.rename(diretorio, os.path.join(antigo, "dados"))
+        os.rename(tmp, diretorio)
+        if antigo:
+            shutil.rmtree(antigo, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return manifesto
+
+
+def tabelas_do_app():
+    """(tabelas, versões) a exportar, lidas pelos carregadores do app (base histórica e previsões)."""
+    import app
+
+    df_hist, pacote = app.carregar_bases()
+    derivados = app.derivados_bases()
+    tabelas = {"historico": (df_hist, derivados["historico"])}
+    if pacote is not None and "previsoes_futuras" in derivados:
+        tabelas["previsoes_futuras"] = (pacote["previsoes_futuras"], derivados["previsoes_futuras"])
+    versoes = {
+        "dados": app.versao_dados(),
+        "base_historica": app.versao_arquivos(app.CSV_PATH),
+        "snapshot": app.versao_arquivos(app.JOBLIB_PATH),
+        "snapshot_info": (pacote or {}).get("info", {}),
+    }
+    return tabelas, versoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exportação em lote (particionada) da base histórica e das previsões")
+    parser.add_argument("--dir", required=True, help="diretório de destino (substituído a cada exportação)")
+    parser.add_argument("--formato", choices=list(FORMATOS), default="parquet")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    tabelas, versoes = tabelas_do_app()
+    try:
+        manifesto = exportar_particionado(tabelas, args.dir, args.formato, versoes)
+    except ValueError as e:
+        parser.error(str(e))
+    for nome, tabela in manifesto["tabelas"].items():
+        print(f"{nome}: {tabela['linhas']} linhas em {len(tabela['particoes'])} partições")
+    print(f"Exportado em {args.dir} ({args.formato}, versão {versoes['dados']}) em {time.perf_counter() - inicio:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
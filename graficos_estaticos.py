@@ -0,0 +1,171 @@
+"""Renderização estática (PNG) dos gráficos do painel de relatórios para o PDF.
+
+Os gráficos interativos da interface são Plotly; exportá-los como imagem
+exigiria o kaleido e um Chrome no servidor. Aqui eles são redesenhados com
+Pillow (já instalado via ``qrcode[pil]``): linha, barras, boxplot e pizza, com
+as mesmas séries e títulos da tela. Cada função devolve os bytes de um PNG.
+"""
+import os
+import unicodedata
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from PIL import Image, ImageDraw, ImageFont
+
+LARGURA, ALTURA = 1000, 480
+MARGEM_ESQ, MARGEM_DIR, MARGEM_TOPO, MARGEM_BASE = 90, 30, 60, 60
+CORES = ["#636EFA", "#EF553B", "#00CC96", "#AB63FA", "#FFA15A", "#19D3F3", "#FF6692", "#B6E880"]
+COR_GRADE = "#E5ECF6"
+COR_TEXTO = "#2A3F5F"
+
+_FONTES_SISTEMA = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+]
+_fontes = {}
+
+
+def _fonte(tamanho):
+    if tamanho not in _fontes:
+        fonte = None
+        for caminho in _FONTES_SISTEMA:
+            if os.path.exists(caminho):
+                fonte = ImageFont.truetype(caminho, tamanho)
+                break
+        _fontes[tamanho] = (fonte or ImageFont.load_default(size=tamanho), fonte is not None)
+    return _fontes[tamanho]
+
+
+def _escrever(draw, xy, texto, tamanho=14, anchor="la", fill=COR_TEXTO):
+    fonte, unicode_ok = _fonte(tamanho)
+    if not unicode_ok:
+        # A fonte embutida do Pillow não tem acentos: cai para ASCII, como o PDF.
+        texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode()
+    draw.text(xy, texto, font=fonte, fill=fill, anchor=anchor)
+
+
+def _formata(v):
+    return f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _tela(titulo):
+    img = Image.new("RGB", (LARGURA, ALTURA), "white")
+    draw = ImageDraw.Draw(img)
+    _escrever(draw, (MARGEM_ESQ, 20), titulo, tamanho=20)
+    return img, draw
+
+
+def _area():
+    return MARGEM_ESQ, MARGEM_TOPO, LARGURA - MARGEM_DIR, ALTURA - MARGEM_BASE
+
+
+def _eixo_y(draw, vmin, vmax):
+    """Desenha a grade horizontal e os rótulos do eixo y; retorna a função valor -> pixel."""
+    if vmax == vmin:
+        vmin, vmax = vmin - 1, vmax + 1
+    folga = (vmax - vmin) * 0.05
+    vmin, vmax = vmin - folga, vmax + folga
+    x0, y0, x1, y1 = _area()
+
+    def py(v):
+        return y1 - (v - vmin) / (vmax - vmin) * (y1 - y0)
+
+    for v in np.linspace(vmin, vmax, 6):
+        draw.line([(x0, py(v)), (x1, py(v))], fill=COR_GRADE, width=1)
+        _escrever(draw, (x0 - 8, py(v)), _formata(v), tamanho=12, anchor="rm")
+    return py
+
+
+def _png(img):
+    buf = BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def renderizar_linha(datas, valores, titulo):
+    img, draw = _tela(titulo)
+    valores = np.asarray(valores, dtype=float)
+    if len(valores) == 0:
+        return _png(img)
+    tempos = pd.to_datetime(pd.Series(datas)).astype("int64").to_numpy().astype(float)
+    py = _eixo_y(draw, valores.min(), valores.max())
+    x0, _, x1, y1 = _area()
+    span = (tempos.max() - tempos.min()) or 1.0
+
+    pontos = [(x0 + (t - tempos.min()) / span * (x1 - x0), py(v)) for t, v in zip(tempos, valores)]
+    draw.line(pontos, fill=CORES[0], width=3, joint="curve")
+    if len(pontos) <= 120:
+        for x, y in pontos:
+            draw.ellipse([x - 4, y - 4, x + 4, y + 4], fill=CORES[0])
+
+    datas = pd.to_datetime(pd.Series(datas)).reset_index(drop=True)
+    for i in np.linspace(0, len(datas) - 1, min(6, len(datas))).astype(int):
+        _escrever(draw, (pontos[i][0], y1 + 10), datas[i].strftime("%m/%Y"), tamanho=12, anchor="ma")
+    return _png(img)
+
+
+def renderizar_barras(categorias, valores, titulo):
+    img, draw = _tela(titulo)
+    valores = np.asarray(valores, dtype=float)
+    if len(valores) == 0:
+        return _png(img)
+    py = _eixo_y(draw, min(0.0, valores.min()), valores.max())
+    x0, _, x1, y1 = _area()
+    passo = (x1 - x0) / len(valores)
+    for i, (cat, v) in enumerate(zip(categorias, valores)):
+        esq = x0 + i * passo + passo * 0.15
+        dir_ = x0 + (i + 1) * passo - passo * 0.15
+        draw.rectangle([esq, py(v), dir_, py(0)], fill=CORES[0])
+        _escrever(draw, ((esq + dir_) / 2, y1 + 10), str(cat), tamanho=12, anchor="ma")
+    return _png(img)
+
+
+def renderizar_boxplot(categorias, estatisticas, titulo):
+    """`estatisticas`: uma entrada por categoria com q1, mediana, q3, limite_inf, limite_sup e outliers."""
+    img, draw = _tela(titulo)
+    if not estatisticas:
+        return _png(img)
+    minimo = min(min([e["limite_inf"]] + list(e["outliers"])) for e in estatisticas)
+    maximo = max(max([e["limite_sup"]] + list(e["outliers"])) for e in estatisticas)
+    py = _eixo_y(draw, minimo, maximo)
+    x0, _, x1, y1 = _area()
+    passo = (x1 - x0) / len(estatisticas)
+    for i, (cat, e) in enumerate(zip(categorias, estatisticas)):
+        centro = x0 + (i + 0.5) * passo
+        meia = passo * 0.25
+        draw.line([(centro, py(e["limite_inf"])), (centro, py(e["q1"]))], fill=CORES[0], width=2)
+        draw.line([(centro, py(e["q3"])), (centro, py(e["limite_sup"]))], fill=CORES[0], width=2)
+        for limite in (e["limite_inf"], e["limite_sup"]):
+            draw.line([(centro - meia / 2, py(limite)), (centro + meia / 2, py(limite))], fill=CORES[0], width=2)
+        draw.rectangle([centro - meia, py(e["q3"]), centro + meia, py(e["q1"])], outline=CORES[0], fill="#D5D9FD", width=2)
+        draw.line([(centro - meia, py(e["mediana"])), (centro + meia, py(e["mediana"]))], fill=CORES[0], width=3)
+        for v in e["outliers"]:
+            draw.ellipse([centro - 3, py(v) - 3, centro + 3, py(v) + 3], outline=CORES[0])
+        _escrever(draw, (centro, y1 + 10), str(cat), tamanho=12, anchor="ma")
+    return _png(img)
+
+
+def renderizar_pizza(rotulos, contagens, titulo):
+    img, draw = _tela(titulo)
+    contagens = np.asarray(contagens, dtype=float)
+    total = contagens.sum()
+    if total <= 0:
+        return _png(img)
+    raio = (ALTURA - MARGEM_TOPO - 30) / 2
+    cx, cy = MARGEM_ESQ + raio, MARGEM_TOPO + 10 + raio
+    inicio = -90.0
+    for i, (rotulo, qtd) in enumerate(zip(rotulos, contagens)):
+        fim = inicio + qtd / total * 360
+        cor = CORES[i % len(CORES)]
+        draw.pieslice([cx - raio, cy - raio, cx + raio, cy + raio], inicio, fim, fill=cor, outline="white")
+        legenda_y = MARGEM_TOPO + 20 + i * 28
+        draw.rectangle([cx + raio + 60, legenda_y, cx + raio + 76, legenda_y + 16], fill=cor)
+        _escrever(draw, (cx + raio + 86, legenda_y), f"{rotulo}  ({qtd / total * 100:.1f}%)", tamanho=14)
+        inicio = fim
+    # furo central (gráfico de rosca, como na tela)
+    furo = raio * 0.35
+    draw.ellipse([cx - furo, cy - furo, cx + furo, cy + furo], fill="white")
+    return _png(img)
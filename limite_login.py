@@ -0,0 +1,177 @@
+"""Limite de tentativas de login sem bloquear a thread do script.
+
+Cada par (usuário, cliente) tem um balde de fichas: cada falha consome uma
+ficha e as fichas voltam a uma taxa fixa. Sem fichas, o par fica bloqueado até
+a próxima ficha voltar. Consultar e registrar são operações O(1) que devolvem
+o estado na hora, sem `sleep`: quem espera é o atacante, não o servidor.
+Baldes cheios de novo (equivalentes a um balde novo) expiram e são descartados.
+
+`cliente_real` identifica o cliente atrás de proxies reversos sem confiar no
+que o próprio cliente escreve em X-Forwarded-For.
+
+Para comparar a vazão de login com o `sleep` antigo e com o limitador:
+    python limite_login.py benchmark --threads 8 --tentativas 40
+"""
+import argparse
+import ipaddress
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LimitadorTentativas:
+    def __init__(self, capacidade=5, intervalo_s=60.0, relogio=time.monotonic):
+        """`capacidade` falhas seguidas são aceitas; depois, uma nova a cada `intervalo_s` segundos."""
+        self.capacidade = capacidade
+        self.intervalo_s = intervalo_s
+        self.relogio = relogio
+        self._baldes = {}  # chave -> (fichas, instante da última atualização)
+        self._lock = threading.Lock()
+        self._ultima_limpeza = relogio()
+
+    def _fichas(self, chave, agora):
+        fichas, instante = self._baldes.get(chave, (self.capacidade, agora))
+        return min(self.capacidade, fichas + (agora - instante) / self.intervalo_s)
+
+    def _estado(self, fichas):
+        bloqueado = fichas < 1
+        return {
+            "bloqueado": bloqueado,
+            "espera_s": (1 - fichas) * self.intervalo_s if bloqueado else 0.0,
+            "tentativas_restantes": int(fichas),
+        }
+
+    def _limpar(self, agora):
+        # Um balde cheio de novo é igual a um balde novo: não precisa ficar na memória.
+        if agora - self._ultima_limpeza < self.intervalo_s:
+            return
+        self._ultima_limpeza = agora
+        expirados = [c for c in self._baldes if self._fichas(c, agora) >= self.capacidade]
+        for chave in expirados:
+            del self._baldes[chave]
+
+    def verificar(self, chave):
+        """Estado atual de `chave` (bloqueado, espera_s, tentativas_restantes), sem consumir ficha."""
+        with self._lock:
+            return self._estado(self._fichas(chave, self.relogio()))
+
+    def registrar_falha(self, chave):
+        with self._lock:
+            agora = self.relogio()
+            self._limpar(agora)
+            fichas = max(0.0, self._fichas(chave, agora) - 1)
+            self._baldes[chave] = (fichas, agora)
+            return self._estado(fichas)
+
+    def consumir(self, chave):
+        """Verifica e, se não bloqueado, consome uma ficha numa operação só (sem corrida entre threads)."""
+        with self._lock:
+            agora = self.relogio()
+            self._limpar(agora)
+            fichas = self._fichas(chave, agora)
+            if fichas >= 1:
+                self._baldes[chave] = (fichas - 1, agora)
+            return self._estado(fichas)
+
+    def registrar_sucesso(self, chave):
+        with self._lock:
+            self._baldes.pop(chave, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._baldes)
+
+
+# -------------------- Cliente atrás de proxies --------------------
+def redes_confiaveis(texto):
+    """Redes dos proxies confiáveis a partir de "10.0.0.1, 172.16.0.0/12" (vazio: nenhum)."""
+    return [ipaddress.ip_network(parte.strip(), strict=False) for parte in texto.split(",") if parte.strip()]
+
+
+def _confiavel(ip, redes):
+    try:
+        endereco = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(endereco in rede for rede in redes)
+
+
+def cliente_real(ip_direto, encaminhado, redes):
+    """IP do cliente: o da conexão, ou, se ela vem de um proxy confiável, o salto mais à
+    direita do X-Forwarded-For que não é um proxy confiável.
+
+    Os saltos à esquerda foram escritos pelo próprio cliente e não valem nada:
+    trocá-los a cada tentativa não pode dar um balde novo.
+    """
+    if not ip_direto or not encaminhado or not _confiavel(ip_direto, redes):
+        return ip_direto
+    for salto in reversed([s.strip() for s in encaminhado.split(",") if s.strip()]):
+        if not _confiavel(salto, redes):
+            return salto
+    return ip_direto
+
+
+# -------------------- Benchmark: sleep x limitador --------------------
+ATRASO_SLEEP_S = 2.0  # o que o app fazia a cada tentativa antes do limitador
+
+
+def simular_logins(tentativas, modo, threads=4, atraso_s=ATRASO_SLEEP_S, capacidade=5, intervalo_s=60.0,
+                   dormir=time.sleep):
+    """Processa logins errados (`tentativas`: chaves) em `threads` threads de servidor.
+
+    `modo` "sleep": cada tentativa chega à checagem da senha e segura a thread
+    por `atraso_s`, como o app fazia. `modo` "limitador": `LimitadorTentativas`,
+    sem dormir; bloqueada, a tentativa nem chega à checagem (verificar e
+    consumir juntos, em `consumir`, para a contagem não depender das threads). `segundos_presos`
+    soma o que foi pedido a `dormir`, então não depende do relógio da máquina.
+    """
+    if modo not in ("sleep", "limitador"):
+        raise ValueError(f"Modo desconhecido: {modo!r} (use sleep ou limitador).")
+    limitador = LimitadorTentativas(capacidade, intervalo_s)
+    contagem = {"checagens_senha": 0, "segundos_presos": 0.0}
+    lock = threading.Lock()
+
+    def tentar(chave):
+        if modo == "limitador" and limitador.consumir(chave)["bloqueado"]:
+            return
+        with lock:
+            contagem["checagens_senha"] += 1
+            if modo == "sleep":
+                contagem["segundos_presos"] += atraso_s
+        if modo == "sleep":
+            dormir(atraso_s)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(tentar, tentativas))
+    duracao = time.perf_counter() - inicio
+    return {
+        "modo": modo,
+        "tentativas": len(tentativas),
+        **contagem,
+        "duracao_s": round(duracao, 3),
+        "logins_s": round(len(tentativas) / duracao, 1) if duracao else float("inf"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Limite de tentativas de login")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_bench = sub.add_parser("benchmark", help="vazão de logins errados: sleep por tentativa x limitador")
+    p_bench.add_argument("--threads", type=int, default=8, help="threads do servidor atendendo logins")
+    p_bench.add_argument("--tentativas", type=int, default=40)
+    p_bench.add_argument("--clientes", type=int, default=4, help="IPs distintos das tentativas")
+    p_bench.add_argument("--atraso", type=float, default=ATRASO_SLEEP_S, help="sleep por tentativa do modo antigo (s)")
+    args = parser.parse_args(argv)
+
+    tentativas = [("admin", f"10.0.0.{i % args.clientes + 1}") for i in range(args.tentativas)]
+    for modo in ("sleep", "limitador"):
+        r = simular_logins(tentativas, modo, threads=args.threads, atraso_s=args.atraso)
+        print(
+            f"{modo:<10} {r['logins_s']:>10} logins/s | {r['checagens_senha']:>4} de {r['tentativas']} "
+            f"chegaram à senha | threads presas {r['segundos_presos']:.1f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Publicação da base histórica e das previsões em memória compartilhada.
+
+Um processo carregador normaliza os dados uma única vez e grava cada tabela
+como arquivo Arrow IPC em um diretório de memória (por padrão
+``/dev/shm/predimoveis``). Os processos do Streamlit mapeiam esses arquivos
+somente leitura: as colunas numéricas e de datas viram arrays NumPy que
+apontam direto para as páginas mapeadas, sem cópia, e as colunas de texto
+viram categorias (apenas os códigos inteiros são materializados).
+
+Uso:
+    python memoria_compartilhada.py publicar [--dir DIR]
+    python memoria_compartilhada.py medir [--dir DIR] [--processos N]
+
+Para ativar nos servidores, exporte ``PREDIMOVEIS_SHM_DIR=DIR`` antes do
+``streamlit run app.py``.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+DIRETORIO_PADRAO = "/dev/shm/predimoveis"
+MANIFESTO = "manifesto.json"
+TABELA_HISTORICO = "historico"
+
+
+# -------------------- Publicação --------------------
+def _para_tabela(df):
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    for i, campo in enumerate(tabela.schema):
+        if pa.types.is_string(campo.type) or pa.types.is_large_string(campo.type):
+            tabela = tabela.set_column(i, campo.name, tabela.column(i).dictionary_encode())
+    return tabela
+
+
+def _gravar_tabela(df, caminho):
+    tabela = _para_tabela(df)
+    tmp = caminho + ".tmp"
+    with pa.OSFile(tmp, "wb") as destino:
+        with pa.ipc.new_file(destino, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+    os.replace(tmp, caminho)
+
+
+def publicar(df_hist, pacote, diretorio=DIRETORIO_PADRAO):
+    """Grava a base histórica e as tabelas do snapshot como Arrow IPC em `diretorio`."""
+    os.makedirs(diretorio, exist_ok=True)
+
+    tabelas = {}
+    _gravar_tabela(df_hist, os.path.join(diretorio, f"{TABELA_HISTORICO}.arrow"))
+    tabelas[TABELA_HISTORICO] = len(df_hist)
+
+    extras = {}
+    for chave, valor in (pacote or {}).items():
+        if isinstance(valor, pd.DataFrame):
+            _gravar_tabela(valor, os.path.join(diretorio, f"pacote_{chave}.arrow"))
+            tabelas[f"pacote_{chave}"] = len(valor)
+        else:
+            extras[chave] = valor
+
+    manifesto = {
+        "publicado_em": time.time(),
+        "tabelas": tabelas,
+        "pacote_extras": extras,
+        "tem_pacote": pacote is not None,
+    }
+    tmp = os.path.join(diretorio, MANIFESTO + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, default=str)
+    # O manifesto é gravado por último: só existe quando todas as tabelas estão prontas.
+    os.replace(tmp, os.path.join(diretorio, MANIFESTO))
+    return manifesto
+
+
+def publicado(diretorio=DIRETORIO_PADRAO):
+    return os.path.exists(os.path.join(diretorio, MANIFESTO))
+
+
+# -------------------- Mapeamento --------------------
+def _mapear_tabela(caminho):
+    fonte = pa.memory_map(caminho, "r")
+    tabela = pa.ipc.open_file(fonte).read_all()
+    # split_blocks evita consolidar colunas em blocos 2D, o que forçaria cópia.
+    return tabela.to_pandas(split_blocks=True)
+
+
+def mapear(diretorio=DIRETORIO_PADRAO):
+    """Mapeia as tabelas publicadas e retorna (df_hist, pacote) somente leitura."""
+    with open(os.path.join(diretorio, MANIFESTO), encoding="utf-8") as f:
+        manifesto = json.load(f)
+
+    df_hist = _mapear_tabela(os.path.join(diretorio, f"{TABELA_HISTORICO}.arrow"))
+
+    if not manifesto.get("tem_pacote"):
+        return df_hist, None
+
+    pacote = dict(manifesto.get("pacote_extras", {}))
+    for nome in manifesto["tabelas"]:
+        if nome.startswith("pacote_"):
+            pacote[nome[len("pacote_"):]] = _mapear_tabela(os.path.join(diretorio, f"{nome}.arrow"))
+    return df_hist, pacote
+
+
+# -------------------- Medição de memória --------------------
+def memoria_processo():
+    """RSS e PSS (kB) do processo atual, lidos de /proc (somente Linux).
+
+    O PSS divide as páginas compartilhadas entre os processos que as mapeiam,
+    então é ele que mostra o ganho real quando vários servidores mapeiam a mesma base.
+    """
+    memoria = {"rss_kb": None, "pss_kb": None}
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    memoria["rss_kb"] = int(linha.split()[1])
+        with open("/proc/self/smaps_rollup") as f:
+            for linha in f:
+                if linha.startswith("Pss:"):
+                    memoria["pss_kb"] = int(linha.split()[1])
+    except OSError:
+        pass
+    return memoria
+
+
+def pico_rss_kb():
+    """Pico de RSS (kB) do processo atual; None onde não há o módulo `resource` (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em kB no Linux e em bytes no macOS
+    return pico // 1024 if sys.platform == "darwin" else pico
+
+
+def _medir_processo(modo, diretorio, csv_path, joblib_path):
+    """Executado em um subprocesso: carrega os dados em `modo` e imprime a memória em JSON."""
+    import joblib
+    import app
+
+    antes = memoria_processo()
+    if modo == "copia":
+        df_hist = app.ler_dados_historicos(csv_path)
+        pacote = app.preparar_snapshot(joblib.load(joblib_path))
+    else:
+        df_hist, pacote = mapear(diretorio)
+    # Toca todas as colunas para que as páginas sejam efetivamente carregadas.
+    _ = [df_hist[c].to_numpy().sum() if df_hist[c].dtype.kind in "fi" else len(df_hist[c]) for c in df_hist]
+    depois = memoria_processo()
+    print(json.dumps({"modo": modo, "pid": os.getpid(), "antes": antes, "depois": depois}))
+    sys.stdout.flush()
+    time.sleep(1.0)  # mantém o mapeamento vivo enquanto os irmãos medem
+
+
+def medir(diretorio, processos, csv_path, joblib_path):
+    """Sobe `processos` subprocessos por modo e compara a memória por processo."""
+    resultados = []
+    for modo in ("copia", "compartilhado"):
+        filhos = [
+            subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "_filho", modo,
+                 "--dir", diretorio, "--csv", csv_path, "--joblib", joblib_path],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+            )
+            for _ in range(processos)
+        ]
+        for filho in filhos:
+            saida, _ = filho.communicate()
+            for linha in saida.splitlines():
+                if linha.startswith("{"):
+                    resultados.append(json.loads(linha))
+
+    print(f"{'modo':<14}{'pid':>8}{'RSS antes':>12}{'RSS depois':>12}{'PSS antes':>12}{'PSS depois':>12}  (kB)")
+    for r in resultados:
+        print(
+            f"{r['modo']:<14}{r['pid']:>8}"
+            f"{r['antes']['rss_kb'] or 0:>12}{r['depois']['rss_kb'] or 0:>12}"
+            f"{r['antes']['pss_kb'] or 0:>12}{r['depois']['pss_kb'] or 0:>12}"
+        )
+    return resultados
+
+
+# -------------------- CLI --------------------
+def main(argv=None):
+    aqui = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("comando", choices=["publicar", "medir", "_filho"])
+    parser.add_argument("modo", nargs="?", default="compartilhado")
+    parser.add_argument("--dir", default=os.environ.get("PREDIMOVEIS_SHM_DIR", DIRETORIO_PADRAO))
+    parser.add_argument("--csv", default=os.path.join(aqui, "csv_unico.csv"))
+    parser.add_argument("--joblib", default=os.path.join(aqui, "modelos_sarima.joblib"))
+    parser.add_argument("--processos", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    if args.comando == "publicar":
+        import joblib
+        import app
+
+        df_hist = app.ler_dados_historicos(args.csv)
+        pacote = app.preparar_snapshot(joblib.load(args.joblib)) if os.path.exists(args.joblib) else None
+        manifesto = publicar(df_hist, pacote, args.dir)
+        print(f"Publicado em {args.dir}: {manifesto['tabelas']}")
+    elif args.comando == "medir":
+        if not publicado(args.dir):
+            main(["publicar", "--dir", args.dir, "--csv", args.csv, "--joblib", args.joblib])
+        medir(args.dir, args.processos, args.csv, args.joblib)
+    else:
+        _medir_processo(args.modo, args.dir, args.csv, args.joblib)
+
+
+if __name__ == "__main__":
+    main()
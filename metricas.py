@@ -0,0 +1,196 @@
+"""Tempos e contadores dos caminhos quentes do app, no formato texto do Prometheus.
+
+Um registro por processo (`REGISTRO`), compartilhado por todas as sessões do
+Streamlit: cada chamada instrumentada custa um `perf_counter` e um incremento
+sob lock, sem alocação por amostra (histogramas com baldes fixos).
+
+    @metricas.cronometrado                                  # tempo por chamada
+    @metricas.cache_medido(st.cache_resource(...))          # acertos/faltas do cache
+    def carregar_dados_historicos(): ...
+
+`servir(porta)` expõe `/metrics` para o Prometheus num servidor HTTP local.
+"""
+import bisect
+import contextlib
+import functools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BALDES_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+TEMPO = "predimoveis_tempo_segundos"
+ERROS = "predimoveis_erros_total"
+CACHE = "predimoveis_cache_consultas_total"
+EXECUCAO = "predimoveis_execucao_segundos"
+
+AJUDA = {
+    TEMPO: "Tempo de cada chamada das funções instrumentadas.",
+    ERROS: "Chamadas instrumentadas que terminaram em exceção.",
+    CACHE: "Consultas aos caches st.cache_resource/st.cache_data, por resultado (acerto ou falta).",
+    EXECUCAO: "Tempo das execuções completas do script e dos reruns de fragmentos.",
+}
+
+
+def _rotulos(rotulos):
+    return tuple(sorted(rotulos.items()))
+
+
+def _formatar_rotulos(rotulos, extra=()):
+    pares = list(rotulos) + list(extra)
+    if not pares:
+        return ""
+    escapar = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{nome}="{escapar(valor)}"' for nome, valor in pares) + "}"
+
+
+class RegistroMetricas:
+    def __init__(self, baldes=BALDES_SEGUNDOS):
+        self.baldes = tuple(baldes)
+        self._lock = threading.Lock()
+        self._contadores = {}   # (nome, rótulos) -> valor
+        self._histogramas = {}  # (nome, rótulos) -> [contagem por balde..., +Inf], soma, última, quando
+
+    def contar(self, nome, valor=1, **rotulos):
+        chave = (nome, _rotulos(rotulos))
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    def observar(self, nome, segundos, **rotulos):
+        chave = (nome, _rotulos(rotulos))
+        balde = bisect.bisect_left(self.baldes, segundos)
+        with self._lock:
+            hist = self._histogramas.get(chave)
+            if hist is None:
+                hist = self._histogramas[chave] = [[0] * (len(self.baldes) + 1), 0.0, 0.0, 0.0]
+            hist[0][balde] += 1
+            hist[1] += segundos
+            hist[2] = segundos
+            hist[3] = time.time()
+
+    @contextlib.contextmanager
+    def medir(self, nome=TEMPO, **rotulos):
+        """Bloco cronometrado: observa a duração e conta a exceção, se houver."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            # Só erros: st.rerun/st.stop usam exceções de controle que não herdam de Exception.
+            self.contar(ERROS, **rotulos)
+            raise
+        finally:
+            self.observar(nome, time.perf_counter() - inicio, **rotulos)
+
+    def cronometrado(self, func):
+        """Decorador: tempo de cada chamada de `func`, rotulado pelo nome da função."""
+        @functools.wraps(func)
+        def medida(*args, **kwargs):
+            with self.medir(TEMPO, funcao=func.__name__):
+                return func(*args, **kwargs)
+        return medida
+
+    def cache_medido(self, decorador_cache):
+        """Aplica `decorador_cache` (ex.: `st.cache_resource(...)`) contando acertos e faltas.
+
+        O corpo da função só roda numa falta; um marcador por thread diz à
+        chamada externa se foi o caso.
+        """
+        def aplicar(func):
+            marcador = threading.local()
+
+            @functools.wraps(func)
+            def corpo(*args, **kwargs):
+                marcador.falta = True
+                return func(*args, **kwargs)
+
+            em_cache = decorador_cache(corpo)
+
+            @functools.wraps(func)
+            def consulta(*args, **kwargs):
+                marcador.falta = False
+                try:
+                    return em_cache(*args, **kwargs)
+                finally:
+                    self.contar(CACHE, cache=func.__name__, resultado="falta" if marcador.falta else "acerto")
+
+            if hasattr(em_cache, "clear"):
+                consulta.clear = em_cache.clear
+            return consulta
+        return aplicar
+
+    # ---------- leitura ----------
+    def ultimas(self):
+        """Por série de tempo: última duração, média e quantidade (para o painel)."""
+        with self._lock:
+            itens = [(nome, rotulos, sum(h[0]), h[1], h[2], h[3]) for (nome, rotulos), h in self._histogramas.items()]
+        return [
+            {"metrica": nome, "rotulos": dict(rotulos), "qtd": qtd, "media_s": soma / qtd, "ultima_s": ultima, "quando": quando}
+            for nome, rotulos, qtd, soma, ultima, quando in sorted(itens, key=lambda i: -i[5])
+        ]
+
+    def consultas_cache(self):
+        """{cache: {"acerto": n, "falta": n}}."""
+        with self._lock:
+            contadores = dict(self._contadores)
+        caches = {}
+        for (nome, rotulos), valor in contadores.items():
+            if nome == CACHE:
+                r = dict(rotulos)
+                caches.setdefault(r["cache"], {"acerto": 0, "falta": 0})[r["resultado"]] = valor
+        return caches
+
+    def texto_prometheus(self):
+        with self._lock:
+            contadores = sorted(self._contadores.items())
+            histogramas = sorted((chave, [list(h[0]), h[1]]) for chave, h in self._histogramas.items())
+
+        linhas = []
+        atual = None
+        for (nome, rotulos), valor in contadores:
+            if nome != atual:
+                atual = nome
+                linhas += [f"# HELP {nome} {AJUDA.get(nome, nome)}", f"# TYPE {nome} counter"]
+            linhas.append(f"{nome}{_formatar_rotulos(rotulos)} {valor}")
+        limites = [repr(b) for b in self.baldes] + ["+Inf"]
+        for (nome, rotulos), (contagens, soma) in histogramas:
+            if nome != atual:
+                atual = nome
+                linhas += [f"# HELP {nome} {AJUDA.get(nome, nome)}", f"# TYPE {nome} histogram"]
+            acumulado = 0
+            for limite, n in zip(limites, contagens):
+                acumulado += n
+                linhas.append(f"{nome}_bucket{_formatar_rotulos(rotulos, [('le', limite)])} {acumulado}")
+            linhas.append(f"{nome}_sum{_formatar_rotulos(rotulos)} {soma!r}")
+            linhas.append(f"{nome}_count{_formatar_rotulos(rotulos)} {acumulado}")
+        return "\n".join(linhas) + "\n"
+
+
+REGISTRO = RegistroMetricas()
+cronometrado = REGISTRO.cronometrado
+cache_medido = REGISTRO.cache_medido
+
+
+# -------------------- Endpoint do Prometheus --------------------
+class ManipuladorMetricas(BaseHTTPRequestHandler):
+    def log_message(self, formato, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0].rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        corpo = self.server.registro.texto_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+def servir(porta, host="127.0.0.1", registro=REGISTRO):
+    """Sobe `/metrics` numa thread daemon e devolve o servidor."""
+    servidor = ThreadingHTTPServer((host, porta), ManipuladorMetricas)
+    servidor.daemon_threads = True
+    servidor.registro = registro
+    threading.Thread(target=servidor.serve_forever, name="metricas", daemon=True).start()
+    return servidor
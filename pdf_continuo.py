@@ -0,0 +1,201 @@
+"""Escritor de PDF contínuo: cada página vai para o disco assim que termina.
+
+O FPDF guarda todas as páginas (e imagens) em memória até o `output()`, então
+um documento com centenas de séries cresce sem parar. Este escritor grava os
+objetos do PDF direto no arquivo e só mantém, até o fim, o deslocamento de cada
+objeto (para o xref) e o id de cada página: a memória não depende do número de
+páginas.
+
+Ele interpreta os mesmos blocos de layout que `app.escrever_blocos_fpdf`
+(veja `app.blocos_relatorio_serie`), com fontes base Helvetica e imagens PNG.
+
+Por que não o próprio fpdf2: nenhum modo de saída dele é incremental. O
+`output()` (para bytes, arquivo ou stream, com ou sem `linearize`) serializa o
+documento inteiro a partir das páginas e imagens que o `FPDF` acumulou. O
+escritor fica de propósito restrito a esses seis blocos, e a medição e a
+quebra de linhas continuam com o fpdf2. Layout novo vai para os blocos; se
+precisar de algo que eles não cobrem (fontes TTF, tabelas, links), use o fpdf2.
+"""
+import zlib
+from io import BytesIO
+
+from fpdf import FPDF
+from fpdf.enums import MethodReturnValue
+from PIL import Image
+
+PT_POR_MM = 72 / 25.4
+FONTES = {"": "Helvetica", "B": "Helvetica-Bold"}
+
+
+def _escapar(texto):
+    bruto = str(texto).encode("latin-1", errors="replace")
+    return bruto.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+class EscritorPDFContinuo:
+    def __init__(self, destino, largura_mm=210, altura_mm=297, margem_mm=10, margem_inferior_mm=15):
+        self.largura = largura_mm
+        self.altura = altura_mm
+        self.margem = margem_mm
+        self.limite_y = altura_mm - margem_inferior_mm
+
+        self._arquivo = open(destino, "wb")
+        self._posicao = 0
+        self._offsets = {}
+        self._proximo_id = 1
+        self._paginas = []
+
+        # Medição e quebra de linhas com as mesmas métricas do FPDF (nada é gerado nele).
+        self._medidor = FPDF()
+        self._medidor.add_page()
+
+        self._gravar(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._id_raiz = self._reservar_id()
+        self._ids_fontes = {}
+        for i, (estilo, nome) in enumerate(FONTES.items(), start=1):
+            self._ids_fontes[estilo] = (f"F{i}", self._objeto(
+                f"<< /Type /Font /Subtype /Type1 /BaseFont /{nome} /Encoding /WinAnsiEncoding >>".encode()
+            ))
+
+        self._conteudo = None
+        self._imagens_pagina = {}
+        self._fonte = ("", 12)
+        self.y = self.margem
+
+    # ---------- objetos de baixo nível ----------
+    def _gravar(self, dados):
+        self._arquivo.write(dados)
+        self._posicao += len(dados)
+
+    def _reservar_id(self):
+        id_ = self._proximo_id
+        self._proximo_id += 1
+        return id_
+
+    def _objeto(self, corpo, id_=None):
+        id_ = id_ or self._reservar_id()
+        self._offsets[id_] = self._posicao
+        self._gravar(f"{id_} 0 obj\n".encode() + corpo + b"\nendobj\n")
+        return id_
+
+    def _stream(self, dicionario, dados):
+        return self._objeto(
+            b"<< " + dicionario + f" /Length {len(dados)} >>\nstream\n".encode() + dados + b"\nendstream"
+        )
+
+    # ---------- páginas ----------
+    def nova_pagina(self):
+        self._fechar_pagina()
+        self._conteudo = []
+        self._imagens_pagina = {}
+        self.y = self.margem
+
+    def _fechar_pagina(self):
+        if self._conteudo is None:
+            return
+        dados = zlib.compress("\n".join(self._conteudo).encode("latin-1"))
+        id_conteudo = self._stream(b"/Filter /FlateDecode", dados)
+        fontes = " ".join(f"/{nome} {id_} 0 R" for nome, id_ in self._ids_fontes.values())
+        xobjects = " ".join(f"/{nome} {id_} 0 R" for nome, id_ in self._imagens_pagina.items())
+        recursos = f"/Font << {fontes} >>" + (f" /XObject << {xobjects} >>" if xobjects else "")
+        id_pagina = self._objeto((
+            f"<< /Type /Page /Parent {self._id_raiz} 0 R "
+            f"/MediaBox [0 0 {self.largura * PT_POR_MM:.2f} {self.altura * PT_POR_MM:.2f}] "
+            f"/Resources << {recursos} >> /Contents {id_conteudo} 0 R >>"
+        ).encode())
+        self._paginas.append(id_pagina)
+        self._conteudo = None
+
+    def _garantir_espaco(self, altura):
+        if self._conteudo is None or self.y + altura > self.limite_y:
+            self.nova_pagina()
+
+    # ---------- conteúdo ----------
+    def fonte(self, estilo, tamanho):
+        self._fonte = (estilo, tamanho)
+        self._medidor.set_font("helvetica", estilo, tamanho)
+
+    def celula(self, altura, texto):
+        self._garantir_espaco(altura)
+        estilo, tamanho = self._fonte
+        nome = self._ids_fontes[estilo][0]
+        # Linha de base como no FPDF: meio da célula + 0,3 do corpo da fonte.
+        base_mm = self.y + altura / 2 + 0.3 * tamanho / PT_POR_MM
+        x = self.margem * PT_POR_MM
+        y = (self.altura - base_mm) * PT_POR_MM
+        self._conteudo.append(
+            f"BT /{nome} {tamanho:.2f} Tf {x:.2f} {y:.2f} Td ({_escapar(texto).decode('latin-1')}) Tj ET"
+        )
+        self.y += altura
+
+    def multi(self, altura, texto):
+        linhas = self._medidor.multi_cell(
+            self.largura - 2 * self.margem, altura, texto, dry_run=True, output=MethodReturnValue.LINES
+        )
+        for linha in linhas:
+            self.celula(altura, linha)
+
+    def espaco(self, altura):
+        self.y += altura
+
+    def imagem(self, png, largura_mm):
+        img = Image.open(BytesIO(png)).convert("RGB")
+        altura_mm = largura_mm * img.height / img.width
+        self._garantir_espaco(altura_mm)
+        id_img = self._stream(
+            (f"/Type /XObject /Subtype /Image /Width {img.width} /Height {img.height} "
+             "/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /FlateDecode").encode(),
+            zlib.compress(img.tobytes()),
+        )
+        nome = f"Im{id_img}"
+        self._imagens_pagina[nome] = id_img
+        x = self.margem * PT_POR_MM
+        y = (self.altura - self.y - altura_mm) * PT_POR_MM
+        self._conteudo.append(
+            f"q {largura_mm * PT_POR_MM:.2f} 0 0 {altura_mm * PT_POR_MM:.2f} {x:.2f} {y:.2f} cm /{nome} Do Q"
+        )
+        self.y += altura_mm
+
+    def escrever_blocos(self, blocos):
+        for bloco in blocos:
+            tipo = bloco[0]
+            if tipo == "pagina":
+                self.nova_pagina()
+            elif tipo == "fonte":
+                self.fonte(bloco[1], bloco[2])
+            elif tipo == "celula":
+                self.celula(bloco[1], bloco[2])
+            elif tipo == "multi":
+                self.multi(bloco[1], bloco[2])
+            elif tipo == "espaco":
+                self.espaco(bloco[1])
+            elif tipo == "imagem":
+                self.imagem(bloco[1], bloco[2])
+
+    # ---------- finalização ----------
+    @property
+    def paginas(self):
+        return len(self._paginas) + (1 if self._conteudo is not None else 0)
+
+    def fechar(self):
+        self._fechar_pagina()
+        kids = " ".join(f"{id_} 0 R" for id_ in self._paginas)
+        self._objeto(f"<< /Type /Pages /Kids [{kids}] /Count {len(self._paginas)} >>".encode(), self._id_raiz)
+        id_catalogo = self._objeto(f"<< /Type /Catalog /Pages {self._id_raiz} 0 R >>".encode())
+
+        inicio_xref = self._posicao
+        total = self._proximo_id
+        linhas = [f"xref\n0 {total}\n", "0000000000 65535 f \n"]
+        linhas += [f"{self._offsets[i]:010d} 00000 n \n" for i in range(1, total)]
+        self._gravar("".join(linhas).encode())
+        self._gravar(
+            f"trailer\n<< /Size {total} /Root {id_catalogo} 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n".encode()
+        )
+        self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if not self._arquivo.closed:
+            self.fechar()
@@ -0,0 +1,185 @@
+"""Perfil por execução do script do Streamlit, por amostragem de pilhas.
+
+Durante uma execução, uma thread lê a pilha da thread do script a cada
+`intervalo` segundos (`sys._current_frames`) e conta as pilhas vistas. Ao
+terminar, grava no diretório de perfis:
+
+    <carimbo>-<aba>.folded   pilhas "collapsed" (flamegraph.pl, speedscope, inferno)
+    <carimbo>-<aba>.txt      etiquetas da execução + top-N funções por tempo próprio e total
+    perfis.jsonl             uma linha por execução: arquivo, duração, amostras e etiquetas
+
+As etiquetas (aba e filtros ativos) são lidas no fim da execução, quando os
+widgets já têm os valores usados por ela. Com `manter`, só as últimas
+execuções do índice ficam no diretório; os arquivos das mais antigas são
+apagados. Ligado/desligado pelo app (ver `PREDIMOVEIS_PERFIL`); sem ele, nada
+aqui é executado.
+"""
+import collections
+import contextlib
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+
+# Abaixo do intervalo de troca de threads do CPython (5 ms) a thread amostradora
+# não consegue o GIL mais vezes; os tempos do resumo usam a duração real.
+INTERVALO_S = 0.005
+TOP_N = 25
+
+
+_ROTULOS = {}  # code object -> 'módulo:função'
+_SEQUENCIA = itertools.count(1)  # desempata execuções de sessões diferentes no mesmo segundo
+_LOCK = threading.Lock()  # sessões do mesmo processo gravando e podando o índice ao mesmo tempo
+INDICE = "perfis.jsonl"
+
+
+def _rotulo(codigo):
+    rotulo = _ROTULOS.get(codigo)
+    if rotulo is None:
+        arquivo = codigo.co_filename
+        modulo = arquivo.strip("<>") if arquivo.startswith("<") else os.path.splitext(os.path.basename(arquivo))[0]
+        rotulo = _ROTULOS[codigo] = f"{modulo}:{getattr(codigo, 'co_qualname', codigo.co_name)}"
+    return rotulo
+
+
+def pilha(frame):
+    """Rótulos 'módulo:função' da pilha de `frame`, da raiz até a folha."""
+    rotulos = []
+    while frame is not None:
+        rotulos.append(_rotulo(frame.f_code))
+        frame = frame.f_back
+    return tuple(reversed(rotulos))
+
+
+class Amostrador:
+    """Conta as pilhas da thread `thread_id` (a atual, por padrão) enquanto ativo."""
+
+    def __init__(self, thread_id=None, intervalo=INTERVALO_S):
+        self.thread_id = thread_id or threading.get_ident()
+        self.intervalo = intervalo
+        self.pilhas = collections.Counter()
+        self.duracao = 0.0
+        self._parar = threading.Event()
+        self._thread = None
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.pilhas[pilha(frame)] += 1
+            del frame
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        self._thread = threading.Thread(target=self._amostrar, name="perfil", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._thread.join()
+        self.duracao = time.perf_counter() - self._inicio
+        return False
+
+
+def texto_folded(pilhas):
+    """Uma linha 'raiz;...;folha N' por pilha distinta."""
+    return "".join(f"{';'.join(p)} {n}\n" for p, n in sorted(pilhas.items()))
+
+
+def top_funcoes(pilhas, n=TOP_N):
+    """[(função, amostras próprias, amostras totais)], das mais caras (tempo próprio) para as mais baratas."""
+    proprio, total = collections.Counter(), collections.Counter()
+    for p, qtd in pilhas.items():
+        proprio[p[-1]] += qtd
+        for funcao in set(p):
+            total[funcao] += qtd
+    ordem = sorted(total, key=lambda f: (-proprio[f], -total[f], f))
+    return [(f, proprio[f], total[f]) for f in ordem[:n]]
+
+
+def texto_resumo(amostrador, etiquetas, n=TOP_N):
+    amostras = sum(amostrador.pilhas.values())
+    ms_por_amostra = amostrador.duracao * 1000 / amostras if amostras else 0.0
+    linhas = [
+        f"Duração: {amostrador.duracao * 1000:.1f} ms | {amostras} amostras a cada {amostrador.intervalo * 1000:g} ms",
+        *(f"{chave}: {valor}" for chave, valor in etiquetas.items()),
+        "",
+        f"{'próprio (ms)':>13}{'total (ms)':>12}{'%':>7}  função",
+    ]
+    for funcao, proprio, total in top_funcoes(amostrador.pilhas, n):
+        linhas.append(
+            f"{proprio * ms_por_amostra:>13.1f}{total * ms_por_amostra:>12.1f}"
+            f"{100 * proprio / amostras:>7.1f}  {funcao}"
+        )
+    return "\n".join(linhas) + "\n"
+
+
+def _slug(texto):
+    texto = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode()
+    return re.sub(r"[^A-Za-z0-9]+", "-", texto).strip("-").lower() or "execucao"
+
+
+def podar(diretorio, manter):
+    """Deixa no índice só as `manter` execuções mais recentes e apaga os arquivos das demais."""
+    caminho = os.path.join(diretorio, INDICE)
+    with open(caminho, encoding="utf-8") as f:
+        linhas = f.readlines()
+    if len(linhas) <= manter:
+        return
+    antigas, recentes = linhas[:len(linhas) - manter], linhas[len(linhas) - manter:]
+    for linha in antigas:
+        try:
+            nome = json.loads(linha)["arquivo"]
+        except (ValueError, KeyError, TypeError):
+            continue
+        for extensao in (".folded", ".txt"):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(diretorio, nome + extensao))
+    with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+        f.writelines(recentes)
+    os.replace(caminho + ".tmp", caminho)
+
+
+def gravar_relatorio(diretorio, amostrador, etiquetas, n=TOP_N, manter=None):
+    """Grava .folded, .txt e a linha do índice; devolve o caminho base (sem extensão)."""
+    os.makedirs(diretorio, exist_ok=True)
+    agora = time.time()
+    carimbo = time.strftime("%Y%m%d-%H%M%S", time.localtime(agora)) + f"-{next(_SEQUENCIA):04d}"
+    nome = " ".join(str(etiquetas[c]) for c in ("aba", "fragmento") if etiquetas.get(c))
+    base = os.path.join(diretorio, f"{carimbo}-{_slug(nome)}")
+    with open(base + ".folded", "w", encoding="utf-8") as f:
+        f.write(texto_folded(amostrador.pilhas))
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write(texto_resumo(amostrador, etiquetas, n))
+    with _LOCK:
+        with open(os.path.join(diretorio, INDICE), "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "arquivo": os.path.basename(base),
+                "quando": agora,
+                "duracao_ms": round(amostrador.duracao * 1000, 1),
+                "amostras": sum(amostrador.pilhas.values()),
+                "etiquetas": etiquetas,
+            }, ensure_ascii=False, default=str) + "\n")
+        if manter:
+            podar(diretorio, manter)
+    return base
+
+
+@contextlib.contextmanager
+def perfilado(diretorio, etiquetas, intervalo=INTERVALO_S, n=TOP_N, manter=None):
+    """Amostra o bloco e grava o relatório; `etiquetas()` é chamada no fim.
+
+    O relatório sai mesmo quando o bloco termina em exceção (inclusive as de
+    controle do Streamlit, como a de `st.rerun`).
+    """
+    amostrador = Amostrador(intervalo=intervalo)
+    try:
+        with amostrador:
+            yield amostrador
+    finally:
+        gravar_relatorio(diretorio, amostrador, etiquetas(), n, manter)
@@ -0,0 +1,152 @@
+"""Geração em lote dos relatórios PDF de todas as séries (cidade × tipo de mercado).
+
+Roda sem navegador e sem sessão do Streamlit, reaproveitando a mesma lógica
+de KPIs, textos e PDF do painel de relatórios. Os relatórios são distribuídos
+entre processos e gravados em um diretório ou em um único arquivo .zip, junto
+com um resumo de desempenho (``resumo_lote.json``).
+
+Com ``--consolidado``, todas as séries vão para um único PDF, escrito página a
+página em um só processo (memória constante, veja ``pdf_continuo``).
+
+Uso:
+    python relatorios_lote.py --saida relatorios/
+    python relatorios_lote.py --zip relatorios_2025-04.zip --periodo "Completo" --processos 8
+    python relatorios_lote.py --consolidado consolidado_2025-04.pdf --graficos
+"""
+import argparse
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import app
+import memoria_compartilhada
+
+_base_worker = {}
+
+
+def _iniciar_worker(df_hist):
+    _base_worker["df_hist"] = df_hist
+    _base_worker["indice"] = app.montar_indice_series(df_hist)
+
+
+def gerar_relatorio(cidade, mercado, periodo):
+    """Gera o PDF de uma série no processo worker; retorna (arquivo, bytes, segundos)."""
+    inicio = time.perf_counter()
+    base = app.fatia_serie(_base_worker["df_hist"], _base_worker["indice"], cidade, mercado)
+    base = app.recortar_periodo(base, periodo)
+    ind = app.calcular_indicadores_relatorio(base, cidade, mercado)
+    graficos = app.graficos_relatorio_png(base, ind, cidade, mercado)
+    pdf_bytes = app.gerar_pdf_relatorio(cidade, mercado, base, ind["resumo_kpis"], ind["texto_resumo"], graficos)
+    return f"relatorio_{cidade}_{mercado}.pdf", pdf_bytes, time.perf_counter() - inicio
+
+
+def gerar_lote(df_hist, periodo="Últimos 12 meses", saida=None, arquivo_zip=None, processos=None):
+    """Gera os relatórios de todas as séries de `df_hist` e retorna o resumo de desempenho."""
+    if (saida is None) == (arquivo_zip is None):
+        raise ValueError("Informe exatamente um destino: `saida` (diretório) ou `arquivo_zip`.")
+
+    series = [(str(c), str(m)) for c, m in app.montar_indice_series(df_hist)]
+    destino_resumo = saida if saida else os.path.dirname(os.path.abspath(arquivo_zip))
+    os.makedirs(saida or destino_resumo, exist_ok=True)
+    zf = zipfile.ZipFile(arquivo_zip, "w", zipfile.ZIP_DEFLATED) if arquivo_zip else None
+
+    tempos = {}
+    total_bytes = 0
+    inicio = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=processos,
+            initializer=_iniciar_worker,
+            initargs=(df_hist,),
+        ) as executor:
+            futuros = {executor.submit(gerar_relatorio, c, m, periodo): (c, m) for c, m in series}
+            for futuro in as_completed(futuros):
+                nome, pdf_bytes, segundos = futuro.result()
+                if zf is not None:
+                    zf.writestr(nome, pdf_bytes)
+                else:
+                    with open(os.path.join(saida, nome), "wb") as f:
+                        f.write(pdf_bytes)
+                tempos[nome] = round(segundos, 4)
+                total_bytes += len(pdf_bytes)
+    finally:
+        if zf is not None:
+            zf.close()
+    duracao = time.perf_counter() - inicio
+
+    ordenados = sorted(tempos.values())
+    resumo = {
+        "periodo": periodo,
+        "relatorios": len(tempos),
+        "processos": processos or os.cpu_count(),
+        "duracao_s": round(duracao, 3),
+        "relatorios_por_s": round(len(tempos) / duracao, 2) if duracao else None,
+        "bytes_total": total_bytes,
+        "tempo_por_relatorio_s": {
+            "min": ordenados[0] if ordenados else None,
+            "mediana": ordenados[len(ordenados) // 2] if ordenados else None,
+            "max": ordenados[-1] if ordenados else None,
+        },
+        "tempos_s": tempos,
+        "destino": arquivo_zip or saida,
+    }
+    with open(os.path.join(destino_resumo, "resumo_lote.json"), "w", encoding="utf-8") as f:
+        json.dump(resumo, f, ensure_ascii=False, indent=2)
+    return resumo
+
+
+def gerar_consolidado(df_hist, destino, periodo="Últimos 12 meses", com_graficos=False):
+    """Gera o PDF consolidado de todas as séries e retorna o resumo de desempenho."""
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    inicio = time.perf_counter()
+    series, paginas = app.gerar_pdf_consolidado(
+        app.series_para_relatorio(df_hist, periodo, com_graficos=com_graficos), destino
+    )
+    duracao = time.perf_counter() - inicio
+    return {
+        "periodo": periodo,
+        "series": series,
+        "paginas": paginas,
+        "duracao_s": round(duracao, 3),
+        "bytes_total": os.path.getsize(destino),
+        "pico_rss_kb": memoria_compartilhada.pico_rss_kb(),
+        "destino": destino,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    destino = parser.add_mutually_exclusive_group(required=True)
+    destino.add_argument("--saida", help="diretório onde gravar os PDFs")
+    destino.add_argument("--zip", dest="arquivo_zip", help="arquivo .zip único com todos os PDFs")
+    destino.add_argument("--consolidado", help="um único PDF com todas as séries")
+    parser.add_argument("--graficos", action="store_true", help="inclui os gráficos no PDF consolidado")
+    parser.add_argument("--periodo", default="Últimos 12 meses", choices=app.PERIODOS_RELATORIO)
+    parser.add_argument("--processos", type=int, default=None)
+    parser.add_argument("--csv", default=app.CSV_PATH)
+    args = parser.parse_args(argv)
+
+    df_hist = app.ler_dados_historicos(args.csv)
+    if args.consolidado:
+        resumo = gerar_consolidado(df_hist, args.consolidado, args.periodo, args.graficos)
+        pico = resumo["pico_rss_kb"]
+        print(
+            f"{resumo['series']} séries, {resumo['paginas']} páginas em {resumo['duracao_s']} s "
+            f"(pico de RSS {f'{pico / 1024:.0f} MB' if pico is not None else 'n/d'}) -> {resumo['destino']}"
+        )
+        return
+
+    resumo = gerar_lote(df_hist, args.periodo, args.saida, args.arquivo_zip, args.processos)
+
+    print(
+        f"{resumo['relatorios']} relatórios em {resumo['duracao_s']} s "
+        f"({resumo['relatorios_por_s']} relatórios/s, {resumo['processos']} processos) -> {resumo['destino']}"
+    )
+    t = resumo["tempo_por_relatorio_s"]
+    print(f"Tempo por relatório: min {t['min']} s | mediana {t['mediana']} s | max {t['max']} s")
+
+
+if __name__ == "__main__":
+    main()
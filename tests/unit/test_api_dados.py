@@ -0,0 +1,138 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import gzip
+import http.client
+import json
+import threading
+from io import BytesIO
+from urllib.parse import quote, urlencode
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from api_dados import ServicoDados, aceita_gzip, criar_servidor, recortar_datas
+
+
+@pytest.fixture(scope="module")
+def api():
+    servidor = criar_servidor(porta=0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield servidor.server_address[:2]
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def get(api, caminho, **cabecalhos):
+    conexao = http.client.HTTPConnection(*api)
+    conexao.request("GET", caminho, headers=cabecalhos)
+    resposta = conexao.getresponse()
+    corpo = resposta.read()
+    conexao.close()
+    if resposta.getheader("Content-Encoding") == "gzip":
+        corpo = gzip.decompress(corpo)
+    if resposta.getheader("Content-Type", "").startswith("application/json"):
+        corpo = json.loads(corpo)
+    return resposta, corpo or None
+
+
+def primeira_serie(api):
+    _, dados = get(api, "/series")
+    serie = dados["series"][0]
+    return serie, urlencode({"cidade": serie["cidade"], "tipo_mercado": serie["tipo_mercado"]})
+
+
+def test_recortar_datas():
+    tabela = pd.DataFrame({"data": pd.date_range("2024-01-01", periods=5, freq="MS"), "v": range(5)})
+    recorte = recortar_datas(tabela, pd.Timestamp("2024-02-01").to_datetime64(), pd.Timestamp("2024-03-15").to_datetime64())
+    assert list(recorte["v"]) == [1, 2]
+
+
+def test_historico_etag_e_304(api):
+    serie, consulta = primeira_serie(api)
+    resposta, dados = get(api, f"/historico?{consulta}")
+    assert resposta.status == 200
+    assert len(dados["datas"]) == len(dados["preco_m2"]) == serie["pontos"]
+    etag = resposta.getheader("ETag")
+    assert etag
+
+    resposta, corpo = get(api, f"/historico?{consulta}", **{"If-None-Match": etag})
+    assert resposta.status == 304 and corpo is None
+
+
+def test_gzip_so_quando_aceito(api):
+    resposta, dados = get(api, "/series", **{"Accept-Encoding": "gzip"})
+    assert resposta.getheader("Content-Encoding") == "gzip"
+    assert dados["series"]
+    resposta, _ = get(api, "/series")
+    assert resposta.getheader("Content-Encoding") is None
+    resposta, _ = get(api, "/series", **{"Accept-Encoding": "gzip;q=0, identity"})
+    assert resposta.getheader("Content-Encoding") is None
+
+
+def test_aceita_gzip_com_pesos():
+    assert aceita_gzip("gzip, deflate, br")
+    assert aceita_gzip("br;q=1.0, gzip;q=0.5")
+    assert aceita_gzip("*")
+    assert not aceita_gzip("")
+    assert not aceita_gzip("gzip;q=0")
+    assert not aceita_gzip("gzip; q=0.0, *;q=1")
+    assert not aceita_gzip("identity, *;q=0")
+    assert not aceita_gzip("gzip;q=lixo")
+
+
+def test_etag_distinta_por_representacao(api):
+    com_gzip, _ = get(api, "/series", **{"Accept-Encoding": "gzip"})
+    sem_gzip, _ = get(api, "/series")
+    etag_gz, etag = com_gzip.getheader("ETag"), sem_gzip.getheader("ETag")
+    assert etag_gz == etag[:-1] + '-gz"'
+    # Cada ETag só valida a representação que o cliente receberia.
+    assert get(api, "/series", **{"Accept-Encoding": "gzip", "If-None-Match": etag_gz})[0].status == 304
+    assert get(api, "/series", **{"If-None-Match": etag_gz})[0].status == 200
+    assert get(api, "/series", **{"Accept-Encoding": "gzip", "If-None-Match": etag})[0].status == 200
+    assert get(api, "/series", **{"If-None-Match": etag})[0].status == 304
+
+
+def test_erro_inesperado_vira_500_em_json():
+    servico = ServicoDados()
+    servico.rotas["/series"] = lambda parametros: 1 / 0
+    servidor = criar_servidor(porta=0, servico=servico)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        resposta, corpo = get(servidor.server_address[:2], "/series")
+        assert resposta.status == 500 and "erro" in corpo
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+def test_intervalo_e_kpis(api):
+    serie, consulta = primeira_serie(api)
+    _, dados = get(api, f"/historico?{consulta}&inicio={serie['fim']}")
+    assert dados["datas"] == [serie["fim"]]
+    resposta, kpis = get(api, f"/kpis?{consulta}")
+    assert resposta.status == 200
+    assert kpis["observacoes"] == serie["pontos"]
+    assert kpis["preco_minimo"] <= kpis["preco_medio"] <= kpis["preco_maximo"]
+
+
+def test_erros(api):
+    assert get(api, "/historico?cidade=Recife")[0].status == 400
+    assert get(api, "/historico?cidade=Atlantida&tipo_mercado=Venda")[0].status == 404
+    _, consulta = primeira_serie(api)
+    assert get(api, f"/kpis?{consulta}&inicio=ontem")[0].status == 400
+    assert get(api, "/nada")[0].status == 404
+
+
+def test_exportacao_manifesto_e_particao(api):
+    _, manifesto = get(api, "/exportacao")
+    particao = manifesto["tabelas"]["historico"]["particoes"][0]
+    resposta, corpo = get(api, quote(f"/exportacao/{particao['arquivo']}"))
+    assert resposta.status == 200
+    assert resposta.getheader("Transfer-Encoding") == "chunked"
+    assert pq.read_table(BytesIO(corpo)).num_rows == particao["linhas"]
+
+    etag = resposta.getheader("ETag")
+    assert get(api, quote(f"/exportacao/{particao['arquivo']}"), **{"If-None-Match": etag})[0].status == 304
+    assert get(api, "/exportacao/historico/cidade=Atlantida/tipo_mercado=Venda/dados.parquet")[0].status == 404
+    assert get(api, "/exportacao?formato=xlsx")[0].status == 400
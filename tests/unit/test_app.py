@@ -2,6 +2,7 @@ import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
 import pytest
+import numpy as np
 import pandas as pd
 from io import BytesIO
 from app import (
@@ -13,7 +14,31 @@ from app import (
     texto_dashboard_acessivel,
     texto_previsoes_acessivel,
     texto_relatorio_acessivel,
-    gerar_pdf_relatorio
+    gerar_pdf_relatorio,
+    recortar_periodo,
+    calcular_indicadores_relatorio,
+    montar_indice_series,
+    fatia_serie,
+    preparar_snapshot,
+    registrar_latencia,
+    resumo_latencias,
+    estatisticas_boxplot,
+    graficos_relatorio_png,
+    indices_lttb,
+    reduzir_serie,
+    figura_historico,
+    figuras_relatorio,
+    FIGURAS_RELATORIO,
+    figura_em_cache,
+    series_previsoes,
+    figura_previsoes,
+    comparar_series,
+    figura_comparacao,
+    texto_comparacao_acessivel,
+    figura_box_ano,
+    MAX_OUTLIERS_BOX,
+    selecionar_linhas,
+    pagina_de,
 )
 
 def test_detectar_coluna():
@@ -81,3 +106,432 @@ def test_gerar_pdf_relatorio():
     assert isinstance(pdf_bytes, bytes)
     assert pdf_bytes[:4] == b"%PDF"
 
+
+
+def test_recortar_periodo():
+    df = pd.DataFrame({
+        "data": pd.date_range("2022-01-01", periods=36, freq="MS"),
+        "preco_m2": range(36),
+    })
+    assert len(recortar_periodo(df, "Completo")) == 36
+    assert len(recortar_periodo(df, "Últimos 12 meses")) == 13
+    assert len(recortar_periodo(df, "Últimos 24 meses")) == 25
+
+def test_calcular_indicadores_relatorio():
+    df = pd.DataFrame({
+        "data": pd.date_range("2024-01-01", periods=6, freq="MS"),
+        "preco_m2": [10.0, 11.0, 12.0, 13.0, 14.0, 15.0],
+    })
+    ind = calcular_indicadores_relatorio(df, "Recife", "Venda")
+    assert ind["preco_atual_str"] == "15,00"
+    assert ind["variacao_pct_str"] == "50,0"
+    assert ind["resumo_kpis"]["Mínimo no período"] == "R$ 10,00"
+    assert "Recife" in ind["texto_resumo"]
+    assert len(ind["faixa_preco_str"]) == len(df)
+
+def test_indice_e_fatia_serie():
+    df = pd.DataFrame({
+        "data": list(pd.date_range("2024-01-01", periods=3, freq="MS")) * 2,
+        "cidade": ["Natal"] * 3 + ["Recife"] * 3,
+        "tipo_mercado": ["Venda"] * 6,
+        "preco_m2": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+    })
+    indice = montar_indice_series(df)
+    assert indice[("Recife", "Venda")] == (3, 6)
+    assert fatia_serie(df, indice, "Recife", "Venda")["preco_m2"].tolist() == [4.0, 5.0, 6.0]
+    assert fatia_serie(df, indice, "Recife", "Locacao").empty
+
+def test_indice_series_recusa_frame_fora_de_ordem():
+    df = pd.DataFrame({
+        "data": pd.to_datetime(["2024-01-01", "2024-01-01", "2024-02-01"]),
+        "cidade": ["Natal", "Recife", "Natal"],
+        "tipo_mercado": ["Venda"] * 3,
+        "preco_m2": [1.0, 2.0, 3.0],
+    })
+    with pytest.raises(ValueError):
+        montar_indice_series(df)
+    with pytest.raises(ValueError):
+        montar_indice_series(df.iloc[[2, 0, 1]].reset_index(drop=True))
+    assert montar_indice_series(df.iloc[[0, 2, 1]].reset_index(drop=True)) == {
+        ("Natal", "Venda"): (0, 2), ("Recife", "Venda"): (2, 3),
+    }
+
+def test_preparar_snapshot_nao_altera_original():
+    previsoes = pd.DataFrame({
+        "data": ["2025-02-01", "2025-01-01"],
+        "cidade": ["Recife", "Recife"],
+        "tipo_mercado": ["Venda", "Venda"],
+        "preco_previsto": [2.0, 1.0],
+    })
+    pacote = {"previsoes_futuras": previsoes}
+    novo = preparar_snapshot(pacote)
+    assert pacote["previsoes_futuras"] is previsoes
+    assert previsoes["data"].dtype == object
+    assert novo["previsoes_futuras"]["preco_previsto"].tolist() == [1.0, 2.0]
+    with pytest.raises(ValueError):
+        novo["previsoes_futuras"].loc[0, "preco_previsto"] = 9.0
+    with pytest.raises(ValueError):
+        novo["previsoes_futuras"].iloc[0:1].loc[0, "preco_previsto"] = 9.0
+
+def test_resumo_latencias():
+    for segundos in (0.010, 0.020, 0.030):
+        registrar_latencia("fragmento: teste", segundos)
+    resumo = resumo_latencias().set_index("Execução")
+    assert resumo.loc["fragmento: teste", "Qtd"] == 3
+    assert resumo.loc["fragmento: teste", "p50 (ms)"] == 20.0
+
+def test_estatisticas_boxplot():
+    anos = [2024] * 5 + [2025] * 4
+    valores = [1.0, 2.0, 3.0, 4.0, 100.0, 5.0, 5.0, 6.0, 6.0]
+    stats = {e["grupo"]: e for e in estatisticas_boxplot(anos, valores)}
+    assert stats[2024]["mediana"] == 3.0
+    assert stats[2024]["outliers"] == [100.0]
+    assert stats[2024]["limite_sup"] == 4.0
+    assert stats[2025]["outliers"] == []
+
+def test_gerar_pdf_relatorio_com_graficos():
+    df = pd.DataFrame({
+        "data": pd.date_range("2024-01-01", periods=14, freq="MS"),
+        "preco_m2": [float(v) for v in range(10, 24)],
+    })
+    ind = calcular_indicadores_relatorio(df, "Recife", "Venda")
+    graficos = graficos_relatorio_png(df, ind, "Recife", "Venda")
+    assert len(graficos) == 5
+    assert all(png[:8] == b"\x89PNG\r\n\x1a\n" for png in graficos)
+    sem = gerar_pdf_relatorio("Recife", "Venda", df, ind["resumo_kpis"], ind["texto_resumo"])
+    com = gerar_pdf_relatorio("Recife", "Venda", df, ind["resumo_kpis"], ind["texto_resumo"], graficos)
+    assert com[:4] == b"%PDF"
+    assert len(com) > len(sem)
+
+def test_graficos_relatorio_png_em_cache_nao_recalcula_boxplot(monkeypatch):
+    import app
+    from cache_lru import CacheLRU
+
+    df = pd.DataFrame({
+        "data": pd.date_range("2024-01-01", periods=14, freq="MS"),
+        "preco_m2": [float(v) for v in range(10, 24)],
+    })
+    ind = calcular_indicadores_relatorio(df, "Recife", "Venda")
+    cache = CacheLRU(64 * 1024 * 1024)
+    primeira = graficos_relatorio_png(df, ind, "Recife", "Venda", cache=cache, chave=("Recife", "Venda"))
+
+    def nao_chamar(*args):
+        raise AssertionError("estatisticas_boxplot chamada com todas as imagens em cache")
+
+    monkeypatch.setattr(app, "estatisticas_boxplot", nao_chamar)
+    assert graficos_relatorio_png(df, ind, "Recife", "Venda", cache=cache, chave=("Recife", "Venda")) == primeira
+
+def test_indices_lttb_preserva_extremos_e_pontas():
+    x = np.arange(10_000)
+    y = np.sin(x / 500.0)
+    y[4321] = 50.0
+    y[7777] = -50.0
+    idx = indices_lttb(x, y, 200)
+    assert len(idx) == 200
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+    assert 4321 in idx and 7777 in idx
+    assert list(indices_lttb(x[:50], y[:50], 200)) == list(range(50))
+
+
+def lttb_referencia(x, y, n_pontos):
+    """LTTB de referência (Steinarsson, 2013), ponto a ponto."""
+    n = len(x)
+    passo = (n - 2) / (n_pontos - 2)
+    escolhidos, a = [0], 0
+    for i in range(n_pontos - 2):
+        inicio_media = int(np.floor((i + 1) * passo)) + 1
+        fim_media = min(int(np.floor((i + 2) * passo)) + 1, n)
+        mx, my = x[inicio_media:fim_media].mean(), y[inicio_media:fim_media].mean()
+        melhor, maior_area = None, -1.0
+        for j in range(int(np.floor(i * passo)) + 1, int(np.floor((i + 1) * passo)) + 1):
+            area = abs((x[a] - mx) * (y[j] - y[a]) - (x[a] - x[j]) * (my - y[a])) * 0.5
+            if area > maior_area:
+                melhor, maior_area = j, area
+        escolhidos.append(melhor)
+        a = melhor
+    return escolhidos + [n - 1]
+
+
+def test_indices_lttb_igual_a_referencia():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        n = int(rng.integers(10, 600))
+        n_pontos = int(rng.integers(3, n))
+        x = np.sort(rng.uniform(0, 1000, n))
+        y = np.cumsum(rng.normal(size=n))
+        assert list(indices_lttb(x, y, n_pontos)) == lttb_referencia(x, y, n_pontos)
+
+
+def test_reduzir_serie_limita_pontos_da_figura():
+    df = pd.DataFrame({
+        "data": pd.date_range("2000-01-01", periods=5000, freq="D"),
+        "preco_m2": np.linspace(1000.0, 2000.0, 5000),
+    })
+    reduzida = reduzir_serie(df, n_pontos=300)
+    assert len(reduzida) == 300
+    assert reduzida["data"].iloc[-1] == df["data"].iloc[-1]
+    assert len(figura_historico(df, "Recife", "Venda").data[0].x) <= 600
+    assert len(reduzir_serie(df.head(10))) == 10
+
+def test_figura_em_cache_constroi_uma_vez():
+    df = pd.DataFrame({
+        "data": pd.date_range("2024-01-01", periods=12, freq="MS"),
+        "preco_m2": np.arange(12, dtype=float),
+    })
+    chamadas = []
+
+    def construir():
+        chamadas.append(1)
+        return figura_historico(df, "Recife", "Venda")
+
+    primeira = figura_em_cache("teste", "Recife", "Venda", "Tudo", construir)
+    segunda = figura_em_cache("teste", "Recife", "Venda", "Tudo", construir)
+    assert primeira is segunda
+    assert len(chamadas) == 1
+    figura_em_cache("teste", "Recife", "Venda", "Últimos 12 meses", construir)
+    assert len(chamadas) == 2
+
+def test_figuras_relatorio_e_previsoes():
+    df = pd.DataFrame({
+        "data": pd.date_range("2023-01-01", periods=24, freq="MS"),
+        "preco_m2": np.linspace(10.0, 34.0, 24),
+    })
+    ind = calcular_indicadores_relatorio(df, "Recife", "Venda")
+    assert list(figuras_relatorio(df, ind, "Recife", "Venda")) == list(FIGURAS_RELATORIO)
+
+    pacote = {
+        "previsoes_futuras": pd.DataFrame({
+            "cidade": "Recife", "tipo_mercado": "Venda",
+            "data": pd.date_range("2025-01-01", periods=6, freq="MS"), "preco_previsto": np.arange(6.0),
+        }),
+        "info": {"ultima_data_historica": "2024-12-01"},
+    }
+    series = series_previsoes(pacote, "Recife", "Venda")
+    assert len(series["fut"]) == 6 and series["hist"] is None
+    assert [t.name for t in figura_previsoes(series, "Recife", "Venda").data] == ["Previsão SARIMA"]
+
+def test_comparar_series_por_fatia_e_normalizada():
+    datas = pd.date_range("2024-01-01", periods=4, freq="MS")
+    df = pd.DataFrame({
+        "data": list(datas) * 2,
+        "cidade": ["Natal"] * 4 + ["Recife"] * 4,
+        "tipo_mercado": "Venda",
+        "preco_m2": [10.0, 20.0, 30.0, 40.0, 5.0, 5.0, 10.0, 10.0],
+    })
+    indice = montar_indice_series(df)
+    pares = [("Recife", "Venda"), ("Natal", "Venda"), ("Natal", "Locacao")]
+
+    brutas = comparar_series(df, indice, pares)
+    assert [s["rotulo"] for s in brutas] == ["Recife — Venda", "Natal — Venda"]
+    assert list(brutas[1]["valor"]) == [10.0, 20.0, 30.0, 40.0]
+
+    normalizadas = comparar_series(df, indice, pares, data_base="2024-02-15")
+    assert list(normalizadas[1]["valor"]) == [50.0, 100.0, 150.0, 200.0]
+    assert list(comparar_series(df, indice, pares, data_base="2020-01-01")[0]["valor"]) == [100.0, 100.0, 200.0, 200.0]
+
+    fig = figura_comparacao(normalizadas, True)
+    assert [t.type for t in fig.data] == ["scattergl", "scattergl"]
+    assert "Natal — Venda: 300.0 por cento" in texto_comparacao_acessivel(normalizadas, True)
+
+def test_comparar_series_ignora_base_zero_no_indice():
+    df = pd.DataFrame({
+        "data": list(pd.date_range("2024-01-01", periods=3, freq="MS")) * 2,
+        "cidade": ["Natal"] * 3 + ["Recife"] * 3,
+        "tipo_mercado": "Venda",
+        "preco_m2": [0.0, 20.0, 30.0, 5.0, 5.0, 10.0],
+    })
+    indice = montar_indice_series(df)
+    pares = [("Natal", "Venda"), ("Recife", "Venda")]
+    normalizadas = comparar_series(df, indice, pares, data_base="2024-01-01")
+    assert [s["rotulo"] for s in normalizadas] == ["Recife — Venda"]
+    assert np.isfinite(normalizadas[0]["valor"]).all()
+    assert len(comparar_series(df, indice, pares, data_base="2024-02-01")) == 2
+    assert len(comparar_series(df, indice, pares)) == 2
+
+def test_figura_box_ano_envia_estatisticas_e_nao_pontos():
+    rng = np.random.default_rng(0)
+    n = 20_000
+    base = pd.DataFrame({
+        "data": pd.date_range("2023-01-01", "2024-12-31", periods=n),
+        "preco_m2": rng.lognormal(8, 0.3, n),
+    })
+    ind = {"ano": base["data"].dt.year}
+    fig = figura_box_ano(base, ind, "Recife", "Venda")
+    caixa = fig.data[0]
+    assert caixa.type == "box" and caixa.y is None
+    assert list(caixa.x) == [2023, 2024]
+    assert caixa.median[0] == pytest.approx(base["preco_m2"][ind["ano"] == 2023].median())
+    assert len(fig.data[1].y) <= 2 * MAX_OUTLIERS_BOX
+    assert len(fig.to_json()) < 20_000
+
+def test_selecionar_linhas_filtra_ordena_e_pagina():
+    df = pd.DataFrame({
+        "data": pd.date_range("2024-01-01", periods=10, freq="D"),
+        "preco_m2": [5.0, 1.0, 9.0, 3.0, 7.0, 2.0, 8.0, 4.0, 6.0, 0.0],
+    })
+    assert list(selecionar_linhas(df)) == list(range(10))
+
+    posicoes = selecionar_linhas(df, "preco_m2", decrescente=True, coluna_data="data",
+                                 inicio="2024-01-02", fim="2024-01-06")
+    assert list(df["preco_m2"].iloc[posicoes]) == [9.0, 7.0, 3.0, 2.0, 1.0]
+    assert list(pagina_de(df, posicoes, 2, 2)["preco_m2"]) == [3.0, 2.0]
+    assert list(pagina_de(df, posicoes, 3, 2)["preco_m2"]) == [1.0]
+
+
+class MotorFalso:
+    nome = "falso"
+
+    def __init__(self, falhar=False):
+        self.falhar = falhar
+        self.chamadas = []
+
+    def sintetizar(self, texto, idioma):
+        self.chamadas.append(texto)
+        if self.falhar:
+            raise OSError(f"sem voz para {texto!r}")
+        return texto.encode("utf-8")
+
+
+def _estado_pregeracao():
+    import threading
+
+    return {
+        "etapa": "", "total": 0, "concluidos": 0, "trechos": 0, "falhas": 0,
+        "terminado": False, "erro": None, "cancelar": threading.Event(),
+    }
+
+
+@pytest.fixture
+def pregeracao_sem_bases(monkeypatch):
+    import app
+
+    series = [(f"Cidade {i}", "Venda") for i in range(4)]
+    df_hist = pd.DataFrame({"cidade": [c for c, _ in series], "tipo_mercado": ["Venda"] * 4})
+    monkeypatch.setattr(app, "carregar_bases", lambda: (df_hist, None))
+    monkeypatch.setattr(app, "derivados_bases", lambda: {"historico": dict.fromkeys(series), "previsoes_futuras": {}})
+    monkeypatch.setattr(app, "series_mais_vistas", lambda df, n: list(series)[:n])
+    monkeypatch.setattr(
+        app, "narracoes_da_serie",
+        lambda cidade, mercado, com_hist, com_prev: [f"Preço em {cidade}. Alta de 4,8% no período."],
+    )
+    return app
+
+
+def test_pregeracao_sintetiza_cada_trecho_uma_vez(pregeracao_sem_bases, tmp_path):
+    from cache_audio import CacheAudioDisco
+
+    app = pregeracao_sem_bases
+    cache, motor = CacheAudioDisco(str(tmp_path), 1024 * 1024), MotorFalso()
+    estado = _estado_pregeracao()
+    app._pregerar_narracoes(estado, motor, cache)
+    assert estado["terminado"] and estado["erro"] is None
+    assert estado["concluidos"] == estado["total"] == 4
+    # A segunda frase é a mesma em todas as séries: sintetizada uma vez só.
+    assert sorted(motor.chamadas) == sorted([f"Preço em Cidade {i}." for i in range(4)] + ["Alta de 4,8% no período."])
+    assert ("Preço em Cidade 0.", app.IDIOMA_TTS) in cache
+
+    de_novo = _estado_pregeracao()
+    app._pregerar_narracoes(de_novo, motor, cache)
+    assert de_novo["trechos"] == 0 and len(motor.chamadas) == 5
+
+
+def test_pregeracao_aborta_com_o_erro_do_motor(pregeracao_sem_bases, tmp_path, monkeypatch):
+    from cache_audio import CacheAudioDisco
+
+    app = pregeracao_sem_bases
+    monkeypatch.setattr(app, "PREGERACAO_THREADS", 1)
+    estado = _estado_pregeracao()
+    app._pregerar_narracoes(estado, MotorFalso(falhar=True), CacheAudioDisco(str(tmp_path), 1024 * 1024))
+    assert estado["terminado"]
+    assert estado["falhas"] >= 5
+    assert estado["erro"].startswith("motor de voz falhando: sem voz para ")
+
+
+def test_pregeracao_cancelada_nao_sintetiza(pregeracao_sem_bases, tmp_path):
+    from cache_audio import CacheAudioDisco
+
+    app = pregeracao_sem_bases
+    motor, estado = MotorFalso(), _estado_pregeracao()
+    estado["cancelar"].set()
+    app._pregerar_narracoes(estado, motor, CacheAudioDisco(str(tmp_path), 1024 * 1024))
+    assert estado["terminado"] and estado["concluidos"] == 0 and motor.chamadas == []
+
+
+def test_servidor_metricas_porta_ocupada_vai_para_o_log(monkeypatch, caplog):
+    import socket
+    import app
+
+    with socket.socket() as ocupada:
+        ocupada.bind(("127.0.0.1", 0))
+        ocupada.listen()
+        monkeypatch.setattr(app, "METRICAS_HOST", "127.0.0.1")
+        monkeypatch.setattr(app, "METRICAS_PORTA", str(ocupada.getsockname()[1]))
+        app.servidor_metricas.clear()
+        try:
+            with caplog.at_level("WARNING", logger="app"):
+                assert app.servidor_metricas() is None
+        finally:
+            app.servidor_metricas.clear()
+    assert "Métricas não expostas" in caplog.text
+
+
+def test_rerun_isolado_de_fragmento_gera_perfil_com_retencao(monkeypatch, tmp_path):
+    import json
+    import app
+
+    monkeypatch.setattr(app.st, "fragment", lambda func: func)
+    monkeypatch.setattr(app, "PERFIL_DIR", str(tmp_path))
+    monkeypatch.setattr(app, "PERFIL_MAX", 2)
+
+    def painel_teste():
+        return 42
+
+    painel = app.fragmento_medido(painel_teste)
+    monkeypatch.setattr(app, "MODO_PERFIL", "0")
+    assert painel() == 42 and not list(tmp_path.iterdir())
+
+    monkeypatch.setattr(app, "MODO_PERFIL", "1")
+    for _ in range(3):
+        assert painel() == 42
+    indice = [json.loads(linha) for linha in (tmp_path / "perfis.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert len(indice) == 2 and all(e["etiquetas"]["fragmento"] == "painel_teste" for e in indice)
+    assert len(list(tmp_path.glob("*-painel-teste.folded"))) == len(list(tmp_path.glob("*.txt"))) == 2
+
+
+def test_aviso_exportacao_aponta_para_a_exportacao_em_lote():
+    import app
+
+    assert app.aviso_exportacao(10, limite=10) is None
+    aviso = app.aviso_exportacao(1_234_567, limite=200_000)
+    assert "1.234.567" in aviso and "200.000" in aviso
+    assert "/exportacao" in aviso and "python exportacao.py" in aviso
+
+
+def test_tabela_paginada_corrige_pagina_sem_aviso_e_limita_exportacao(monkeypatch):
+    from streamlit.elements.lib import policies
+    from streamlit.testing.v1 import AppTest
+    import app
+
+    avisos = []
+    monkeypatch.setattr(policies, "_shown_default_value_warning", False)
+    monkeypatch.setattr(policies._LOGGER, "warning", lambda *a, **k: avisos.append(a))
+
+    def script():
+        import pandas as pd
+        import app
+
+        df = pd.DataFrame({"data": pd.date_range("2020-01-01", periods=100, freq="h"), "v": range(100)})
+        app.tabela_paginada(df, "t")
+
+    at = AppTest.from_function(script, default_timeout=60).run()
+    at.number_input(key="t_pagina").set_value(4).run()
+    assert at.number_input(key="t_pagina").value == 4 and len(at.get("download_button")) == 2
+    # Com 50 por página só há 2 páginas: a página volta para a última, sem aviso de estado duplicado.
+    at.selectbox(key="t_tamanho").set_value(50).run()
+    assert at.number_input(key="t_pagina").value == 2
+    assert not at.exception and avisos == []
+
+    monkeypatch.setattr(app, "EXPORTACAO_MAX_LINHAS", 99)
+    at.run()
+    assert "/exportacao" in at.info[0].value and not at.get("download_button")
@@ -0,0 +1,56 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import json
+
+from benchmark_escala import comparar, executar
+
+
+def test_escala_1x_gera_json_comparavel(tmp_path):
+    resultado = executar(escalas=[1], amostras=2, diretorio=str(tmp_path / "bases"))
+    medidas = resultado["escalas"]["1"]
+    assert medidas["linhas"] == 9 * 2 * 48
+    assert set(medidas["etapas"]) == {
+        "leitura_csv", "indice_series", "snapshot", "fatiamento", "kpis", "figuras", "pdf",
+    }
+    assert medidas["etapas"]["kpis"]["n"] == 2
+    assert not (tmp_path / "bases").exists()
+    json.dumps(resultado)
+
+    anterior = json.loads(json.dumps(resultado))
+    anterior["escalas"]["1"]["etapas"]["kpis"]["p50_ms"] = medidas["etapas"]["kpis"]["p50_ms"] / 2
+    linhas = {etapa: regrediu for _, etapa, _, _, _, regrediu in comparar(resultado, anterior)}
+    assert linhas["kpis"] is True
+    assert linhas["leitura_csv"] is False
+
+
+def test_escala_sem_memoria_fica_registrada(tmp_path, monkeypatch):
+    import app
+
+    def sem_memoria(caminho):
+        raise MemoryError
+
+    monkeypatch.setattr(app, "ler_dados_historicos", sem_memoria)
+    medidas = executar(escalas=[1], amostras=1, diretorio=str(tmp_path))["escalas"]["1"]
+    assert medidas["erro"] == "MemoryError em leitura_csv"
+    assert medidas["etapas"] == {}
+
+
+def test_json_gravado_por_escala_e_sem_medida_de_memoria(tmp_path, monkeypatch):
+    import benchmark_escala
+    import memoria_compartilhada
+
+    # Fora do Linux não há /proc nem `resource`: a memória sai como null no JSON.
+    monkeypatch.setattr(memoria_compartilhada, "memoria_processo", lambda: {"rss_kb": None, "pss_kb": None})
+    monkeypatch.setattr(memoria_compartilhada, "pico_rss_kb", lambda: None)
+    gravados = []
+    original = benchmark_escala.gravar_json
+    monkeypatch.setattr(benchmark_escala, "gravar_json", lambda r, c: gravados.append(list(r["escalas"])) or original(r, c))
+
+    caminho = tmp_path / "bench.json"
+    benchmark_escala.main(["--escalas", "1", "--amostras", "1", "--json", str(caminho), "--formato", "br"])
+    resultado = json.loads(caminho.read_text(encoding="utf-8"))
+    assert gravados == [["1"]]
+    assert resultado["formato_csv"] == "br" and resultado["rss_pico_mb"] is None
+    assert resultado["escalas"]["1"]["rss_mb"] == {"antes": None, "depois": None}
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,80 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import threading
+from cache_audio import CacheAudioDisco, chave_audio
+
+
+def test_chave_depende_do_texto_e_do_idioma():
+    assert chave_audio("olá", "pt-br") == chave_audio("olá", "pt-br")
+    assert chave_audio("olá", "pt-br") != chave_audio("olá", "en")
+    assert chave_audio("olá", "pt-br") != chave_audio("ola", "pt-br")
+
+
+def test_acerto_nao_sintetiza_de_novo(tmp_path):
+    cache = CacheAudioDisco(str(tmp_path), 1000)
+    chamadas = []
+
+    def gerar():
+        chamadas.append(1)
+        return b"mp3"
+
+    assert cache.obter_ou_gerar("texto", "pt-br", gerar) == b"mp3"
+    assert cache.obter_ou_gerar("texto", "pt-br", gerar) == b"mp3"
+    assert len(chamadas) == 1
+    est = cache.estatisticas()
+    assert est["acertos"] == 1 and est["faltas"] == 1 and est["bytes"] == 3
+
+
+def test_despeja_o_menos_usado_e_apaga_o_arquivo(tmp_path):
+    cache = CacheAudioDisco(str(tmp_path), 10)
+    cache.guardar("a", "pt-br", b"1234")
+    cache.guardar("b", "pt-br", b"1234")
+    cache.obter("a", "pt-br")
+    cache.guardar("c", "pt-br", b"1234")
+    assert ("a", "pt-br") in cache and ("b", "pt-br") not in cache
+    assert not os.path.exists(cache.caminho(chave_audio("b", "pt-br")))
+    assert cache.estatisticas()["despejos"] == 1
+
+
+def test_reabre_o_indice_do_disco(tmp_path):
+    CacheAudioDisco(str(tmp_path), 1000).guardar("a", "pt-br", b"abc")
+    reaberto = CacheAudioDisco(str(tmp_path), 1000)
+    assert reaberto.obter("a", "pt-br") == b"abc"
+    assert reaberto.estatisticas()["bytes"] == 3
+
+
+def test_sintese_unica_com_concorrencia(tmp_path):
+    cache = CacheAudioDisco(str(tmp_path), 1000)
+    chamadas = []
+    barreira = threading.Barrier(8)
+
+    def gerar():
+        chamadas.append(1)
+        return b"mp3"
+
+    def pedir():
+        barreira.wait()
+        cache.obter_ou_gerar("texto", "pt-br", gerar)
+
+    threads = [threading.Thread(target=pedir) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(chamadas) == 1
+
+
+def test_apaga_temporarios_abandonados(tmp_path):
+    velho, recente = tmp_path / "abc.tmp", tmp_path / "def.tmp"
+    velho.write_bytes(b"meio mp3")
+    recente.write_bytes(b"em escrita")
+    os.utime(velho, (0, 0))
+    cache = CacheAudioDisco(str(tmp_path), 10)
+    assert not velho.exists() and recente.exists()
+
+    os.utime(recente, (0, 0))
+    cache.guardar("a", "pt-br", b"12345678")
+    assert recente.exists()  # sem despejo, sem varredura
+    cache.guardar("b", "pt-br", b"12345678")
+    assert not recente.exists()
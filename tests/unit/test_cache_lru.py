@@ -0,0 +1,41 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import threading
+import time
+from cache_lru import CacheLRU
+
+
+def test_despejo_por_tamanho():
+    cache = CacheLRU(limite_bytes=10)
+    cache.guardar("a", b"12345")
+    cache.guardar("b", b"12345")
+    assert cache.obter("a") == b"12345"  # "a" passa a ser o mais recente
+    cache.guardar("c", b"123")
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+    assert cache.estatisticas()["bytes"] == 8
+
+
+def test_valor_maior_que_o_limite_nao_entra():
+    cache = CacheLRU(limite_bytes=4)
+    cache.guardar("a", b"12345")
+    assert len(cache) == 0
+
+
+def test_obter_ou_gerar_gera_uma_vez():
+    cache = CacheLRU(limite_bytes=1024)
+    chamadas = []
+
+    def gerar():
+        chamadas.append(1)
+        time.sleep(0.05)
+        return b"pdf"
+
+    threads = [threading.Thread(target=cache.obter_ou_gerar, args=("k", gerar)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(chamadas) == 1
+    assert cache.obter_ou_gerar("k", gerar) == b"pdf"
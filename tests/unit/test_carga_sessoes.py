@@ -0,0 +1,43 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import pytest
+
+import carga_sessoes
+from carga_sessoes import executar_carga, rss_kb
+
+
+def test_rss_kb():
+    assert rss_kb() > 0
+
+
+def test_carga_com_duas_sessoes_simultaneas(tmp_path, monkeypatch):
+    monkeypatch.delenv("PREDIMOVEIS_MFA_DB", raising=False)
+    monkeypatch.chdir(tmp_path)
+    resumo = executar_carga(sessoes=2, rodadas=1)
+    assert os.getcwd() == str(tmp_path)
+    assert "PREDIMOVEIS_MFA_DB" not in os.environ
+
+    assert resumo["erros"] == []
+    assert resumo["etapas"]["login"]["qtd"] == 2
+    assert resumo["etapas"]["pdf"]["qtd"] == 2
+    for medidas in resumo["etapas"].values():
+        assert 0 < medidas["p50_ms"] <= medidas["p95_ms"] <= medidas["p99_ms"]
+    assert resumo["rss_kb"]["pico"] >= resumo["rss_kb"]["inicial"]
+
+
+def test_carga_nunca_usa_a_base_mfa_configurada(tmp_path, monkeypatch):
+    real = tmp_path / "mfa_real.sqlite3"
+    monkeypatch.setenv("PREDIMOVEIS_MFA_DB", str(real))
+    usadas = []
+    monkeypatch.setattr(carga_sessoes, "_executar_carga", lambda *a: usadas.append(os.environ["PREDIMOVEIS_MFA_DB"]))
+    executar_carga(sessoes=1, rodadas=1)
+    assert usadas and usadas[0] != str(real) and not os.path.exists(usadas[0])
+    assert os.environ["PREDIMOVEIS_MFA_DB"] == str(real) and not real.exists()
+
+
+def test_streamlit_fora_da_versao_verificada_falha(monkeypatch):
+    monkeypatch.setattr(carga_sessoes, "STREAMLIT_VERIFICADO", ((0, 1), (0, 1)))
+    with pytest.raises(RuntimeError, match="STREAMLIT_VERIFICADO"):
+        with carga_sessoes.runtime_compartilhado():
+            pass
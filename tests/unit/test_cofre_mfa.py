@@ -0,0 +1,53 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import pyotp
+from cofre_mfa import CofreMFA
+
+
+def test_cadastro_persiste_entre_instancias(tmp_path):
+    caminho = str(tmp_path / "mfa.sqlite3")
+    primeiro = CofreMFA(caminho).obter_ou_cadastrar("admin")
+    assert primeiro["qr_png"][:8] == b"\x89PNG\r\n\x1a\n"
+    assert not primeiro["confirmado"]
+
+    reaberto = CofreMFA(caminho)
+    assert reaberto.obter_ou_cadastrar("admin")["segredo"] == primeiro["segredo"]
+    assert reaberto.obter_ou_cadastrar("outro")["segredo"] != primeiro["segredo"]
+
+
+def test_confirmar_e_redefinir(tmp_path):
+    caminho = str(tmp_path / "mfa.sqlite3")
+    cofre = CofreMFA(caminho)
+    segredo = cofre.obter_ou_cadastrar("admin")["segredo"]
+    assert pyotp.TOTP(segredo).verify(pyotp.TOTP(segredo).now())
+
+    cofre.confirmar("admin")
+    assert CofreMFA(caminho).obter("admin")["confirmado"]
+
+    cofre.redefinir("admin")
+    assert cofre.obter("admin") is None
+    assert cofre.obter_ou_cadastrar("admin")["segredo"] != segredo
+
+
+def test_qr_renderizado_uma_vez(tmp_path, monkeypatch):
+    cofre = CofreMFA(str(tmp_path / "mfa.sqlite3"))
+    renderizacoes = []
+    original = cofre._renderizar_qr
+    monkeypatch.setattr(cofre, "_renderizar_qr", lambda *a: renderizacoes.append(1) or original(*a))
+    for _ in range(5):
+        cofre.obter_ou_cadastrar("admin")
+    assert len(renderizacoes) == 1
+
+
+def test_redefinir_em_outro_processo_vale_na_hora(tmp_path):
+    caminho = str(tmp_path / "mfa.sqlite3")
+    servidor = CofreMFA(caminho)
+    segredo = servidor.obter_ou_cadastrar("admin")["segredo"]
+    servidor.confirmar("admin")
+    assert servidor.obter("admin")["confirmado"]
+
+    CofreMFA(caminho).redefinir("admin")  # como `python cofre_mfa.py redefinir admin`
+    assert servidor.obter("admin") is None
+    novo = servidor.obter_ou_cadastrar("admin")
+    assert novo["segredo"] != segredo and not novo["confirmado"]
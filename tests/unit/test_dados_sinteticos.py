@@ -0,0 +1,57 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import joblib
+import numpy as np
+import pandas as pd
+from app import ler_dados_historicos, preparar_snapshot
+from dados_sinteticos import COLUNAS, formatar_preco_br, gerar_base, nomes_cidades
+
+
+def test_formatar_preco_br():
+    assert list(formatar_preco_br([8123.456, 17.3, 1234567.8, 0.05, 1034000.5])) == [
+        "8.123,46", "17,30", "1.234.567,80", "0,05", "1.034.000,50",
+    ]
+
+
+def test_nomes_cidades_comecam_pelas_capitais():
+    nomes = nomes_cidades(11)
+    assert nomes[:2] == ["Aracaju", "Fortaleza"]
+    assert nomes[-1] == "Cidade Sintética 00002"
+
+
+def test_base_gerada_tem_o_esquema_real_e_e_lida_pelo_app(tmp_path):
+    csv, modelos = tmp_path / "base.csv", tmp_path / "modelos.joblib"
+    resumo = gerar_base(csv, n_cidades=3, meses=24, caminho_joblib=modelos)
+    assert resumo == {"linhas": 3 * 2 * 24, "series": 6, "cidades": 3, "meses": 24}
+
+    bruto = pd.read_csv(csv, dtype=str)
+    assert list(bruto.columns) == COLUNAS
+    # Como no csv_unico.csv: ponto decimal e uma casa no preço.
+    assert bruto["Preco_m2"].str.fullmatch(r"\d+\.\d").all()
+
+    df = ler_dados_historicos(str(csv))
+    assert len(df) == resumo["linhas"]
+    # Macro: uma série nacional, igual em todas as cidades.
+    assert bruto.groupby("Data")["IPCA"].nunique().max() == 1
+
+    pacote = preparar_snapshot(joblib.load(modelos))
+    assert len(pacote["previsoes_futuras"]) == 6 * 36
+    assert pacote["info"]["ultima_data_historica"] == f"{df['data'].max():%Y-%m-%d}"
+
+
+def test_formato_br(tmp_path):
+    csv = tmp_path / "base.csv"
+    resumo = gerar_base(csv, n_cidades=2, meses=12, formato="br")
+    bruto = pd.read_csv(csv, sep=";", dtype=str)
+    assert list(bruto.columns) == COLUNAS
+    assert bruto["Preco_m2"].str.fullmatch(r"\d{1,3}(\.\d{3})*,\d{2}").all()
+    df = ler_dados_historicos(str(csv))
+    assert len(df) == resumo["linhas"]
+    assert df[df["tipo_mercado"] == "Venda"]["preco_m2"].between(1000, 100000).all()
+
+
+def test_geracao_deterministica(tmp_path):
+    gerar_base(tmp_path / "a.csv", 2, 12, semente=7)
+    gerar_base(tmp_path / "b.csv", 2, 12, semente=7)
+    assert (tmp_path / "a.csv").read_bytes() == (tmp_path / "b.csv").read_bytes()
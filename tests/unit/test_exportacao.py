@@ -0,0 +1,127 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import json
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytest
+from exportacao import (
+    MANIFESTO, arquivo_exportado, escrever_arrow, escrever_csv, escrever_parquet,
+    exportar_particionado, valor_particao,
+)
+
+
+def tabela(n=10):
+    return pd.DataFrame({
+        "data": pd.date_range("2024-01-01", periods=n, freq="D"),
+        "cidade": "Recife",
+        "preco_m2": np.arange(n, dtype=float),
+    })
+
+
+def test_csv_em_blocos_respeita_posicoes_e_colunas():
+    destino = BytesIO()
+    escrever_csv(tabela(), destino, posicoes=[9, 3, 5], colunas=["preco_m2"], linhas_por_bloco=2)
+    assert destino.getvalue().decode() == "preco_m2\n9.0\n3.0\n5.0\n"
+
+
+def test_csv_vazio_tem_cabecalho():
+    destino = BytesIO()
+    escrever_csv(tabela(), destino, posicoes=[])
+    assert destino.getvalue().decode() == "data,cidade,preco_m2\n"
+
+
+def test_parquet_um_row_group_por_bloco():
+    destino = BytesIO()
+    escrever_parquet(tabela(), destino, posicoes=np.arange(10)[::-1], linhas_por_bloco=4)
+    leitor = pq.ParquetFile(BytesIO(destino.getvalue()))
+    assert leitor.metadata.num_row_groups == 3
+    lido = leitor.read().to_pandas()
+    assert list(lido["preco_m2"]) == [float(v) for v in range(9, -1, -1)]
+    assert list(lido["cidade"].unique()) == ["Recife"]
+
+
+def test_arquivo_exportado_volta_ao_inicio():
+    arquivo = arquivo_exportado(escrever_csv, tabela(3), colunas=["preco_m2"])
+    assert arquivo.read() == b"preco_m2\n0.0\n1.0\n2.0\n"
+
+
+def test_arquivo_exportado_aceito_pelo_download_button():
+    # O mesmo caminho que o `st.download_button` faz com o retorno de `data=`.
+    from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+    for escrever in (escrever_csv, escrever_parquet):
+        arquivo = arquivo_exportado(escrever, tabela(3), colunas=["preco_m2"])
+        dados, _ = convert_data_to_bytes_and_infer_mime(arquivo, RuntimeError("tipo não suportado"))
+        assert dados == arquivo.getvalue() and dados
+    lido = pq.read_table(BytesIO(dados)).to_pandas()
+    assert list(lido["preco_m2"]) == [0.0, 1.0, 2.0]
+
+
+def test_parquet_vazio():
+    destino = BytesIO()
+    escrever_parquet(tabela(), destino, posicoes=[])
+    destino.seek(0)
+    assert pq.read_table(destino).num_rows == 0
+
+
+def test_arrow_um_record_batch_por_bloco():
+    destino = BytesIO()
+    escrever_arrow(tabela(), destino, colunas=["data", "preco_m2"], linhas_por_bloco=4)
+    leitor = pa.ipc.open_file(BytesIO(destino.getvalue()))
+    assert leitor.num_record_batches == 3
+    assert leitor.schema.names == ["data", "preco_m2"]
+    assert leitor.read_all().column("preco_m2").to_pylist() == [float(v) for v in range(10)]
+
+
+def test_valor_particao_escapa_so_o_que_quebra_o_caminho():
+    assert valor_particao("João Pessoa") == "João Pessoa"
+    assert valor_particao("a/b=c") == "a%2Fb%3Dc"
+
+
+def series():
+    df = pd.DataFrame({
+        "data": pd.to_datetime(["2024-01-01", "2024-02-01", "2024-01-01", "2024-02-01", "2024-03-01"]),
+        "cidade": ["João Pessoa", "João Pessoa", "Recife", "Recife", "Recife"],
+        "tipo_mercado": "Venda",
+        "preco_m2": [1.0, 2.0, 3.0, 4.0, 5.0],
+    })
+    return df, {("João Pessoa", "Venda"): (0, 2), ("Recife", "Venda"): (2, 5)}
+
+
+def test_exportacao_particionada_com_manifesto(tmp_path):
+    destino = tmp_path / "noturna"
+    exportar_particionado({"historico": series()}, destino, "arrow", versoes={"dados": "v0"})
+    manifesto = exportar_particionado({"historico": series()}, destino, "parquet", versoes={"dados": "v1"})
+
+    assert not list(destino.rglob("*.arrow"))
+    assert json.loads((destino / MANIFESTO).read_text(encoding="utf-8")) == manifesto
+    assert manifesto["versoes"] == {"dados": "v1"}
+    historico = manifesto["tabelas"]["historico"]
+    assert historico["linhas"] == 5
+    assert historico["colunas"] == ["data", "preco_m2"]
+    assert [(p["cidade"], p["linhas"]) for p in historico["particoes"]] == [("João Pessoa", 2), ("Recife", 3)]
+
+    lido = ds.dataset(destino / "historico", format="parquet", partitioning="hive").to_table().to_pandas()
+    assert lido.groupby("cidade")["preco_m2"].sum().to_dict() == {"João Pessoa": 3.0, "Recife": 12.0}
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["noturna"]
+
+
+def test_exportacao_nao_substitui_diretorio_alheio(tmp_path):
+    destino = tmp_path / "documentos"
+    (destino / "planilha.xlsx").parent.mkdir()
+    (destino / "planilha.xlsx").write_bytes(b"importante")
+    with pytest.raises(ValueError, match="não é uma exportação anterior"):
+        exportar_particionado({"historico": series()}, destino, "parquet")
+    assert (destino / "planilha.xlsx").read_bytes() == b"importante"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["documentos"]
+
+    vazio = tmp_path / "vazio"
+    vazio.mkdir()
+    exportar_particionado({"historico": series()}, vazio, "parquet")
+    assert (vazio / MANIFESTO).exists()
@@ -0,0 +1,28 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from io import BytesIO
+import pandas as pd
+from PIL import Image
+import graficos_estaticos as ge
+
+
+def _dimensoes(png):
+    return Image.open(BytesIO(png)).size
+
+
+def test_renderizar_linha_e_barras():
+    datas = pd.date_range("2024-01-01", periods=12, freq="MS")
+    assert _dimensoes(ge.renderizar_linha(datas, range(12), "Linha")) == (ge.LARGURA, ge.ALTURA)
+    assert _dimensoes(ge.renderizar_barras([2024, 2025], [10.0, 12.0], "Barras")) == (ge.LARGURA, ge.ALTURA)
+
+
+def test_renderizar_pizza_e_boxplot():
+    assert _dimensoes(ge.renderizar_pizza(["a", "b"], [3, 1], "Pizza")) == (ge.LARGURA, ge.ALTURA)
+    stats = [{"q1": 1.0, "mediana": 2.0, "q3": 3.0, "limite_inf": 0.5, "limite_sup": 4.0, "outliers": [9.0]}]
+    assert _dimensoes(ge.renderizar_boxplot([2024], stats, "Box")) == (ge.LARGURA, ge.ALTURA)
+
+
+def test_series_vazias_nao_quebram():
+    assert ge.renderizar_linha([], [], "Vazio")[:4] == b"\x89PNG"
+    assert ge.renderizar_pizza([], [], "Vazio")[:4] == b"\x89PNG"
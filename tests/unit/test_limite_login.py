@@ -0,0 +1,99 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import threading
+
+import pytest
+from limite_login import LimitadorTentativas, cliente_real, redes_confiaveis, simular_logins
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+def test_bloqueia_apos_capacidade_e_libera_com_o_tempo():
+    relogio = Relogio()
+    limitador = LimitadorTentativas(capacidade=3, intervalo_s=60, relogio=relogio)
+    chave = ("admin", "10.0.0.1")
+    for _ in range(3):
+        assert not limitador.verificar(chave)["bloqueado"]
+        limitador.registrar_falha(chave)
+    estado = limitador.verificar(chave)
+    assert estado["bloqueado"] and estado["espera_s"] == 60
+
+    relogio.agora = 30
+    assert limitador.verificar(chave)["espera_s"] == 30
+    relogio.agora = 60
+    assert limitador.verificar(chave) == {"bloqueado": False, "espera_s": 0.0, "tentativas_restantes": 1}
+
+
+def test_chaves_independentes_e_sucesso_zera():
+    limitador = LimitadorTentativas(capacidade=1, intervalo_s=60, relogio=Relogio())
+    limitador.registrar_falha(("admin", "ip-a"))
+    assert limitador.verificar(("admin", "ip-a"))["bloqueado"]
+    assert not limitador.verificar(("admin", "ip-b"))["bloqueado"]
+    limitador.registrar_sucesso(("admin", "ip-a"))
+    assert not limitador.verificar(("admin", "ip-a"))["bloqueado"]
+
+
+def test_baldes_cheios_expiram():
+    relogio = Relogio()
+    limitador = LimitadorTentativas(capacidade=2, intervalo_s=10, relogio=relogio)
+    for i in range(100):
+        limitador.registrar_falha(("u", f"ip-{i}"))
+    assert len(limitador) == 100
+    relogio.agora = 1000
+    limitador.registrar_falha(("u", "outro"))
+    assert len(limitador) == 1
+
+
+def test_concorrencia_aceita_exatamente_a_capacidade():
+    limitador = LimitadorTentativas(capacidade=5, intervalo_s=3600)
+    barreira = threading.Barrier(16)
+    aceitas = []
+
+    def tentar():
+        barreira.wait()
+        for _ in range(10):
+            if not limitador.registrar_falha(("admin", "ip"))["bloqueado"]:
+                aceitas.append(1)
+
+    threads = [threading.Thread(target=tentar) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # A 5ª falha já deixa o par bloqueado: 4 respostas "não bloqueado".
+    assert len(aceitas) == 4
+
+
+def test_cliente_real_so_le_x_forwarded_for_de_proxy_confiavel():
+    redes = redes_confiaveis("10.0.0.1, 172.16.0.0/12")
+    # Sem proxy configurado, o cabeçalho é ignorado: trocá-lo não muda o cliente.
+    assert cliente_real("203.0.113.9", "1.1.1.1", []) == "203.0.113.9"
+    assert cliente_real("203.0.113.9", "1.1.1.1", redes) == "203.0.113.9"
+    # Atrás do proxy, vale o salto mais à direita que não é proxy; o resto foi escrito pelo cliente.
+    assert cliente_real("10.0.0.1", "6.6.6.6, 198.51.100.7", redes) == "198.51.100.7"
+    assert cliente_real("10.0.0.1", "6.6.6.6, 198.51.100.7, 172.20.0.5", redes) == "198.51.100.7"
+    assert cliente_real("10.0.0.1", "lixo", redes) == "lixo"
+    assert cliente_real("10.0.0.1", None, redes) == "10.0.0.1"
+    assert cliente_real("10.0.0.1", "172.20.0.5", redes) == "10.0.0.1"
+
+
+def test_vazao_sleep_x_limitador_sem_relogio():
+    """Mesma rajada de logins errados nos dois modos; conta, em vez de cronometrar."""
+    tentativas = [("admin", f"ip-{i % 4}") for i in range(100)]
+    dormidos = []
+    com_sleep = simular_logins(tentativas, "sleep", threads=8, atraso_s=2.0, dormir=dormidos.append)
+    com_limitador = simular_logins(tentativas, "limitador", threads=8, capacidade=5,
+                                   dormir=lambda s: pytest.fail("o limitador não dorme"))
+
+    # O sleep segura uma thread do servidor 2 s por tentativa e não barra nenhuma.
+    assert dormidos == [2.0] * 100
+    assert com_sleep["checagens_senha"] == 100 and com_sleep["segundos_presos"] == 200.0
+    # O limitador não segura thread nenhuma e só deixa `capacidade` tentativas por cliente chegarem à senha.
+    assert com_limitador["checagens_senha"] == 4 * 5 and com_limitador["segundos_presos"] == 0.0
@@ -0,0 +1,57 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import pandas as pd
+from memoria_compartilhada import publicar, publicado, mapear, memoria_processo, pico_rss_kb
+
+
+def _bases():
+    df_hist = pd.DataFrame({
+        "data": pd.date_range("2024-01-01", periods=4, freq="MS"),
+        "cidade": ["Recife", "Recife", "Natal", "Natal"],
+        "tipo_mercado": ["Venda"] * 4,
+        "preco_m2": [10.0, 11.0, 12.0, 13.0],
+    })
+    pacote = {
+        "previsoes_futuras": pd.DataFrame({
+            "data": pd.date_range("2025-01-01", periods=2, freq="MS"),
+            "cidade": ["Recife", "Recife"],
+            "tipo_mercado": ["Venda", "Venda"],
+            "preco_previsto": [14.0, 15.0],
+        }),
+        "info": {"ultima_data_historica": "2024-04-01"},
+    }
+    return df_hist, pacote
+
+
+def test_publicar_e_mapear(tmp_path):
+    df_hist, pacote = _bases()
+    assert not publicado(str(tmp_path))
+    publicar(df_hist, pacote, str(tmp_path))
+    assert publicado(str(tmp_path))
+
+    hist_map, pacote_map = mapear(str(tmp_path))
+    assert hist_map["preco_m2"].tolist() == df_hist["preco_m2"].tolist()
+    assert sorted(hist_map["cidade"].unique()) == ["Natal", "Recife"]
+    assert pacote_map["info"]["ultima_data_historica"] == "2024-04-01"
+    assert pacote_map["previsoes_futuras"]["preco_previsto"].tolist() == [14.0, 15.0]
+
+
+def test_mapear_sem_copia(tmp_path):
+    df_hist, pacote = _bases()
+    publicar(df_hist, pacote, str(tmp_path))
+    hist_map, _ = mapear(str(tmp_path))
+    # Arrays apontando para o arquivo mapeado são somente leitura.
+    assert not hist_map["preco_m2"].to_numpy().flags.writeable
+    assert not hist_map["data"].to_numpy().flags.writeable
+
+
+def test_memoria_processo():
+    memoria = memoria_processo()
+    assert set(memoria) == {"rss_kb", "pss_kb"}
+
+
+def test_pico_rss_kb_sem_modulo_resource(monkeypatch):
+    assert pico_rss_kb() > 0
+    monkeypatch.setitem(sys.modules, "resource", None)
+    assert pico_rss_kb() is None
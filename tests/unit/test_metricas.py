@@ -0,0 +1,64 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import urllib.request
+
+import pytest
+import streamlit as st
+from metricas import CACHE, ERROS, TEMPO, RegistroMetricas, servir
+
+
+def test_histograma_no_formato_prometheus():
+    registro = RegistroMetricas(baldes=(0.01, 0.1))
+    registro.observar(TEMPO, 0.005, funcao="f")
+    registro.observar(TEMPO, 0.05, funcao="f")
+    registro.observar(TEMPO, 5.0, funcao="f")
+    texto = registro.texto_prometheus()
+
+    assert f"# TYPE {TEMPO} histogram" in texto
+    assert f'{TEMPO}_bucket{{funcao="f",le="0.01"}} 1' in texto
+    assert f'{TEMPO}_bucket{{funcao="f",le="0.1"}} 2' in texto
+    assert f'{TEMPO}_bucket{{funcao="f",le="+Inf"}} 3' in texto
+    assert f'{TEMPO}_count{{funcao="f"}} 3' in texto
+
+
+def test_cronometrado_conta_erros():
+    registro = RegistroMetricas()
+
+    @registro.cronometrado
+    def falha():
+        raise ValueError("x")
+
+    with pytest.raises(ValueError):
+        falha()
+    assert f'{ERROS}{{funcao="falha"}} 1' in registro.texto_prometheus()
+    assert registro.ultimas()[0]["rotulos"] == {"funcao": "falha"}
+
+
+def test_cache_medido_separa_acertos_e_faltas():
+    registro = RegistroMetricas()
+    chamadas = []
+
+    @registro.cache_medido(st.cache_resource(show_spinner=False))
+    def quadrado_metricas(x):
+        chamadas.append(x)
+        return x * x
+
+    quadrado_metricas.clear()
+    assert [quadrado_metricas(v) for v in (2, 2, 3, 2)] == [4, 4, 9, 4]
+    assert chamadas == [2, 3]
+    assert registro.consultas_cache() == {"quadrado_metricas": {"acerto": 2, "falta": 2}}
+    assert f'{CACHE}{{cache="quadrado_metricas",resultado="acerto"}} 2' in registro.texto_prometheus()
+
+
+def test_endpoint_metrics():
+    registro = RegistroMetricas()
+    registro.contar(CACHE, cache='a"b', resultado="acerto")
+    servidor = servir(0, registro=registro)
+    try:
+        porta = servidor.server_address[1]
+        texto = urllib.request.urlopen(f"http://127.0.0.1:{porta}/metrics").read().decode()
+        assert f'{CACHE}{{cache="a\\"b",resultado="acerto"}} 1' in texto
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
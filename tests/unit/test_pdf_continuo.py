@@ -0,0 +1,32 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import re
+from graficos_estaticos import renderizar_barras
+from pdf_continuo import EscritorPDFContinuo
+
+
+def _xref_valido(dados):
+    inicio = int(dados.rsplit(b"startxref", 1)[1].split()[0])
+    linhas = dados[inicio:].split(b"trailer")[0].split(b"\n")
+    total = int(linhas[1].split()[1])
+    for i in range(1, total):
+        offset = int(linhas[2 + i][:10])
+        assert dados[offset:].startswith(f"{i} 0 obj".encode())
+    return total
+
+
+def test_escritor_quebra_paginas_e_gera_xref(tmp_path):
+    destino = tmp_path / "doc.pdf"
+    with EscritorPDFContinuo(destino) as pdf:
+        pdf.escrever_blocos([("pagina",), ("fonte", "B", 16), ("celula", 10, "Título (acentuado)")])
+        pdf.escrever_blocos([("fonte", "", 11), ("multi", 6, "linha longa " * 400)])
+        pdf.escrever_blocos([("imagem", renderizar_barras(["a", "b"], [1, 2], "Barras"), 190)])
+        paginas = pdf.paginas
+
+    dados = destino.read_bytes()
+    assert dados.startswith(b"%PDF") and dados.rstrip().endswith(b"%%EOF")
+    assert paginas > 1
+    assert len(re.findall(rb"/Type /Page ", dados)) == paginas
+    assert b"/Subtype /Image" in dados
+    _xref_valido(dados)
@@ -0,0 +1,58 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import json
+import time
+
+import pytest
+from perfil import Amostrador, perfilado, texto_folded, top_funcoes
+
+
+def ocupado(segundos):
+    fim = time.perf_counter() + segundos
+    while time.perf_counter() < fim:
+        pass
+
+
+def test_amostrador_ve_a_funcao_ocupada():
+    with Amostrador(intervalo=0.001) as amostrador:
+        ocupado(0.1)
+    assert amostrador.duracao >= 0.1
+    funcao, proprio, total = top_funcoes(amostrador.pilhas, n=1)[0]
+    assert funcao == "test_perfil:ocupado"
+    # Uma amostra pode cair no próprio `__exit__`, enquanto espera a thread amostradora.
+    assert proprio == total >= sum(amostrador.pilhas.values()) - 1
+
+
+def test_folded_e_top_n():
+    pilhas = {("a", "b"): 3, ("a", "c"): 1, ("a",): 2}
+    assert texto_folded(pilhas) == "a 2\na;b 3\na;c 1\n"
+    assert top_funcoes(pilhas) == [("b", 3, 3), ("a", 2, 6), ("c", 1, 1)]
+
+
+def test_perfilado_grava_relatorio_mesmo_com_excecao(tmp_path):
+    with pytest.raises(RuntimeError):
+        with perfilado(tmp_path, lambda: {"aba": "📑 Relatórios e PDF", "selecoes": {"rel_cidade": "Recife"}}, intervalo=0.001):
+            ocupado(0.05)
+            raise RuntimeError("rerun")
+
+    indice = [json.loads(linha) for linha in (tmp_path / "perfis.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert len(indice) == 1
+    assert indice[0]["arquivo"].endswith("-relatorios-e-pdf")
+    assert indice[0]["etiquetas"]["selecoes"] == {"rel_cidade": "Recife"}
+    resumo = (tmp_path / f"{indice[0]['arquivo']}.txt").read_text(encoding="utf-8")
+    assert "rel_cidade" in resumo and "test_perfil:ocupado" in resumo
+    assert "test_perfil:ocupado" in (tmp_path / f"{indice[0]['arquivo']}.folded").read_text(encoding="utf-8")
+
+
+def test_manter_so_as_ultimas_execucoes(tmp_path):
+    for i in range(5):
+        with perfilado(tmp_path, lambda: {"aba": "Dashboard", "fragmento": f"painel_{i}"}, intervalo=0.001, manter=3):
+            pass
+
+    indice = [json.loads(linha) for linha in (tmp_path / "perfis.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert [e["etiquetas"]["fragmento"] for e in indice] == ["painel_2", "painel_3", "painel_4"]
+    assert indice[-1]["arquivo"].endswith("-dashboard-painel-4")
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        ["perfis.jsonl", *(e["arquivo"] + ext for e in indice for ext in (".folded", ".txt"))]
+    )
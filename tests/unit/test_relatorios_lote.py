@@ -0,0 +1,45 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import zipfile
+import pandas as pd
+import pytest
+from relatorios_lote import gerar_consolidado, gerar_lote
+
+
+def _df_hist():
+    datas = list(pd.date_range("2023-01-01", periods=14, freq="MS"))
+    linhas = []
+    for cidade in ("Natal", "Recife"):
+        for i, data in enumerate(datas):
+            linhas.append({"data": data, "cidade": cidade, "tipo_mercado": "Venda", "preco_m2": 10.0 + i})
+    return pd.DataFrame(linhas)
+
+
+def test_gerar_lote_em_diretorio(tmp_path):
+    resumo = gerar_lote(_df_hist(), saida=str(tmp_path), processos=2)
+    assert resumo["relatorios"] == 2
+    with open(tmp_path / "relatorio_Recife_Venda.pdf", "rb") as f:
+        assert f.read(4) == b"%PDF"
+    assert (tmp_path / "resumo_lote.json").exists()
+
+
+def test_gerar_lote_em_zip(tmp_path):
+    destino = tmp_path / "lote" / "relatorios.zip"
+    gerar_lote(_df_hist(), arquivo_zip=str(destino), processos=2)
+    with zipfile.ZipFile(destino) as zf:
+        assert sorted(zf.namelist()) == ["relatorio_Natal_Venda.pdf", "relatorio_Recife_Venda.pdf"]
+
+
+def test_gerar_lote_exige_um_destino():
+    with pytest.raises(ValueError):
+        gerar_lote(_df_hist())
+
+
+def test_gerar_consolidado(tmp_path):
+    destino = tmp_path / "consolidado.pdf"
+    resumo = gerar_consolidado(_df_hist(), str(destino))
+    assert resumo["series"] == 2
+    assert resumo["paginas"] > resumo["series"]
+    with open(destino, "rb") as f:
+        assert f.read(4) == b"%PDF"
@@ -0,0 +1,97 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import pytest
+import tts
+
+
+class MotorFixo(tts.MotorTTS):
+    nome = "fixo"
+
+    def sintetizar(self, texto, idioma=tts.IDIOMA_PADRAO):
+        return texto.encode("utf-8")
+
+
+def test_escolher_motor_por_nome(monkeypatch):
+    monkeypatch.setattr(tts.shutil, "which", lambda comando: f"/usr/bin/{comando}")
+    assert isinstance(tts.escolher_motor("gtts"), tts.GoogleTTS)
+    assert isinstance(tts.escolher_motor("espeak"), tts.EspeakNG)
+    with pytest.raises(ValueError):
+        tts.escolher_motor("inexistente")
+
+
+def test_espeak_sem_binario_falha_com_mensagem(monkeypatch):
+    monkeypatch.setattr(tts.shutil, "which", lambda comando: None)
+    with pytest.raises(RuntimeError, match="indisponível"):
+        tts.escolher_motor("espeak")
+    with pytest.raises(RuntimeError, match="espeak-ng"):
+        tts.EspeakNG().sintetizar("olá")
+
+
+def test_motor_sem_sintetizar_nao_instancia():
+    class Incompleto(tts.MotorTTS):
+        nome = "incompleto"
+
+    with pytest.raises(TypeError):
+        Incompleto()
+
+
+def test_auto_cai_para_gtts_sem_espeak(monkeypatch):
+    monkeypatch.setattr(tts.shutil, "which", lambda comando: None)
+    assert isinstance(tts.escolher_motor("auto"), tts.GoogleTTS)
+
+
+def test_benchmark_mede_disponiveis_e_marca_indisponiveis():
+    resultado = tts.benchmark(
+        [MotorFixo(), tts.EspeakNG(comando="comando-que-nao-existe")],
+        textos={"curto": "olá"},
+        repeticoes=2,
+    )
+    assert resultado["espeak"] == {"disponivel": False}
+    medidas = resultado["fixo"]["textos"]["curto"]
+    assert medidas["bytes_audio"] == len("olá".encode("utf-8"))
+    assert medidas["p50_s"] <= medidas["p95_s"]
+
+
+def test_dividir_em_trechos_nas_frases():
+    texto = "Primeira frase. O preço foi de R$ 5.420,00 (alta de 4,8%). Terceira? Sim! Fim."
+    trechos = tts.dividir_em_trechos(texto, max_caracteres=50)
+    assert trechos[0] == "Primeira frase."
+    assert " ".join(trechos) == texto
+    assert all(len(t) <= 50 for t in trechos[1:])
+    assert tts.dividir_em_trechos("   ") == []
+
+
+def test_juntar_audios_wav():
+    import wave
+    from io import BytesIO
+
+    def wav(quadros):
+        buf = BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(8000)
+            w.writeframes(b"\0\0" * quadros)
+        return buf.getvalue()
+
+    junto = tts.juntar_audios([wav(100), wav(50)], "audio/wav")
+    with wave.open(BytesIO(junto), "rb") as w:
+        assert w.getnframes() == 150
+    assert tts.juntar_audios([b"ab", b"cd"], "audio/mp3") == b"abcd"
+
+
+def test_primeiro_trecho_fica_pronto_antes_do_texto_todo():
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    import time
+
+    def sintetizar(trecho):
+        time.sleep(len(trecho) / 1000)  # síntese proporcional ao tamanho
+        return trecho.encode()
+
+    texto = "Curta. " + " ".join(["Uma frase bem mais longa que a primeira, com muitas palavras."] * 6)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futuros = tts.sintetizar_em_trechos(texto, sintetizar, executor, max_caracteres=120)
+        wait(futuros, return_when=FIRST_COMPLETED)
+        assert futuros[0].done()
+        assert b" ".join(f.result() for f in futuros) == texto.encode()
@@ -0,0 +1,233 @@
+"""Motores de síntese de voz (TTS) da leitura em voz alta.
+
+`app.ler_texto_em_voz_alta` só conhece a interface `MotorTTS`; o motor é
+escolhido pela variável de ambiente ``PREDIMOVEIS_TTS``:
+
+- ``espeak``: espeak-ng (ou espeak) local, sem internet; gera WAV.
+- ``gtts``: Google Translate TTS via gTTS; precisa de internet; gera MP3.
+- ``auto`` (padrão): espeak-ng se estiver instalado, senão gTTS.
+
+Benchmark de latência dos motores disponíveis:
+    python tts.py benchmark --repeticoes 5 --json benchmark_tts.json
+"""
+import abc
+import argparse
+import json
+import re
+import shutil
+import subprocess
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+
+IDIOMA_PADRAO = "pt-br"
+
+
+class MotorTTS(abc.ABC):
+    nome = ""
+    formato = "audio/wav"
+    extensao = ".wav"
+
+    def disponivel(self):
+        return True
+
+    @abc.abstractmethod
+    def sintetizar(self, texto, idioma=IDIOMA_PADRAO):
+        """Áudio do texto, em bytes no `formato` do motor."""
+
+
+class EspeakNG(MotorTTS):
+    nome = "espeak"
+    formato = "audio/wav"
+    extensao = ".wav"
+
+    def __init__(self, comando=None, velocidade=165):
+        self.comando = comando or shutil.which("espeak-ng") or shutil.which("espeak")
+        self.velocidade = velocidade
+
+    def disponivel(self):
+        return bool(self.comando) and shutil.which(self.comando) is not None
+
+    def sintetizar(self, texto, idioma=IDIOMA_PADRAO):
+        if not self.comando:
+            raise RuntimeError("espeak-ng não encontrado: instale o pacote espeak-ng ou use PREDIMOVEIS_TTS=gtts.")
+        resultado = subprocess.run(
+            [self.comando, "-v", idioma, "-s", str(self.velocidade), "--stdin", "--stdout"],
+            input=texto.encode("utf-8"),
+            capture_output=True,
+            check=True,
+            timeout=120,
+        )
+        return resultado.stdout
+
+
+class GoogleTTS(MotorTTS):
+    nome = "gtts"
+    formato = "audio/mp3"
+    extensao = ".mp3"
+
+    def sintetizar(self, texto, idioma=IDIOMA_PADRAO):
+        from gtts import gTTS
+
+        buf = BytesIO()
+        gTTS(text=texto, lang=idioma).write_to_fp(buf)
+        return buf.getvalue()
+
+
+MOTORES = {"espeak": EspeakNG, "gtts": GoogleTTS}
+
+
+def escolher_motor(nome="auto"):
+    if nome == "auto":
+        local = EspeakNG()
+        return local if local.disponivel() else GoogleTTS()
+    if nome not in MOTORES:
+        raise ValueError(f"Motor de TTS desconhecido: {nome!r} (use auto, {', '.join(MOTORES)}).")
+    motor = MOTORES[nome]()
+    if not motor.disponivel():
+        raise RuntimeError(f"Motor de TTS {nome!r} indisponível nesta máquina (para o espeak, instale o espeak-ng).")
+    return motor
+
+
+# -------------------- Narrações longas em trechos --------------------
+# Fim de frase: pontuação seguida de espaço. Números como "5.420" e "4,8%" não quebram.
+_FIM_DE_FRASE = re.compile(r"(?<=[.!?])\s+")
+
+
+def dividir_em_trechos(texto, max_caracteres=300):
+    """Divide o texto em trechos nas fronteiras de frase.
+
+    O primeiro trecho é só a primeira frase, para o áudio começar o quanto
+    antes; as seguintes são agrupadas até `max_caracteres`.
+    """
+    frases = [f for f in _FIM_DE_FRASE.split(texto.strip()) if f]
+    if not frases:
+        return []
+    trechos = [frases[0]]
+    atual = ""
+    for frase in frases[1:]:
+        if atual and len(atual) + 1 + len(frase) > max_caracteres:
+            trechos.append(atual)
+            atual = frase
+        else:
+            atual = f"{atual} {frase}" if atual else frase
+    if atual:
+        trechos.append(atual)
+    return trechos
+
+
+def sintetizar_em_trechos(texto, sintetizar, executor, max_caracteres=300):
+    """Dispara a síntese de todos os trechos em paralelo; devolve os futuros na ordem do texto."""
+    return [executor.submit(sintetizar, trecho) for trecho in dividir_em_trechos(texto, max_caracteres)]
+
+
+def juntar_audios(partes, formato):
+    """Concatena trechos de áudio do mesmo motor em um único arquivo."""
+    if formato == "audio/mp3":
+        # MP3 é uma sequência de quadros independentes: basta concatenar.
+        return b"".join(partes)
+    saida = BytesIO()
+    with wave.open(saida, "wb") as destino:
+        for i, parte in enumerate(partes):
+            with wave.open(BytesIO(parte), "rb") as origem:
+                if i == 0:
+                    destino.setparams(origem.getparams())
+                destino.writeframes(origem.readframes(origem.getnframes()))
+    return saida.getvalue()
+
+
+# -------------------- Benchmark --------------------
+TEXTOS_BENCHMARK = {
+    "curto": "Preço médio atual de 5.420 reais por metro quadrado.",
+    "medio": (
+        "Esta seção mostra a evolução do preço médio do metro quadrado em Recife, "
+        "no mercado de venda. O último valor registrado foi de 7.312 reais por metro "
+        "quadrado, com alta de 4,8% em relação ao início do período."
+    ),
+    "longo": (
+        "No período de janeiro de 2024 a abril de 2025, analisamos o comportamento dos preços "
+        "de imóveis em Fortaleza, no segmento de locação. Nesse intervalo, o preço médio foi de "
+        "aproximadamente 38 reais por metro quadrado, e o valor mais recente observado é de cerca "
+        "de 41 reais por metro quadrado. Isso representa uma variação acumulada de 7,9%, o que "
+        "sugere uma tendência de valorização. O gráfico de linha mostra a trajetória mês a mês, "
+        "e o boxplot resume a dispersão dos preços em cada ano."
+    ),
+}
+
+
+def benchmark(motores, textos=TEXTOS_BENCHMARK, repeticoes=5, threads=4):
+    """Latência de síntese por motor e tamanho de texto (p50/p95 em segundos).
+
+    `primeiro_trecho_p50_s` é o tempo até o primeiro áudio com a síntese em
+    trechos paralelos, como no app.
+    """
+    resultado = {}
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for motor in motores:
+            if not motor.disponivel():
+                resultado[motor.nome] = {"disponivel": False}
+                continue
+            por_texto = {}
+            for rotulo, texto in textos.items():
+                tempos, primeiros, tamanhos = [], [], []
+                try:
+                    for _ in range(repeticoes):
+                        inicio = time.perf_counter()
+                        audio = motor.sintetizar(texto)
+                        tempos.append(time.perf_counter() - inicio)
+                        tamanhos.append(len(audio))
+
+                        inicio = time.perf_counter()
+                        futuros = sintetizar_em_trechos(texto, motor.sintetizar, executor)
+                        futuros[0].result()
+                        primeiros.append(time.perf_counter() - inicio)
+                        for futuro in futuros[1:]:
+                            futuro.result()
+                except Exception as e:
+                    por_texto[rotulo] = {"erro": str(e)}
+                    continue
+                por_texto[rotulo] = {
+                    "caracteres": len(texto),
+                    "trechos": len(dividir_em_trechos(texto)),
+                    "p50_s": round(float(np.percentile(tempos, 50)), 4),
+                    "p95_s": round(float(np.percentile(tempos, 95)), 4),
+                    "primeiro_trecho_p50_s": round(float(np.percentile(primeiros, 50)), 4),
+                    "bytes_audio": int(np.mean(tamanhos)),
+                }
+            resultado[motor.nome] = {"disponivel": True, "textos": por_texto}
+    return resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Motores de TTS da leitura em voz alta")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_bench = sub.add_parser("benchmark", help="mede a latência de síntese de cada motor")
+    p_bench.add_argument("--motores", nargs="+", default=list(MOTORES), choices=list(MOTORES))
+    p_bench.add_argument("--repeticoes", type=int, default=5)
+    p_bench.add_argument("--json", help="arquivo onde gravar o resultado")
+    args = parser.parse_args(argv)
+
+    resultado = benchmark([MOTORES[nome]() for nome in args.motores], repeticoes=args.repeticoes)
+    for nome, dados in resultado.items():
+        if not dados["disponivel"]:
+            print(f"{nome}: indisponível nesta máquina")
+            continue
+        for rotulo, medidas in dados["textos"].items():
+            if "erro" in medidas:
+                print(f"{nome} [{rotulo}]: erro - {medidas['erro']}")
+            else:
+                print(
+                    f"{nome} [{rotulo}, {medidas['caracteres']} caracteres]: "
+                    f"p50 {medidas['p50_s']} s | p95 {medidas['p95_s']} s | "
+                    f"1º áudio em trechos {medidas['primeiro_trecho_p50_s']} s | {medidas['bytes_audio']} bytes"
+                )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()